@@ -1,20 +1,1913 @@
+import base64
+import gzip
+import hashlib
+import hmac
 import json
+import math
 import os
+import re
+import select
+import threading
+import time
+import uuid
+import weakref
+import zlib
 import psycopg2
-from typing import Dict, Any
-from datetime import datetime
+from psycopg2.extras import execute_values
+from collections import OrderedDict, deque
+from typing import Dict, Any, Deque, List, Optional, Tuple
+from datetime import datetime, timezone
+from email.utils import format_datetime
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Пул соединений живёт на уровне модуля и переживает "тёплые" вызовы функции,
+# поэтому TCP + TLS + авторизация в Postgres оплачиваются один раз на инстанс
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', '4'))
+DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', '5'))
+DB_POOL_PING_INTERVAL = float(os.environ.get('DB_POOL_PING_INTERVAL', '30'))
+
+_pool_lock = threading.Condition()
+_pool_idle: List[Tuple[Any, float]] = []
+_pool_in_use = 0
+
+pool_stats: Dict[str, int] = {
+    'hits': 0,
+    'misses': 0,
+    'waits': 0,
+    'timeouts': 0,
+    'reconnects': 0,
+    'discarded': 0
+}
+
+
+def _connection_alive(conn: Any, last_used: float) -> bool:
+    '''
+    Проверка соединения перед выдачей: закрытые отбрасываем сразу,
+    долго простаивавшие пингуем через SELECT 1
+    '''
+    if conn.closed:
+        return False
+    if time.monotonic() - last_used < DB_POOL_PING_INTERVAL:
+        return True
+    try:
+        ping = conn.cursor()
+        ping.execute('SELECT 1')
+        ping.close()
+        conn.rollback()
+        return True
+    except psycopg2.Error:
+        return False
+
+
+def _discard_connection(conn: Any) -> None:
+    pool_stats['discarded'] += 1
+    try:
+        conn.close()
+    except psycopg2.Error:
+        pass
+
+
+def get_connection() -> Any:
+    '''
+    Выдаёт соединение из пула; если свободных нет — открывает новое,
+    а при исчерпании лимита ждёт освобождения не дольше DB_POOL_TIMEOUT
+    '''
+    global _pool_in_use
+    deadline = time.monotonic() + DB_POOL_TIMEOUT
+
+    while True:
+        with _pool_lock:
+            while True:
+                # Место в пуле занимаем сразу, даже под соединение на проверке
+                if _pool_idle:
+                    conn, last_used = _pool_idle.pop()
+                    _pool_in_use += 1
+                    break
+                if _pool_in_use < DB_POOL_SIZE:
+                    conn = None
+                    _pool_in_use += 1
+                    break
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    pool_stats['timeouts'] += 1
+                    raise RuntimeError('Database connection pool exhausted')
+                pool_stats['waits'] += 1
+                _pool_lock.wait(remaining)
+
+        if conn is None:
+            break
+        # Пинг идёт без блокировки пула: медленный или мёртвый сервер
+        # задерживает только этот вызов, а не все выдачи и возвраты
+        if _connection_alive(conn, last_used):
+            with _pool_lock:
+                pool_stats['hits'] += 1
+            return conn
+        with _pool_lock:
+            _pool_in_use -= 1
+            _discard_connection(conn)
+            pool_stats['reconnects'] += 1
+            _pool_lock.notify()
+
+    with _pool_lock:
+        pool_stats['misses'] += 1
+    try:
+        return psycopg2.connect(os.environ.get('DATABASE_URL'))
+    except Exception:
+        with _pool_lock:
+            _pool_in_use -= 1
+            _pool_lock.notify()
+        raise
+
+
+def release_connection(conn: Any, broken: bool = False) -> None:
+    '''
+    Возвращает соединение в пул; сломанные закрываются,
+    чтобы следующий вызов переподключился
+    '''
+    global _pool_in_use
+    if not broken and not conn.closed:
+        try:
+            conn.rollback()
+        except psycopg2.Error:
+            broken = True
+
+    with _pool_lock:
+        _pool_in_use -= 1
+        if broken or conn.closed or len(_pool_idle) >= DB_POOL_SIZE:
+            _discard_connection(conn)
+        else:
+            _pool_idle.append((conn, time.monotonic()))
+        _pool_lock.notify()
+
+
+def get_pool_stats() -> Dict[str, int]:
+    with _pool_lock:
+        return {**pool_stats, 'idle': len(_pool_idle), 'in_use': _pool_in_use, 'size': DB_POOL_SIZE}
+
+
+# Слой запросов: все значения передаются связанными параметрами, горячие запросы
+# выполняются как серверные prepared statements (план переиспользуется в рамках
+# соединения пула), время каждого именованного запроса копится в statement_stats
+PREPARED_STATEMENTS_PER_CONNECTION = 64
+
+_prepared_statements: 'weakref.WeakKeyDictionary[Any, Dict[str, int]]' = weakref.WeakKeyDictionary()
+_statement_stats_lock = threading.Lock()
+statement_stats: Dict[str, Dict[str, float]] = {}
+
+_PLACEHOLDER_RE = re.compile(r'%%|%s')
+
+
+def _record_statement_time(name: str, started: float) -> None:
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    with _statement_stats_lock:
+        stats = statement_stats.setdefault(name, {'calls': 0, 'total_ms': 0.0, 'max_ms': 0.0})
+        stats['calls'] += 1
+        stats['total_ms'] += elapsed_ms
+        stats['max_ms'] = max(stats['max_ms'], elapsed_ms)
+
+
+def get_statement_stats() -> Dict[str, Dict[str, float]]:
+    with _statement_stats_lock:
+        return {
+            name: {
+                'calls': int(stats['calls']),
+                'avg_ms': round(stats['total_ms'] / stats['calls'], 3) if stats['calls'] else 0.0,
+                'max_ms': round(stats['max_ms'], 3)
+            }
+            for name, stats in statement_stats.items()
+        }
+
+
+def execute(cur: Any, name: str, sql: str, params: Any = None) -> None:
+    '''
+    Выполняет запрос со связанными параметрами (%s) и учитывает его время под именем name
+    '''
+    started = time.perf_counter()
+    try:
+        cur.execute(sql, params)
+    finally:
+        _record_statement_time(name, started)
+
+
+def execute_prepared(cur: Any, name: str, sql: str, params: Any = ()) -> None:
+    '''
+    Как execute, но через PREPARE/EXECUTE: текст запроса разбирается и планируется
+    один раз на соединение. Имя prepared statement включает хеш SQL, поэтому
+    запросы с разным набором фильтров кэшируются отдельно
+    '''
+    started = time.perf_counter()
+    try:
+        prepared = _prepared_statements.setdefault(cur.connection, {})
+        statement = f"{name}_{zlib.crc32(sql.encode('utf-8')):08x}"
+
+        if statement not in prepared:
+            if len(prepared) >= PREPARED_STATEMENTS_PER_CONNECTION:
+                cur.execute(sql, params)
+                return
+            numbered = iter(range(1, sql.count('%s') + 1))
+            server_sql = _PLACEHOLDER_RE.sub(lambda m: '%' if m.group(0) == '%%' else f'${next(numbered)}', sql)
+            cur.execute(f"PREPARE {statement} AS {server_sql}")
+            prepared[statement] = len(params)
+
+        if params:
+            cur.execute(f"EXECUTE {statement} ({', '.join(['%s'] * len(params))})", params)
+        else:
+            cur.execute(f"EXECUTE {statement}")
+    finally:
+        _record_statement_time(name, started)
+
+
+JOBS_PAGE_SIZE = 20
+JOBS_MAX_PAGE_SIZE = 100
+
+# Столбцы SELECT вакансии по порядку и поле ответа, которое из них строится (fields=)
+JOB_COLUMN_FIELDS = (
+    ('id', 'id'), ('title', 'title'), ('company', 'company'), ('location', 'location'),
+    ('type', 'type'), ('salary', 'salary'), ('description', 'description'),
+    ('requirements', 'requirements'), ('employerId', 'employer_id'), ('employerEmail', 'employer_email'),
+    ('postedDate', 'created_at'), ('ageRange', 'age_range'), ('category', 'category'),
+    ('coordinates', 'ARRAY[lat, lon] AS coordinates'), ('isPremium', 'is_premium'),
+    ('responsibilities', 'responsibilities'), ('conditions', 'conditions'),
+    ('contact', 'contact_phone'), ('contact', 'contact_email'),
+    ('salaryMin', 'salary_min'), ('salaryMax', 'salary_max'), ('salaryCurrency', 'salary_currency')
+)
+JOB_COLUMNS = ', '.join(column for _, column in JOB_COLUMN_FIELDS)
+# created_at нужен курсору и сортировке списка даже без postedDate в fields
+JOB_REQUIRED_COLUMNS = ('id', 'postedDate')
+
+
+def parse_fields(raw: str, column_fields: Tuple[Tuple[str, str], ...]) -> Any:
+    '''
+    Набор полей ответа из параметра fields=a,b,c; None — все поля.
+    id возвращается всегда, неизвестное поле — ValueError
+    '''
+    if not raw:
+        return None
+    fields = {field.strip() for field in raw.split(',') if field.strip()}
+    unknown = sorted(fields - {field for field, _ in column_fields})
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return frozenset(fields | {'id'})
+
+
+def projected_columns(column_fields: Tuple[Tuple[str, str], ...], fields: Any,
+                      required: Tuple[str, ...] = ('id',)) -> str:
+    '''
+    Список SELECT под fields: ненужные столбцы заменяются на NULL той же позиции,
+    поэтому индексы строки не меняются, а БД не читает и не передаёт TEXT и TEXT[]
+    '''
+    if fields is None:
+        return ', '.join(column for _, column in column_fields)
+    return ', '.join(
+        column if field in fields or field in required else f"NULL AS {column.split(' AS ')[-1]}"
+        for field, column in column_fields
+    )
+
+
+def project_fields(record: Dict[str, Any], fields: Any) -> Dict[str, Any]:
+    if fields is None:
+        return record
+    return {key: value for key, value in record.items() if key in fields}
+
+
+def job_columns(fields: Any) -> str:
+    return projected_columns(JOB_COLUMN_FIELDS, fields, JOB_REQUIRED_COLUMNS)
+
+
+APPLICATIONS_PAGE_SIZE = 50
+APPLICATIONS_MAX_PAGE_SIZE = 200
+
+# Отклик a и текущий профиль кандидата u: копии имени, email, телефона и возраста
+# в applications берутся, только если профиля нет
+APPLICATION_COLUMN_FIELDS = (
+    ('id', 'a.id AS id'), ('jobId', 'a.job_id AS job_id'), ('userId', 'a.user_id AS user_id'),
+    ('userName', 'COALESCE(u.full_name, a.user_name) AS user_name'),
+    ('userEmail', 'COALESCE(u.email, a.user_email) AS user_email'),
+    ('userPhone', "COALESCE(NULLIF(u.phone, ''), a.user_phone) AS user_phone"),
+    ('userAge', 'COALESCE(EXTRACT(YEAR FROM AGE(u.date_of_birth))::int, a.user_age) AS user_age'),
+    ('coverLetter', 'a.cover_letter AS cover_letter'), ('status', 'a.status AS status'),
+    ('createdAt', 'a.created_at AS created_at'), ('updatedAt', 'a.updated_at AS updated_at')
+)
+
+INTERVIEW_COLUMN_FIELDS = (
+    ('id', 'id'), ('userId', 'user_id'), ('jobId', 'job_id'), ('userName', 'user_name'),
+    ('userEmail', 'user_email'), ('userAge', 'user_age'), ('jobTitle', 'job_title'),
+    ('date', 'interview_date'), ('location', 'location'), ('notes', 'notes'),
+    ('timestamp', 'created_at')
+)
+INTERVIEWS_PAGE_SIZE = 50
+INTERVIEWS_MAX_PAGE_SIZE = 200
+
+
+# Точные фильтры списка вакансий и карты (см. job_filters)
+JOB_FILTER_PARAMS = ('category', 'type', 'age_range', 'employer_id', 'is_premium', 'currency', 'salary_min', 'salary_max')
+
+# Ключ сортировки sort=salary: верхняя граница вилки, иначе нижняя;
+# вакансии без разобранной зарплаты идут последними. Индекс idx_jobs_salary_sort из V0021
+SALARY_SORT_SQL = "COALESCE(salary_max, salary_min, 0)"
+SALARY_MAX_VALUE = 999999999
+
+_SALARY_THOUSANDS_RE = re.compile(r'(?<=\d)[\s\u00a0]+(?=\d)')
+# Кандидат в зарплату: необязательная привязка ('от', 'до', 'зарплата', ...), знак валюты
+# перед числом, число или вилка, обозначение валюты после. Тот же шаблон в бэкфилле V0021
+_SALARY_CANDIDATE_RE = re.compile(
+    r'(?:(?<![а-яё])(от|до|зарплата|з/п|оплата|доход))?\s*:?\s*([$€])?\s*([0-9]+)'
+    r'(?:\s*(?:-|–|—|до)\s*([0-9]+))?\s*(₽|руб|р(?![а-яё])|\$|usd|€|eur)?'
+)
+SALARY_MIN_BARE_AMOUNT = 1000
+
+
+def parse_salary(text: str) -> Tuple[Optional[int], Optional[int], Optional[str]]:
+    '''
+    Числовая вилка из текстовой зарплаты: '25000 ₽', '20 000 - 30 000 руб',
+    'от 20000 ₽', 'до 40000 ₽', '$500', '2/2 смены, 30 000'. Число без валюты и привязки
+    принимается только от SALARY_MIN_BARE_AMOUNT, поэтому график ('2/2', '9-18') не
+    становится зарплатой. Возвращает (min, max, валюта); для неразобранного текста —
+    (None, None, None). Разбор повторяет бэкфилл V0021
+    '''
+    normalized = _SALARY_THOUSANDS_RE.sub('', (text or '').lower())
+    for match in _SALARY_CANDIDATE_RE.finditer(normalized):
+        anchor, currency_prefix, first, second, currency_suffix = match.groups()
+        if len(first) > 9 or (second and len(second) > 9):
+            continue
+        amounts = [int(first)] + ([int(second)] if second else [])
+        if anchor or currency_prefix or currency_suffix or max(amounts) >= SALARY_MIN_BARE_AMOUNT:
+            break
+    else:
+        return None, None, None
+
+    if second:
+        salary_min, salary_max = min(amounts), max(amounts)
+    elif anchor == 'до':
+        salary_min, salary_max = None, amounts[0]
+    elif anchor == 'от':
+        salary_min, salary_max = amounts[0], None
+    else:
+        salary_min = salary_max = amounts[0]
+
+    if '$' in normalized or 'usd' in normalized:
+        currency = 'USD'
+    elif '€' in normalized or 'eur' in normalized:
+        currency = 'EUR'
+    else:
+        currency = 'RUB'
+    return salary_min, salary_max, currency
+
+
+def job_from_row(row: Tuple) -> Dict[str, Any]:
+    '''
+    Преобразует строку из SELECT JOB_COLUMNS в объект вакансии для фронтенда
+    '''
+    coordinates = row[13] if row[13] and None not in row[13] else [56.0184, 92.8672]
+
+    return {
+        'id': row[0],
+        'title': row[1],
+        'company': row[2],
+        'location': row[3],
+        'type': row[4],
+        'salary': row[5],
+        'salaryMin': row[19],
+        'salaryMax': row[20],
+        'salaryCurrency': row[21],
+        'description': row[6],
+        'requirements': row[7] or [],
+        'employerId': row[8],
+        'employerEmail': row[9],
+        'postedDate': row[10].isoformat() if row[10] else None,
+        'ageRange': row[11] or '14-17',
+        'category': row[12] or 'Работа с людьми',
+        'coordinates': coordinates,
+        'isPremium': row[14] or False,
+        'responsibilities': row[15] or [],
+        'conditions': row[16] or [],
+        'contact': {
+            'phone': row[17] or '+7 (391) 234-56-78',
+            'email': row[18] or 'hr@company.ru'
+        }
+    }
+
+
+# Совпадение по морфологии (GIN по search_vector) или по триграммам
+# названия и компании (GIN gin_trgm_ops) для запросов с опечатками; параметры — q, q.lower()
+JOB_SEARCH_FILTER_SQL = "(search_vector @@ websearch_to_tsquery('russian', %s) OR %s <%% search_text)"
+
+
+def job_filters(query_params: Dict[str, str]) -> Tuple[List[str], List[Any]]:
+    '''
+    Условия WHERE по фильтрам JOB_FILTER_PARAMS. salary_min оставляет вакансии,
+    чья вилка достигает суммы, salary_max — начинающиеся не выше неё;
+    некорректная сумма — ValueError
+    '''
+    filters = []
+    params: List[Any] = []
+    for param_name in ('category', 'type', 'age_range', 'employer_id'):
+        value = query_params.get(param_name, '')
+        if value:
+            filters.append(f"{param_name} = %s")
+            params.append(value)
+
+    is_premium = query_params.get('is_premium', '')
+    if is_premium:
+        filters.append("is_premium = %s")
+        params.append(is_premium.lower() in ('true', '1'))
+
+    currency = query_params.get('currency', '')
+    if currency:
+        filters.append("salary_currency = %s")
+        params.append(currency.upper())
+
+    for param_name, condition in (('salary_min', f"{SALARY_SORT_SQL} >= %s"),
+                                  ('salary_max', "COALESCE(salary_min, salary_max) <= %s")):
+        value = query_params.get(param_name, '')
+        if value:
+            if not value.isdigit() or int(value) > SALARY_MAX_VALUE:
+                raise ValueError('Invalid salary_min or salary_max')
+            filters.append(condition)
+            params.append(int(value))
+    return filters, params
+
+
+def fetch_jobs_by_ids(cur: Any, job_ids: List[str], fields: Any = None) -> Tuple[List[Dict[str, Any]], List[str], Any]:
+    '''
+    Вакансии по первичному ключу в порядке запроса (только поля fields, если заданы):
+    найденные, ненайденные id и самый поздний updated_at среди найденных (для Last-Modified)
+    '''
+    execute_prepared(cur, 'jobs_by_id', f"""
+        SELECT {job_columns(fields)}, COALESCE(updated_at, created_at)
+        FROM t_p86122027_youth_job_portal.jobs
+        WHERE id = ANY(%s)
+    """, (job_ids,))
+    rows = {row[0]: row for row in cur.fetchall()}
+
+    jobs = [project_fields(job_from_row(rows[job_id]), fields) for job_id in job_ids if job_id in rows]
+    missing = [job_id for job_id in job_ids if job_id not in rows]
+    modified = max((row[22] for row in rows.values() if row[22]), default=None)
+    return jobs, missing, modified
+
+
+def encode_cursor(created_at: datetime, row_id: Any) -> str:
+    '''
+    Непрозрачный курсор keyset-пагинации: позиция (created_at, id) последней строки страницы
+    '''
+    raw = json.dumps([created_at.isoformat(), str(row_id)])
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        return datetime.fromisoformat(created_at), str(row_id)
+    except Exception:
+        raise ValueError(f'Invalid cursor: {cursor}')
+
+
+def encode_score_cursor(score: float, row_id: Any) -> str:
+    '''
+    Курсор ранжированной выдачи (поиск, расстояние): позиция (score, id);
+    score — float8, JSON сохраняет его точно
+    '''
+    raw = json.dumps([score, str(row_id)])
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_score_cursor(cursor: str) -> Tuple[float, str]:
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        score, row_id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        return float(score), str(row_id)
+    except Exception:
+        raise ValueError(f'Invalid cursor: {cursor}')
+
+
+JOBS_DEFAULT_RADIUS_KM = 10.0
+JOBS_MAX_RADIUS_KM = 200.0
+KM_PER_DEGREE = 111.32
+
+# Расстояние по большому кругу (гаверсинус) от точки (%s lat, %s lat, %s lon) до вакансии, км
+DISTANCE_KM_SQL = """(2 * 6371.0 * asin(sqrt(
+                                       power(sin(radians(lat - %s) / 2), 2)
+                                       + cos(radians(%s)) * cos(radians(lat)) * power(sin(radians(lon - %s) / 2), 2)
+                                   )))"""
+
+
+def _parse_floats(raw: str, count: int) -> List[float]:
+    values = [float(value) for value in raw.split(',')]
+    if len(values) != count or any(value != value or value in (float('inf'), float('-inf')) for value in values):
+        raise ValueError
+    return values
+
+
+def parse_geo_params(query_params: Dict[str, str]) -> Tuple[Any, Any, Any]:
+    '''
+    near=lat,lon [&radius_km=] и bbox=south,west,north,east -> (origin, bbox, radius_km).
+    Без near расстояние считается от центра bbox; радиус по умолчанию — только для near без bbox
+    '''
+    origin = bbox = radius_km = None
+    try:
+        if query_params.get('bbox'):
+            bbox = _parse_floats(query_params['bbox'], 4)
+            south, west, north, east = bbox
+            if not (-90 <= south <= north <= 90 and -180 <= west <= east <= 180):
+                raise ValueError
+            origin = ((south + north) / 2, (west + east) / 2)
+        if query_params.get('near'):
+            origin = tuple(_parse_floats(query_params['near'], 2))
+            if not (-90 <= origin[0] <= 90 and -180 <= origin[1] <= 180):
+                raise ValueError
+            if query_params.get('radius_km') or not bbox:
+                radius_km = float(query_params.get('radius_km') or JOBS_DEFAULT_RADIUS_KM)
+                if not 0 < radius_km <= JOBS_MAX_RADIUS_KM:
+                    raise ValueError
+    except ValueError:
+        raise ValueError(f'Invalid near, radius_km (0-{JOBS_MAX_RADIUS_KM:g}) or bbox (south,west,north,east)')
+    return origin, bbox, radius_km
+
+
+def radius_bbox(origin: Tuple[float, float], radius_km: float) -> List[float]:
+    '''
+    Прямоугольник (south, west, north, east), описанный вокруг круга радиуса radius_km
+    '''
+    lat, lon = origin
+    delta_lat = radius_km / KM_PER_DEGREE
+    delta_lon = radius_km / (KM_PER_DEGREE * max(math.cos(math.radians(lat)), 0.01))
+    return [max(lat - delta_lat, -90.0), max(lon - delta_lon, -180.0),
+            min(lat + delta_lat, 90.0), min(lon + delta_lon, 180.0)]
+
+
+def get_header(event: Dict[str, Any], name: str) -> str:
+    headers = event.get('headers') or {}
+    name = name.lower()
+    for key, value in headers.items():
+        if key.lower() == name:
+            return value or ''
+    return ''
+
+
+def version_headers(name: str, version: Any, updated_at: Any, query_params: Dict[str, str]) -> Tuple[str, str]:
+    '''
+    ETag и Last-Modified из версии данных и хеша параметров запроса
+    '''
+    params_key = '&'.join(f"{key}={query_params[key]}" for key in sorted(query_params))
+    etag = f'"{name}-{version}-{zlib.crc32(params_key.encode("utf-8")):08x}"'
+    if updated_at and not updated_at.tzinfo:
+        updated_at = updated_at.replace(tzinfo=timezone.utc)
+    last_modified = format_datetime(updated_at.astimezone(timezone.utc), usegmt=True) if updated_at else ''
+    return etag, last_modified
+
+
+def resource_version(cur: Any, table: str, query_params: Dict[str, str]) -> Tuple[str, str]:
+    '''
+    Дешёвая версия ответа для условного GET: счётчик изменений таблицы
+    (поддерживается триггерами из V0013) плюс хеш параметров запроса.
+    Остался у редко изменяемых jobs и interviews; сообщения и отклики
+    версионируются по своей выборке (conversation_version, applications_version)
+    '''
+    execute_prepared(cur, 'table_version', """
+        SELECT version, updated_at FROM t_p86122027_youth_job_portal.table_versions
+        WHERE table_name = %s
+    """, (table,))
+    row = cur.fetchone()
+    version, updated_at = row if row else (0, None)
+    return version_headers(table, version, updated_at, query_params)
+
+
+# Текстовые user_id (applications, conversations) сопоставляются с users.id SERIAL по первичному ключу
+USER_ID_JOIN_SQL = "CASE WHEN {column} ~ '^[0-9]{{1,9}}$' THEN {column}::int END"
+USER_ID_MAX = 2147483647
+
+
+def is_user_id(value: Any) -> bool:
+    '''
+    Может ли значение быть users.id: SERIAL — это int4, больший id вызвал бы
+    в запросе "integer out of range"
+    '''
+    value = str(value)
+    return value.isascii() and value.isdigit() and int(value) <= USER_ID_MAX
+
+
+def timestamp_version(value: Any) -> int:
+    return int(value.timestamp() * 1000000) if value else 0
+
+
+def conversation_version(cur: Any, user_id: str, partner_id: str, job_id: str,
+                         query_params: Dict[str, str]) -> Tuple[str, str]:
+    '''
+    Версия переписки (или списка переписок пользователя без partner_id) по строкам
+    сводки: любая запись в переписку выдаёт строке новый номер из conversation_version_seq (V0026)
+    '''
+    if partner_id:
+        user_a, user_b, conv_job_id = conversation_key(user_id, partner_id, job_id)
+        execute_prepared(cur, 'conversation_version', f"""
+            SELECT COUNT(*), COALESCE(MAX(version), 0), MAX(changed_at)
+            FROM t_p86122027_youth_job_portal.conversations
+            WHERE user_a = %s AND user_b = %s {'AND job_id = %s' if job_id else ''}
+        """, [user_a, user_b] + ([conv_job_id] if job_id else []))
+        count, version, changed_at = cur.fetchone()
+        return version_headers('messages', f"{count}.{version}", changed_at, query_params)
+
+    # Список встраивает профили собеседников (otherUser), поэтому их правки тоже меняют версию
+    execute_prepared(cur, 'conversations_list_version', f"""
+        SELECT COUNT(*), COALESCE(MAX(scoped.version), 0), MAX(scoped.changed_at), MAX(u.updated_at) FROM (
+            SELECT version, changed_at, user_b AS other_user_id FROM t_p86122027_youth_job_portal.conversations
+            WHERE user_a = %s
+            UNION ALL
+            SELECT version, changed_at, user_a FROM t_p86122027_youth_job_portal.conversations
+            WHERE user_b = %s AND user_a <> %s
+        ) scoped
+        LEFT JOIN t_p86122027_youth_job_portal.users u ON u.id = {USER_ID_JOIN_SQL.format(column='scoped.other_user_id')}
+    """, (user_id, user_id, user_id))
+    count, version, changed_at, users_updated_at = cur.fetchone()
+    return version_headers('messages', f"{count}.{version}.{timestamp_version(users_updated_at)}",
+                           max(filter(None, [changed_at, users_updated_at]), default=None), query_params)
+
+
+def applications_version(cur: Any, filters: List[str], params: List[Any],
+                         query_params: Dict[str, str]) -> Tuple[str, str]:
+    '''
+    Версия откликов в области запроса: число строк и последний updated_at
+    (вставка и изменение сдвигают время, удаление — число), а также последний
+    updated_at профилей кандидатов, которые ответ подставляет из users
+    '''
+    execute_prepared(cur, 'applications_version', f"""
+        SELECT COUNT(*), MAX(COALESCE(a.updated_at, a.created_at)), MAX(u.updated_at)
+        FROM (
+            SELECT user_id, updated_at, created_at
+            FROM t_p86122027_youth_job_portal.applications
+            WHERE {' AND '.join(filters)}
+        ) a
+        LEFT JOIN t_p86122027_youth_job_portal.users u ON u.id = {USER_ID_JOIN_SQL.format(column='a.user_id')}
+    """, params)
+    count, updated_at, users_updated_at = cur.fetchone()
+    version = f"{count}.{timestamp_version(updated_at)}.{timestamp_version(users_updated_at)}"
+    return version_headers('applications', version,
+                           max(filter(None, [updated_at, users_updated_at]), default=None), query_params)
+
+
+def etag_matches(event: Dict[str, Any], etag: str) -> bool:
+    if_none_match = get_header(event, 'If-None-Match')
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    return etag in [tag.strip().removeprefix('W/') for tag in if_none_match.split(',')]
+
+
+def dump_json(data: Any) -> str:
+    '''
+    Тело ответа в JSON: orjson, если установлен, иначе json с кириллицей в UTF-8
+    (вдвое короче escape-последовательностей) и без лишних пробелов
+    '''
+    if orjson:
+        return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS).decode('utf-8')
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+
+
+COMPRESSION_MIN_BYTES = 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+
+def accepted_encoding(event: Dict[str, Any]) -> str:
+    '''
+    Кодировка сжатия из Accept-Encoding: br (если доступен brotli), затем gzip;
+    q=0 исключает кодировку, '' — без сжатия
+    '''
+    accepted = {}
+    for part in get_header(event, 'Accept-Encoding').split(','):
+        name, _, params = part.strip().partition(';')
+        quality = 1.0
+        if params.strip().startswith('q='):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+
+    for encoding in (['br'] if brotli else []) + ['gzip']:
+        if accepted.get(encoding, accepted.get('*', 0)) > 0:
+            return encoding
+    return ''
+
+
+def compress_response(event: Dict[str, Any], response: Dict[str, Any]) -> Dict[str, Any]:
+    '''
+    Сжимает JSON-ответ больше COMPRESSION_MIN_BYTES по Accept-Encoding; платформа
+    передаёт двоичное тело в base64 с isBase64Encoded. ETag сжатого ответа
+    становится слабым: байты зависят от кодировки, содержимое — нет
+    '''
+    headers = response.get('headers') or {}
+    body = response.get('body')
+    if response.get('isBase64Encoded') or not isinstance(body, str) \
+            or not headers.get('Content-Type', '').startswith('application/json'):
+        return response
+
+    headers = {**headers, 'Vary': 'Accept-Encoding'}
+    encoding = accepted_encoding(event)
+    raw = body.encode('utf-8')
+    if not encoding or len(raw) < COMPRESSION_MIN_BYTES:
+        return {**response, 'headers': headers}
+
+    if encoding == 'br':
+        compressed = brotli.compress(raw, quality=BROTLI_QUALITY)
+    else:
+        compressed = gzip.compress(raw, compresslevel=GZIP_LEVEL, mtime=0)
+    if len(compressed) >= len(raw):
+        return {**response, 'headers': headers}
+
+    headers['Content-Encoding'] = encoding
+    if headers.get('ETag', '').startswith('"'):
+        headers['ETag'] = 'W/' + headers['ETag']
+    return {
+        **response,
+        'headers': headers,
+        'body': base64.b64encode(compressed).decode('ascii'),
+        'isBase64Encoded': True
+    }
+
+
+def cache_headers(etag: str, last_modified: str) -> Dict[str, str]:
+    headers = {
+        'ETag': etag,
+        'Cache-Control': 'no-cache',
+        'Access-Control-Expose-Headers': 'ETag, Last-Modified'
+    }
+    if last_modified:
+        headers['Last-Modified'] = last_modified
+    return headers
+
+
+def not_modified_response(cors_headers: Dict[str, str], etag: str, last_modified: str) -> Dict[str, Any]:
+    return {
+        'statusCode': 304,
+        'headers': {**cors_headers, **cache_headers(etag, last_modified)},
+        'body': '',
+        'isBase64Encoded': False
+    }
+
+
+MESSAGES_PAGE_SIZE = 100
+MESSAGES_MAX_PAGE_SIZE = 500
+
+MESSAGE_COLUMNS = "id, sender_id, receiver_id, job_id, message_text, is_read, created_at"
+
+
+def message_from_row(row: Tuple) -> Dict[str, Any]:
+    return {
+        'id': str(row[0]),
+        'senderId': str(row[1]),
+        'receiverId': str(row[2]),
+        'jobId': str(row[3]) if row[3] else None,
+        'messageText': row[4],
+        'isRead': row[5],
+        'createdAt': row[6].isoformat() if row[6] else None
+    }
+
+
+# Long-poll для сообщений: ожидающие запросы спят на локальном хабе событий.
+# В режиме 'postgres' хаб дополнительно питается фоновым LISTEN на канал,
+# в который пишет триггер из V0015; режим 'local' оставляет только
+# внутрипроцессные события (для тестов и локального запуска).
+# Тот же слушатель принимает сигналы сброса кэша вакансий (V0018)
+MESSAGE_EVENTS_BACKEND = os.environ.get('MESSAGE_EVENTS_BACKEND', 'postgres')
+MESSAGE_EVENTS_CHANNEL = 'message_events'
+CACHE_INVALIDATION_CHANNEL = 'cache_invalidation'
+LONG_POLL_MAX_WAIT = 25.0
+LONG_POLL_RECHECK_INTERVAL = 5.0
+
+_message_events = threading.Condition()
+_message_event_seq = 0
+_message_event_log: Deque[Tuple[int, frozenset]] = deque(maxlen=1000)
+_message_listener: Any = None
+_listener_ready = threading.Event()
+
+
+def publish_message_event(user_ids: List[str]) -> None:
+    global _message_event_seq
+    with _message_events:
+        _message_event_seq += 1
+        _message_event_log.append((_message_event_seq, frozenset(str(u) for u in user_ids)))
+        _message_events.notify_all()
+
+
+def current_message_event_seq() -> int:
+    with _message_events:
+        return _message_event_seq
+
+
+def wait_for_message_event(user_id: str, after_seq: int, timeout: float) -> int:
+    '''
+    Ждёт события с участием user_id новее after_seq; возвращает номер
+    последнего просмотренного события (равен after_seq, если ничего не пришло)
+    '''
+    deadline = time.monotonic() + timeout
+    with _message_events:
+        while True:
+            for seq, users in _message_event_log:
+                if seq > after_seq and user_id in users:
+                    return _message_event_seq
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return after_seq
+            _message_events.wait(remaining)
+
+
+def _listen_for_message_events() -> None:
+    while True:
+        try:
+            listener = psycopg2.connect(os.environ.get('DATABASE_URL'))
+            listener.autocommit = True
+            listener.cursor().execute(f"LISTEN {MESSAGE_EVENTS_CHANNEL}; LISTEN {CACHE_INVALIDATION_CHANNEL}")
+            # Пока слушателя не было, сигналы сброса могли потеряться
+            invalidate_jobs_cache()
+            mark_revoked_sessions_stale()
+            _listener_ready.set()
+            while True:
+                if select.select([listener], [], [], 60) == ([], [], []):
+                    continue
+                listener.poll()
+                while listener.notifies:
+                    notify = listener.notifies.pop(0)
+                    if notify.channel == CACHE_INVALIDATION_CHANNEL:
+                        if notify.payload == 'jobs':
+                            invalidate_jobs_cache()
+                        elif notify.payload == 'revoked_sessions':
+                            mark_revoked_sessions_stale()
+                        continue
+                    try:
+                        payload = json.loads(notify.payload)
+                    except ValueError:
+                        continue
+                    publish_message_event([payload.get('sender_id', ''), payload.get('receiver_id', '')])
+        except Exception as e:
+            _listener_ready.clear()
+            print(f"Message listener error: {str(e)}")
+            time.sleep(1)
+
+
+def ensure_message_listener() -> None:
+    global _message_listener
+    if MESSAGE_EVENTS_BACKEND != 'postgres':
+        return
+    with _message_events:
+        if _message_listener is None or not _message_listener.is_alive():
+            _message_listener = threading.Thread(target=_listen_for_message_events, daemon=True)
+            _message_listener.start()
+
+
+# Кэш сериализованных ответов списка вакансий (включая страницы) на экземпляр функции.
+# Запись помнит поколение кэша и ETag (версию table_versions). Свои записи сбрасывают
+# кэш сразу, чужие экземпляры — через NOTIFY из V0018. Пока слушатель подключён,
+# попадание отдаётся без обращения к БД; без него (режим 'local') попадание
+# сверяется с дешёвым счётчиком table_versions
+JOBS_CACHE_TTL = float(os.environ.get('JOBS_CACHE_TTL', '30'))
+JOBS_CACHE_MAX_ENTRIES = 1024
+JOBS_CACHE_MAX_BYTES = 8 * 1024 * 1024
+
+_jobs_cache_lock = threading.Lock()
+_jobs_cache: 'OrderedDict[str, Tuple[int, float, str, str, str]]' = OrderedDict()
+_jobs_cache_bytes = 0
+_jobs_cache_generation = 0
+jobs_cache_stats = {'hits': 0, 'misses': 0, 'stores': 0, 'evictions': 0, 'invalidations': 0}
+
+
+def jobs_cache_key(query_params: Dict[str, str]) -> str:
+    return '&'.join(f"{key}={query_params[key]}" for key in sorted(query_params))
+
+
+def jobs_cache_generation() -> int:
+    with _jobs_cache_lock:
+        return _jobs_cache_generation
+
+
+def invalidate_jobs_cache() -> None:
+    global _jobs_cache_bytes, _jobs_cache_generation
+    with _jobs_cache_lock:
+        _jobs_cache_generation += 1
+        _jobs_cache.clear()
+        _jobs_cache_bytes = 0
+        jobs_cache_stats['invalidations'] += 1
+
+
+def jobs_cache_get(key: str, etag: str = '') -> Any:
+    '''
+    Возвращает (etag, last_modified, body) или None; при переданном etag
+    запись годится только для той же версии таблицы
+    '''
+    with _jobs_cache_lock:
+        entry = _jobs_cache.get(key)
+        if entry and entry[0] == _jobs_cache_generation and time.monotonic() - entry[1] < JOBS_CACHE_TTL \
+                and (not etag or entry[2] == etag):
+            _jobs_cache.move_to_end(key)
+            jobs_cache_stats['hits'] += 1
+            return entry[2:]
+        jobs_cache_stats['misses'] += 1
+        return None
+
+
+def jobs_cache_put(key: str, generation: int, etag: str, last_modified: str, body: str) -> None:
+    '''
+    Сохраняет ответ, если с момента начала чтения (generation) не было записей в jobs
+    '''
+    global _jobs_cache_bytes
+    if len(body) > JOBS_CACHE_MAX_BYTES:
+        return
+    with _jobs_cache_lock:
+        if generation != _jobs_cache_generation:
+            return
+        old = _jobs_cache.pop(key, None)
+        if old:
+            _jobs_cache_bytes -= len(old[4])
+        _jobs_cache[key] = (generation, time.monotonic(), etag, last_modified, body)
+        _jobs_cache_bytes += len(body)
+        jobs_cache_stats['stores'] += 1
+        while len(_jobs_cache) > JOBS_CACHE_MAX_ENTRIES or _jobs_cache_bytes > JOBS_CACHE_MAX_BYTES:
+            _, evicted = _jobs_cache.popitem(last=False)
+            _jobs_cache_bytes -= len(evicted[4])
+            jobs_cache_stats['evictions'] += 1
+
+
+def get_jobs_cache_stats() -> Dict[str, int]:
+    with _jobs_cache_lock:
+        return {**jobs_cache_stats, 'entries': len(_jobs_cache), 'bytes': _jobs_cache_bytes}
+
+
+def cached_jobs_response(event: Dict[str, Any], query_params: Dict[str, str],
+                         cors_headers: Dict[str, str]) -> Any:
+    '''
+    Ответ на GET списка вакансий прямо из кэша, без соединения с БД; None — идти в БД
+    '''
+    if query_params.get('id') or query_params.get('ids') or query_params.get('mode'):
+        return None
+    ensure_message_listener()
+    if not _listener_ready.is_set():
+        return None
+    cached = jobs_cache_get(jobs_cache_key(query_params))
+    if not cached:
+        return None
+    etag, last_modified, body = cached
+    if etag_matches(event, etag):
+        return not_modified_response(cors_headers, etag, last_modified)
+    return {
+        'statusCode': 200,
+        'headers': {**cors_headers, 'Content-Type': 'application/json', **cache_headers(etag, last_modified)},
+        'body': body,
+        'isBase64Encoded': False
+    }
+
+
+# Кластеры для карты (?resource=jobs&mode=clusters&bbox=...&zoom=...): сетка в тайлах
+# Web Mercator, каждый тайл делится на 2^JOBS_CLUSTER_CELL_BITS ячеек по стороне.
+# Содержимое тайла кэшируется в кэше вакансий (ключ — тайл и фильтры, версия — счётчик jobs),
+# поэтому сдвиг карты пересчитывает только новые тайлы
+JOBS_CLUSTER_CELL_BITS = 2
+JOBS_CLUSTER_POINTS_ZOOM = 15
+JOBS_CLUSTER_MAX_ZOOM = 20
+JOBS_CLUSTER_MAX_TILES = 64
+MERCATOR_MAX_LAT = 85.0511
+
+MERCATOR_X_SQL = "floor((lon + 180.0) / 360.0 * %s)::bigint"
+MERCATOR_Y_SQL = f"""floor((1 - asinh(tan(radians(LEAST(GREATEST(lat, -{MERCATOR_MAX_LAT}), {MERCATOR_MAX_LAT})))) / pi())
+                                / 2 * %s)::bigint"""
+
+
+def tile_xy(lat: float, lon: float, zoom: int) -> Tuple[int, int]:
+    n = 2 ** zoom
+    lat = max(min(lat, MERCATOR_MAX_LAT), -MERCATOR_MAX_LAT)
+    x = int((lon + 180.0) / 360.0 * n)
+    y = int((1 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+
+def viewport_tiles(bbox: List[float], zoom: int) -> Tuple[int, List[Tuple[int, int]]]:
+    '''
+    Тайлы области (south, west, north, east); если их больше JOBS_CLUSTER_MAX_TILES,
+    масштаб огрубляется, пока область не уложится в лимит. Возвращает итоговый масштаб и тайлы
+    '''
+    while True:
+        west_x, north_y = tile_xy(bbox[2], bbox[1], zoom)
+        east_x, south_y = tile_xy(bbox[0], bbox[3], zoom)
+        if (east_x - west_x + 1) * (south_y - north_y + 1) <= JOBS_CLUSTER_MAX_TILES or zoom == 0:
+            return zoom, [(x, y) for x in range(west_x, east_x + 1) for y in range(north_y, south_y + 1)]
+        zoom -= 1
+
+
+def tile_bounds(x: int, y: int, zoom: int) -> List[float]:
+    '''
+    Границы тайла (south, west, north, east) в градусах
+    '''
+    n = 2 ** zoom
+    north = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y / n))))
+    south = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * (y + 1) / n))))
+    return [south, x / n * 360.0 - 180.0, north, (x + 1) / n * 360.0 - 180.0]
+
+
+def load_cluster_tiles(cur: Any, tiles: List[Tuple[int, int]], zoom: int,
+                       filters: List[str], params: List[Any]) -> Dict[Tuple[int, int], List[Dict[str, Any]]]:
+    '''
+    Одним запросом по прямоугольнику, описанному вокруг тайлов (GiST point(lon, lat)):
+    на крупном масштабе — точки вакансий, иначе — ячейки сетки с числом вакансий и центроидом
+    '''
+    bounds = [tile_bounds(x, y, zoom) for x, y in tiles]
+    box = [min(b[0] for b in bounds), min(b[1] for b in bounds), max(b[2] for b in bounds), max(b[3] for b in bounds)]
+    where_clause = ' AND '.join(filters + ["point(lon, lat) <@ box(point(%s, %s), point(%s, %s))"])
+    where_params = params + [box[1], box[0], box[3], box[2]]
+    result: Dict[Tuple[int, int], List[Dict[str, Any]]] = {tile: [] for tile in tiles}
+
+    if zoom >= JOBS_CLUSTER_POINTS_ZOOM:
+        execute_prepared(cur, 'jobs_map_points', f"""
+            SELECT id, title, company, location, type, salary, category, is_premium, lat, lon,
+                   {MERCATOR_X_SQL}, {MERCATOR_Y_SQL}
+            FROM t_p86122027_youth_job_portal.jobs
+            WHERE {where_clause}
+        """, [2 ** zoom, 2 ** zoom] + where_params)
+        for row in cur.fetchall():
+            tile = (row[10], row[11])
+            if tile in result:
+                result[tile].append({
+                    'id': row[0], 'title': row[1], 'company': row[2], 'location': row[3],
+                    'type': row[4], 'salary': row[5], 'category': row[6], 'isPremium': row[7] or False,
+                    'coordinates': [row[8], row[9]]
+                })
+        return result
+
+    cells = 2 ** (zoom + JOBS_CLUSTER_CELL_BITS)
+    execute_prepared(cur, 'jobs_map_clusters', f"""
+        SELECT cell_x, cell_y, COUNT(*), AVG(lat), AVG(lon), MIN(id)
+        FROM (
+            SELECT id, lat, lon, {MERCATOR_X_SQL} AS cell_x, {MERCATOR_Y_SQL} AS cell_y
+            FROM t_p86122027_youth_job_portal.jobs
+            WHERE {where_clause}
+        ) cells
+        GROUP BY cell_x, cell_y
+    """, [cells, cells] + where_params)
+    for cell_x, cell_y, count, lat, lon, first_id in cur.fetchall():
+        tile = (cell_x >> JOBS_CLUSTER_CELL_BITS, cell_y >> JOBS_CLUSTER_CELL_BITS)
+        if tile in result:
+            cluster = {'coordinates': [round(lat, 6), round(lon, 6)], 'count': count}
+            if count == 1:
+                cluster['jobId'] = first_id
+            result[tile].append(cluster)
+    return result
+
+
+RECOMMENDATIONS_POOL_SIZE = 500
+RECOMMENDATIONS_ANY_CATEGORY = '*'
+# Вес совпадения с категорией теста, доли прошлых откликов в категории
+# и близости (1 на месте, 0.5 в RECOMMENDATIONS_DISTANCE_KM от точки near)
+RECOMMENDATION_TEST_WEIGHT = 2.0
+RECOMMENDATION_HISTORY_WEIGHT = 1.0
+RECOMMENDATIONS_DISTANCE_KM = 5.0
+
+
+def parse_age_range(age_range: str) -> Tuple[int, int]:
+    '''
+    Границы возраста из age_range вакансии ('14-17', '16+'); без чисел — любые
+    '''
+    numbers = [int(n) for n in re.findall(r'\d+', age_range or '')]
+    if not numbers:
+        return 0, 200
+    return numbers[0], numbers[1] if len(numbers) > 1 else 200
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    # Та же формула, что DISTANCE_KM_SQL
+    a = math.sin(math.radians(lat2 - lat1) / 2) ** 2 \
+        + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(math.radians(lon2 - lon1) / 2) ** 2
+    return 2 * 6371.0 * math.asin(math.sqrt(a))
+
+
+def load_recommendation_pool(cur: Any, category: str, jobs_version: str) -> List[List[Any]]:
+    '''
+    Предрассчитанный рейтинг вакансий категории (или всех, RECOMMENDATIONS_ANY_CATEGORY):
+    [id, category, age_min, age_max, lat, lon, базовый балл] по убыванию балла.
+    Базовый балл — премиум плюс свежесть (1 для новой, 0.5 через 30 дней).
+    Хранится в кэше вакансий под версией таблицы jobs, поэтому пересчитывается
+    после любого изменения вакансий
+    '''
+    cache_key = f"recommendations:{category}"
+    cached = jobs_cache_get(cache_key, jobs_version)
+    if cached:
+        return json.loads(cached[2])
+
+    generation = jobs_cache_generation()
+    execute_prepared(cur, 'recommendation_pool', """
+        SELECT id, category, age_range, lat, lon,
+               (CASE WHEN is_premium THEN 0.5 ELSE 0 END
+                + 1.0 / (1 + EXTRACT(EPOCH FROM NOW() - COALESCE(created_at, NOW())) / 2592000.0))::float8 AS base
+        FROM t_p86122027_youth_job_portal.jobs
+        WHERE %s = %s OR category = %s
+        ORDER BY base DESC, id DESC
+        LIMIT %s
+    """, (category, RECOMMENDATIONS_ANY_CATEGORY, category, RECOMMENDATIONS_POOL_SIZE))
+    pool = [[row[0], row[1], *parse_age_range(row[2]), row[3], row[4], row[5]] for row in cur.fetchall()]
+    jobs_cache_put(cache_key, generation, jobs_version, '', json.dumps(pool))
+    return pool
+
+
+def rank_recommendations(pools: List[List[List[Any]]], test_result: str, age: Any,
+                         applied: Dict[str, str], origin: Any) -> List[Tuple[float, str]]:
+    '''
+    Персональный рейтинг поверх предрассчитанных пулов: базовый балл, совпадение
+    с результатом теста, доля прошлых откликов в той же категории и близость к near.
+    Вакансии, на которые уже есть отклик, и неподходящие по возрасту отбрасываются.
+    Возвращает [(балл, id)] по убыванию
+    '''
+    history = {}
+    for category in applied.values():
+        if category:
+            history[category] = history.get(category, 0) + 1 / len(applied)
+
+    ranked = {}
+    for pool in pools:
+        for job_id, category, age_min, age_max, lat, lon, base in pool:
+            if job_id in ranked or job_id in applied or (age is not None and not age_min <= age <= age_max):
+                continue
+            score = base + RECOMMENDATION_HISTORY_WEIGHT * history.get(category, 0)
+            if test_result and category == test_result:
+                score += RECOMMENDATION_TEST_WEIGHT
+            if origin:
+                score += 1 / (1 + haversine_km(origin[0], origin[1], lat, lon) / RECOMMENDATIONS_DISTANCE_KM)
+            ranked[job_id] = round(score, 6)
+    return sorted(((score, job_id) for job_id, score in ranked.items()), reverse=True)
+
+
+EMPLOYER_UPCOMING_INTERVIEWS = 10
+EMPLOYER_MAX_UPCOMING_INTERVIEWS = 100
+
+
+def parse_since(raw: str) -> Any:
+    '''
+    Момент последнего визита (ISO 8601) как naive UTC, в котором хранятся created_at; '' — None
+    '''
+    if not raw:
+        return None
+    try:
+        since = datetime.fromisoformat(raw.replace('Z', '+00:00'))
+    except ValueError:
+        raise ValueError('since must be an ISO 8601 timestamp')
+    return since.astimezone(timezone.utc).replace(tzinfo=None) if since.tzinfo else since
+
+
+def load_employer_stats(cur: Any, employer_filter: str, employer_params: List[Any],
+                        since: Any, upcoming_limit: int) -> Dict[str, Any]:
+    '''
+    Сводка для кабинета работодателя двумя агрегирующими запросами: отклики по вакансиям
+    и статусам (всего и новые после since) и собеседования (всего, предстоящие и ближайшие).
+    employer_filter — условие по вакансиям j
+    '''
+    execute_prepared(cur, 'employer_stats_applications', f"""
+        SELECT j.id, j.title, a.status, COUNT(a.id), COUNT(a.id) FILTER (WHERE a.created_at > %s)
+        FROM t_p86122027_youth_job_portal.jobs j
+        LEFT JOIN t_p86122027_youth_job_portal.applications a ON a.job_id = j.id
+        WHERE {employer_filter}
+        GROUP BY j.id, j.title, a.status
+        ORDER BY MAX(j.created_at) DESC, j.id
+    """, [since] + employer_params)
+
+    jobs: Dict[str, Dict[str, Any]] = {}
+    totals: Dict[str, Any] = {'jobs': 0, 'applications': 0, 'new': 0, 'byStatus': {}}
+    for job_id, title, status, count, new_count in cur.fetchall():
+        job = jobs.get(job_id)
+        if not job:
+            job = jobs[job_id] = {'jobId': job_id, 'title': title, 'applications': 0, 'new': 0, 'byStatus': {}}
+            totals['jobs'] += 1
+        if count:
+            status = status or 'pending'
+            job['applications'] += count
+            job['new'] += new_count
+            job['byStatus'][status] = job['byStatus'].get(status, 0) + count
+            totals['applications'] += count
+            totals['new'] += new_count
+            totals['byStatus'][status] = totals['byStatus'].get(status, 0) + count
+
+    execute_prepared(cur, 'employer_stats_interviews', f"""
+        SELECT i.id, i.job_id, i.job_title, i.user_id, i.user_name, i.interview_date, i.location,
+               COUNT(*) OVER ()
+        FROM t_p86122027_youth_job_portal.interviews i
+        JOIN t_p86122027_youth_job_portal.jobs j ON j.id = i.job_id
+        WHERE {employer_filter} AND i.interview_date >= NOW()
+        ORDER BY i.interview_date, i.id
+        LIMIT %s
+    """, employer_params + [upcoming_limit])
+    rows = cur.fetchall()
+    upcoming = [{
+        'id': row[0],
+        'jobId': str(row[1]),
+        'jobTitle': row[2],
+        'userId': str(row[3]),
+        'userName': row[4],
+        'date': row[5].isoformat() if row[5] else None,
+        'location': row[6]
+    } for row in rows]
+
+    execute_prepared(cur, 'employer_stats_interview_count', f"""
+        SELECT COUNT(*)
+        FROM t_p86122027_youth_job_portal.interviews i
+        JOIN t_p86122027_youth_job_portal.jobs j ON j.id = i.job_id
+        WHERE {employer_filter}
+    """, employer_params)
+
+    return {
+        'totals': totals,
+        'jobs': list(jobs.values()),
+        'interviews': {
+            'total': cur.fetchone()[0],
+            'upcoming': rows[0][7] if rows else 0,
+            'next': upcoming
+        }
+    }
+
+
+def message_cursor_filter(cur: Any, after_id: str, after_created_at: Any, since: Any) -> Tuple[str, List[Any]]:
+    '''
+    Условие "после курсора клиента". Курсор (after_created_at, after_id) сравнивается
+    без обращения к строке-якорю; если клиент прислал только after_id, якорь ищем,
+    а удалённый якорь заменяем на since — иначе сравнение с NULL остановит чат
+    '''
+    if after_id and not after_created_at:
+        execute(cur, 'message_cursor_anchor', """
+            SELECT created_at FROM t_p86122027_youth_job_portal.messages WHERE id = %s::uuid
+        """, (after_id,))
+        row = cur.fetchone()
+        after_created_at = row[0] if row else None
+    if after_id and after_created_at:
+        return "(created_at, id) > (%s, %s::uuid)", [after_created_at, after_id]
+    if since:
+        return "created_at > %s", [since]
+    return "TRUE", []
+
+
+def has_new_messages(cur: Any, user_id: str, partner_id: str, job_id: str, after_id: str,
+                     after_created_at: str, since: str) -> bool:
+    '''
+    Есть ли сообщения новее клиентского курсора: при after_id/since — после них,
+    без курсора клиенту нечего ждать и отвечаем сразу
+    '''
+    if not after_id and not since:
+        return True
+
+    if not partner_id and not after_id:
+        # Список переписок: достаточно сводной таблицы, без сканирования messages
+        execute(cur, 'conversations_changed', """
+            SELECT EXISTS (
+                SELECT 1 FROM t_p86122027_youth_job_portal.conversations
+                WHERE user_a = %s AND last_message_at > %s
+                UNION ALL
+                SELECT 1 FROM t_p86122027_youth_job_portal.conversations
+                WHERE user_b = %s AND last_message_at > %s
+            )
+        """, (user_id, since, user_id, since))
+        return cur.fetchone()[0]
+
+    if partner_id:
+        filters = ["pair_key = %s"]
+        params: List[Any] = [pair_key(user_id, partner_id)]
+    else:
+        filters = ["(sender_id = %s OR receiver_id = %s)"]
+        params = [user_id, user_id]
+    if job_id:
+        filters.append("job_id = %s")
+        params.append(job_id)
+    cursor_filter, cursor_params = message_cursor_filter(cur, after_id, after_created_at, since)
+    filters.append(cursor_filter)
+    params.extend(cursor_params)
+
+    execute(cur, 'messages_changed', f"""
+        SELECT EXISTS (
+            SELECT 1 FROM t_p86122027_youth_job_portal.messages
+            WHERE {' AND '.join(filters)}
+        )
+    """, params)
+    return cur.fetchone()[0]
+
+
+USERS_MAX_IDS = 100
+
+
+def parse_user_ids(raw: str) -> List[str]:
+    return list(dict.fromkeys(user_id.strip() for user_id in raw.split(',') if user_id.strip()))
+
+
+def fetch_user_summaries(cur: Any, user_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+    '''
+    Компактные профили (id, name, role) по списку id одним запросом по первичному ключу;
+    нечисловые и не помещающиеся в int4 id (в users.id SERIAL) пропускаются
+    '''
+    numeric_ids = sorted({int(user_id) for user_id in user_ids if is_user_id(user_id)})
+    if not numeric_ids:
+        return {}
+    execute_prepared(cur, 'user_summaries', """
+        SELECT id, full_name, role
+        FROM t_p86122027_youth_job_portal.users
+        WHERE id = ANY(%s)
+    """, (numeric_ids,))
+    return {
+        str(row[0]): {'id': str(row[0]), 'name': row[1], 'role': row[2] if row[2] else 'user'}
+        for row in cur.fetchall()
+    }
+
+
+# scrypt: N=2^15, r=8 — 32 МиБ и ~60 мс на хеш; стоимость можно поднять через окружение,
+# старые хеши пересчитываются при следующем входе
+PASSWORD_SCRYPT_N = int(os.environ.get('PASSWORD_SCRYPT_N', str(2 ** 15)))
+PASSWORD_SCRYPT_R = 8
+PASSWORD_SCRYPT_P = 1
+PASSWORD_SALT_BYTES = 16
+PASSWORD_HASH_BYTES = 32
+
+
+def _scrypt(password: str, salt: bytes, n: int, r: int, p: int) -> bytes:
+    return hashlib.scrypt(password.encode('utf-8'), salt=salt, n=n, r=r, p=p,
+                          maxmem=2 * 128 * n * r * p, dklen=PASSWORD_HASH_BYTES)
+
+
+def hash_password(password: str) -> str:
+    '''
+    Хеш для users.password_hash: scrypt$N$r$p$соль$хеш (base64)
+    '''
+    salt = os.urandom(PASSWORD_SALT_BYTES)
+    digest = _scrypt(password, salt, PASSWORD_SCRYPT_N, PASSWORD_SCRYPT_R, PASSWORD_SCRYPT_P)
+    return '$'.join(['scrypt', str(PASSWORD_SCRYPT_N), str(PASSWORD_SCRYPT_R), str(PASSWORD_SCRYPT_P),
+                     base64.b64encode(salt).decode('ascii'), base64.b64encode(digest).decode('ascii')])
+
+
+def verify_password(password: str, stored: str) -> Tuple[bool, bool]:
+    '''
+    Проверяет пароль и сообщает, нужно ли пересчитать хеш: строки в открытом виде
+    (регистрация до хеширования, V0006) и хеши с другими параметрами scrypt
+    '''
+    stored = stored or ''
+    if not stored.startswith('scrypt$'):
+        return hmac.compare_digest(stored.encode('utf-8'), password.encode('utf-8')), True
+    try:
+        _, n, r, p, salt, digest = stored.split('$')
+        n, r, p = int(n), int(r), int(p)
+        expected = base64.b64decode(digest)
+        actual = _scrypt(password, base64.b64decode(salt), n, r, p)
+    except (ValueError, TypeError):
+        return False, False
+    outdated = (n, r, p) != (PASSWORD_SCRYPT_N, PASSWORD_SCRYPT_R, PASSWORD_SCRYPT_P)
+    return hmac.compare_digest(actual, expected), outdated
+
+
+# Token bucket на попытки входа: по email и по IP, до обращения к БД
+LOGIN_EMAIL_BURST = 5
+LOGIN_EMAIL_PER_MINUTE = 5
+LOGIN_IP_BURST = 20
+LOGIN_IP_PER_MINUTE = 30
+LOGIN_LIMITER_MAX_KEYS = 10000
+
+_login_buckets: 'OrderedDict[str, Tuple[float, float]]' = OrderedDict()
+_login_buckets_lock = threading.Lock()
+
+
+def take_login_token(key: str, burst: int, per_minute: float) -> float:
+    '''
+    Забирает токен из корзины key; 0 — попытка разрешена, иначе секунды до следующего токена.
+    Корзины хранятся в LRU, давно не использованные вытесняются
+    '''
+    now = time.monotonic()
+    rate = per_minute / 60.0
+    with _login_buckets_lock:
+        tokens, updated = _login_buckets.pop(key, (float(burst), now))
+        tokens = min(float(burst), tokens + (now - updated) * rate)
+        if tokens >= 1:
+            tokens -= 1
+            wait = 0.0
+        else:
+            wait = (1 - tokens) / rate
+        _login_buckets[key] = (tokens, now)
+        while len(_login_buckets) > LOGIN_LIMITER_MAX_KEYS:
+            _login_buckets.popitem(last=False)
+    return wait
+
+
+def client_ip(event: Dict[str, Any]) -> str:
+    # Адрес от платформы надёжнее заголовка, который клиент может подставить сам
+    source_ip = ((event.get('requestContext') or {}).get('identity') or {}).get('sourceIp')
+    if source_ip:
+        return str(source_ip)
+    return get_header(event, 'X-Forwarded-For').split(',')[0].strip()
+
+
+def login_rate_limited(event: Dict[str, Any], cors_headers: Dict[str, str]) -> Any:
+    '''
+    Ответ 429 с Retry-After, если исчерпана корзина email или IP; None — пропустить вход
+    '''
+    try:
+        email = str(json.loads(event.get('body') or '{}').get('email', '')).strip().lower()
+    except (ValueError, AttributeError):
+        email = ''
+    ip = client_ip(event)
+    # Обе корзины тратятся при каждой попытке, поэтому перебор по многим email упирается в IP
+    waits = [take_login_token(f'ip:{ip}', LOGIN_IP_BURST, LOGIN_IP_PER_MINUTE) if ip else 0.0,
+             take_login_token(f'email:{email}', LOGIN_EMAIL_BURST, LOGIN_EMAIL_PER_MINUTE) if email else 0.0]
+    wait = max(waits)
+    if not wait:
+        return None
+    print(f"Login rate limited - email: {email}, ip: {ip}")
+    return {
+        'statusCode': 429,
+        'headers': {**cors_headers, 'Content-Type': 'application/json', 'Retry-After': str(math.ceil(wait))},
+        'body': dump_json({'error': 'Too many login attempts, try again later'}),
+        'isBase64Encoded': False
+    }
+
+
+# Сессионные токены: base64url(JSON {sub, role, exp, jti}).base64url(HMAC-SHA256).
+# Проверка идёт в процессе без чтения users; отозванные до истечения токены (выход)
+# лежат в revoked_sessions и кэшируются в памяти. Кэш перечитывается по NOTIFY
+# из V0025, а без слушателя — не реже раза в REVOKED_SESSIONS_REFRESH секунд
+SESSION_TOKEN_TTL = int(os.environ.get('SESSION_TOKEN_TTL', str(7 * 24 * 3600)))
+REVOKED_SESSIONS_REFRESH = 30.0
+
+# Секрет общий для всех экземпляров функции; без него токены не выдаются и не проверяются
+# (собственный случайный секрет экземпляра отклонял бы токены других экземпляров)
+SESSION_SECRET = os.environ.get('SESSION_SECRET', '').encode('utf-8')
+if not SESSION_SECRET:
+    print("SESSION_SECRET is not set, session tokens are disabled")
+
+_revoked_sessions: Dict[str, float] = {}
+_revoked_sessions_lock = threading.Lock()
+_revoked_sessions_loaded_at: Any = None
+
+
+def _b64url_encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+
+def _b64url_decode(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + '=' * (-len(text) % 4))
+
+
+def _session_signature(payload: str) -> str:
+    return _b64url_encode(hmac.new(SESSION_SECRET, payload.encode('ascii'), hashlib.sha256).digest())
+
+
+def issue_session_token(user_id: Any, role: str) -> Tuple[str, int]:
+    '''
+    Подписанный токен сессии и момент его истечения (unix time); требует SESSION_SECRET
+    '''
+    expires_at = int(time.time()) + SESSION_TOKEN_TTL
+    claims = {'sub': str(user_id), 'role': role, 'exp': expires_at, 'jti': uuid.uuid4().hex}
+    payload = _b64url_encode(json.dumps(claims, separators=(',', ':')).encode('utf-8'))
+    return f"{payload}.{_session_signature(payload)}", expires_at
+
+
+def mark_revoked_sessions_stale() -> None:
+    global _revoked_sessions_loaded_at
+    with _revoked_sessions_lock:
+        _revoked_sessions_loaded_at = None
+
+
+def revoke_session_locally(jti: str, expires_at: float) -> None:
+    global _revoked_sessions
+    now = time.time()
+    with _revoked_sessions_lock:
+        # Истёкшие токены отклоняются и без списка
+        _revoked_sessions = {key: exp for key, exp in _revoked_sessions.items() if exp > now}
+        _revoked_sessions[jti] = expires_at
+
+
+def refresh_revoked_sessions(cur: Any) -> None:
+    '''
+    Перечитывает список отзыва, если он помечен устаревшим или слушатель
+    не подключён и с прошлой загрузки прошло REVOKED_SESSIONS_REFRESH секунд
+    '''
+    global _revoked_sessions, _revoked_sessions_loaded_at
+    ensure_message_listener()
+    with _revoked_sessions_lock:
+        loaded_at = _revoked_sessions_loaded_at
+    if loaded_at is not None and (_listener_ready.is_set()
+                                  or time.monotonic() - loaded_at < REVOKED_SESSIONS_REFRESH):
+        return
+    started = time.monotonic()
+    execute_prepared(cur, 'revoked_sessions_active', """
+        SELECT jti, EXTRACT(EPOCH FROM expires_at)
+        FROM t_p86122027_youth_job_portal.revoked_sessions
+        WHERE expires_at > NOW()
+    """)
+    revoked = {row[0]: float(row[1]) for row in cur.fetchall()}
+    with _revoked_sessions_lock:
+        # Сброс, пришедший во время чтения, оставляет список устаревшим
+        if _revoked_sessions_loaded_at is loaded_at:
+            _revoked_sessions = revoked
+            _revoked_sessions_loaded_at = started
+
+
+def verify_session_token(token: str) -> Any:
+    '''
+    Claims токена или None: неверная подпись, истёкший срок или отозванный jti
+    '''
+    payload, _, signature = token.partition('.')
+    if not payload or not hmac.compare_digest(signature.encode('ascii', 'replace'),
+                                              _session_signature(payload).encode('ascii')):
+        return None
+    try:
+        claims = json.loads(_b64url_decode(payload))
+        expires_at = int(claims['exp'])
+        jti = str(claims['jti'])
+    except (ValueError, TypeError, KeyError):
+        return None
+    if expires_at <= time.time():
+        return None
+    with _revoked_sessions_lock:
+        if jti in _revoked_sessions:
+            return None
+    return claims
+
+
+def bearer_token(event: Dict[str, Any]) -> str:
+    scheme, _, token = get_header(event, 'Authorization').strip().partition(' ')
+    return token.strip() if scheme.lower() == 'bearer' else ''
+
+
+def session_forbids(session: Optional[Dict[str, Any]], *owner_ids: Any) -> bool:
+    '''
+    Предъявлен токен, но его sub не совпадает ни с одним из владельцев ресурса;
+    без токена проверка не применяется
+    '''
+    return session is not None and session['sub'] not in {str(owner_id) for owner_id in owner_ids if owner_id}
+
+
+def job_employer(cur: Any, job_id: Any) -> Optional[str]:
+    '''
+    employer_id вакансии ('' — не задан) или None, если вакансии нет
+    '''
+    execute(cur, 'job_employer', """
+        SELECT employer_id FROM t_p86122027_youth_job_portal.jobs WHERE id = %s
+    """, (str(job_id),))
+    row = cur.fetchone()
+    return (row[0] or '') if row else None
+
+
+def session_forbids_scope(cur: Any, session: Optional[Dict[str, Any]], user_id: str, employer_id: str, job_id: str) -> bool:
+    '''
+    Список по user_id, employer_id или job_id с токеном читает только его владелец:
+    сам кандидат или работодатель вакансии
+    '''
+    if session is None:
+        return False
+    if user_id:
+        return session_forbids(session, user_id)
+    if employer_id:
+        return session_forbids(session, employer_id)
+    if job_id:
+        return session_forbids(session, job_employer(cur, job_id))
+    return False
+
+
+def pair_key(user1: str, user2: str) -> str:
+    '''
+    Ключ пары собеседников, совпадает с вычисляемым столбцом messages.pair_key (V0017)
+    '''
+    return ':'.join(sorted([str(user1), str(user2)]))
+
+
+def conversation_key(user1: str, user2: str, job_id: Any) -> Tuple[str, str, str]:
+    '''
+    Канонический ключ переписки: пара в порядке кодовых точек
+    (совпадает с LEAST/GREATEST ... COLLATE "C" в миграции) и job_id, где NULL -> ''
+    '''
+    user_a, user_b = sorted([str(user1), str(user2)])
+    return user_a, user_b, str(job_id) if job_id else ''
+
+
+# Каждая запись в строку сводки выдаёт ей новый номер версии (см. conversation_version)
+CONVERSATION_BUMP_SQL = "version = nextval('t_p86122027_youth_job_portal.conversation_version_seq'), changed_at = NOW()"
+
+
+def record_message_in_conversation(cur: Any, message_id: Any, sender_id: str, receiver_id: str,
+                                   job_id: Any, message_text: str, created_at: datetime) -> None:
+    '''
+    Upsert сводки переписки при отправке: новое последнее сообщение и +1 к непрочитанным получателя
+    '''
+    user_a, user_b, conv_job_id = conversation_key(sender_id, receiver_id, job_id)
+    unread_a = 1 if str(receiver_id) == user_a else 0
+    unread_b = 1 if str(receiver_id) == user_b and user_a != user_b else 0
+    execute(cur, 'conversation_record_message', f"""
+        INSERT INTO t_p86122027_youth_job_portal.conversations
+        (user_a, user_b, job_id, last_message_id, last_sender_id, last_message_text,
+         last_is_read, last_message_at, unread_a, unread_b)
+        VALUES (%s, %s, %s, %s, %s, %s, FALSE, %s, %s, %s)
+        ON CONFLICT (user_a, user_b, job_id) DO UPDATE SET
+            last_message_id = CASE WHEN EXCLUDED.last_message_at >= conversations.last_message_at
+                                   THEN EXCLUDED.last_message_id ELSE conversations.last_message_id END,
+            last_sender_id = CASE WHEN EXCLUDED.last_message_at >= conversations.last_message_at
+                                  THEN EXCLUDED.last_sender_id ELSE conversations.last_sender_id END,
+            last_message_text = CASE WHEN EXCLUDED.last_message_at >= conversations.last_message_at
+                                     THEN EXCLUDED.last_message_text ELSE conversations.last_message_text END,
+            last_is_read = CASE WHEN EXCLUDED.last_message_at >= conversations.last_message_at
+                                THEN EXCLUDED.last_is_read ELSE conversations.last_is_read END,
+            last_message_at = GREATEST(conversations.last_message_at, EXCLUDED.last_message_at),
+            unread_a = conversations.unread_a + EXCLUDED.unread_a,
+            unread_b = conversations.unread_b + EXCLUDED.unread_b,
+            {CONVERSATION_BUMP_SQL}
+    """, (user_a, user_b, conv_job_id, str(message_id), str(sender_id), message_text,
+          created_at, unread_a, unread_b))
+
+
+def adjust_conversation_read_state(cur: Any, message_id: Any, receiver_id: str, sender_id: str,
+                                   job_id: Any, unread_delta: int, is_read: bool) -> None:
+    '''
+    Сдвигает счётчик непрочитанных получателя и признак прочтения последнего сообщения
+    '''
+    user_a, user_b, conv_job_id = conversation_key(sender_id, receiver_id, job_id)
+    delta_a = unread_delta if str(receiver_id) == user_a else 0
+    delta_b = unread_delta if str(receiver_id) == user_b and user_a != user_b else 0
+    execute(cur, 'conversation_adjust_read', f"""
+        UPDATE t_p86122027_youth_job_portal.conversations
+        SET unread_a = GREATEST(unread_a + %s, 0),
+            unread_b = GREATEST(unread_b + %s, 0),
+            last_is_read = CASE WHEN last_message_id = %s THEN %s ELSE last_is_read END,
+            {CONVERSATION_BUMP_SQL}
+        WHERE user_a = %s AND user_b = %s AND job_id = %s
+    """, (delta_a, delta_b, str(message_id), is_read, user_a, user_b, conv_job_id))
+
+
+def refresh_conversation(cur: Any, user1: str, user2: str, job_id: Any) -> None:
+    '''
+    Полный пересчёт сводки по сообщениям переписки (после удаления);
+    если сообщений не осталось, строка удаляется
+    '''
+    user_a, user_b, conv_job_id = conversation_key(user1, user2, job_id)
+    job_filter = "job_id = %s" if conv_job_id else "job_id IS NULL"
+    job_params = [conv_job_id] if conv_job_id else []
+    conversation_params = [pair_key(user_a, user_b)] + job_params
+
+    execute(cur, 'conversation_last_message', f"""
+        SELECT id, sender_id, message_text, is_read, created_at
+        FROM t_p86122027_youth_job_portal.messages
+        WHERE pair_key = %s AND {job_filter}
+        ORDER BY created_at DESC, id DESC
+        LIMIT 1
+    """, conversation_params)
+    last = cur.fetchone()
+
+    if not last:
+        execute(cur, 'conversation_delete', """
+            DELETE FROM t_p86122027_youth_job_portal.conversations
+            WHERE user_a = %s AND user_b = %s AND job_id = %s
+        """, (user_a, user_b, conv_job_id))
+        return
+
+    execute(cur, 'conversation_unread_counts', f"""
+        SELECT COUNT(*) FILTER (WHERE receiver_id = %s),
+               COUNT(*) FILTER (WHERE receiver_id = %s)
+        FROM t_p86122027_youth_job_portal.messages
+        WHERE pair_key = %s AND {job_filter} AND is_read IS NOT TRUE
+    """, [user_a, user_b] + conversation_params)
+    unread_a, unread_b = cur.fetchone()
+    if user_a == user_b:
+        unread_b = 0
+
+    execute(cur, 'conversation_refresh', f"""
+        INSERT INTO t_p86122027_youth_job_portal.conversations
+        (user_a, user_b, job_id, last_message_id, last_sender_id, last_message_text,
+         last_is_read, last_message_at, unread_a, unread_b)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+        ON CONFLICT (user_a, user_b, job_id) DO UPDATE SET
+            last_message_id = EXCLUDED.last_message_id,
+            last_sender_id = EXCLUDED.last_sender_id,
+            last_message_text = EXCLUDED.last_message_text,
+            last_is_read = EXCLUDED.last_is_read,
+            last_message_at = EXCLUDED.last_message_at,
+            unread_a = EXCLUDED.unread_a,
+            unread_b = EXCLUDED.unread_b,
+            {CONVERSATION_BUMP_SQL}
+    """, (user_a, user_b, conv_job_id, str(last[0]), last[1], last[2], bool(last[3]),
+          last[4], unread_a, unread_b))
+
+
+def mark_conversation_read(cur: Any, reader_id: str, partner_id: str, job_id: str,
+                           up_to_id: str, up_to: Any) -> int:
+    '''
+    Одним запросом помечает прочитанными входящие сообщения переписки
+    (до up_to_id/up_to включительно) и уменьшает счётчики непрочитанных в сводке
+    '''
+    user_a, user_b, _ = conversation_key(reader_id, partner_id, job_id)
+    unread_column = 'unread_a' if str(reader_id) == user_a else 'unread_b'
+
+    filters = ["pair_key = %s", "receiver_id = %s", "is_read IS NOT TRUE"]
+    params: List[Any] = [pair_key(reader_id, partner_id), reader_id]
+    if job_id:
+        filters.append("job_id = %s")
+        params.append(job_id)
+    if up_to_id:
+        filters.append("""(created_at, id) <= (
+            SELECT created_at, id FROM t_p86122027_youth_job_portal.messages WHERE id = %s::uuid
+        )""")
+        params.append(up_to_id)
+    elif up_to:
+        filters.append("created_at <= %s")
+        params.append(up_to)
+
+    execute(cur, 'conversation_mark_read', f"""
+        WITH marked AS (
+            UPDATE t_p86122027_youth_job_portal.messages
+            SET is_read = TRUE, read_changed_at = NOW()
+            WHERE {' AND '.join(filters)}
+            RETURNING id, COALESCE(job_id, '') AS conv_job_id
+        ),
+        per_job AS (
+            SELECT conv_job_id, COUNT(*) AS marked_count, array_agg(id) AS ids
+            FROM marked
+            GROUP BY conv_job_id
+        ),
+        updated_conversations AS (
+            UPDATE t_p86122027_youth_job_portal.conversations c
+            SET {unread_column} = GREATEST(c.{unread_column} - per_job.marked_count, 0),
+                last_is_read = c.last_is_read OR c.last_message_id = ANY(per_job.ids),
+                {CONVERSATION_BUMP_SQL}
+            FROM per_job
+            WHERE c.user_a = %s AND c.user_b = %s AND c.job_id = per_job.conv_job_id
+        )
+        SELECT COUNT(*) FROM marked
+    """, params + [user_a, user_b])
+    return cur.fetchone()[0]
+
+
+JOBS_IMPORT_MAX_RECORDS = 1000
+JOB_REQUIRED_FIELDS = ('id', 'title', 'company', 'location', 'type', 'description')
+JOB_WRITE_COLUMNS = ('id', 'title', 'company', 'location', 'type', 'salary', 'description',
+                     'requirements', 'employer_id', 'employer_email', 'age_range', 'category',
+                     'coordinates', 'is_premium', 'responsibilities', 'conditions',
+                     'contact_phone', 'contact_email', 'lat', 'lon',
+                     'salary_min', 'salary_max', 'salary_currency')
+
+
+def _job_field(data: Dict[str, Any], camel: str, snake: str, default: Any = None) -> Any:
+    if data.get(camel) is not None:
+        return data[camel]
+    if data.get(snake) is not None:
+        return data[snake]
+    return default
+
+
+def normalize_job_record(data: Any) -> Tuple[Dict[str, Any], List[str]]:
+    '''
+    Приводит вакансию из запроса (camelCase фронтенда или snake_case из create_vacancies)
+    к значениям столбцов JOB_WRITE_COLUMNS и возвращает список ошибок валидации
+    '''
+    if not isinstance(data, dict):
+        return {}, ['Record must be a JSON object']
+
+    errors = []
+    contact = data.get('contact') if isinstance(data.get('contact'), dict) else {}
+    employer_email = str(_job_field(data, 'employerEmail', 'employer_email', '') or '')
+
+    record = {
+        'id': str(data.get('id') or '').strip(),
+        'title': str(data.get('title') or '').strip(),
+        'company': str(data.get('company') or '').strip(),
+        'location': str(data.get('location') or '').strip(),
+        'type': str(data.get('type') or '').strip(),
+        'salary': str(data.get('salary') or ''),
+        'description': str(data.get('description') or '').strip(),
+        'requirements': data.get('requirements') or [],
+        'employer_id': str(_job_field(data, 'employerId', 'employer_id', '') or ''),
+        'employer_email': employer_email,
+        'age_range': str(_job_field(data, 'ageRange', 'age_range', '14-17')),
+        'category': str(data.get('category') or 'Работа с людьми'),
+        'coordinates': data.get('coordinates') or [56.0184, 92.8672],
+        'is_premium': _job_field(data, 'isPremium', 'is_premium', False),
+        'responsibilities': data.get('responsibilities') or [],
+        'conditions': data.get('conditions') or [],
+        'contact_phone': str(contact.get('phone') or data.get('contact_phone') or '+7 (391) 234-56-78'),
+        'contact_email': str(contact.get('email') or data.get('contact_email') or employer_email or 'hr@company.ru')
+    }
+
+    for field in JOB_REQUIRED_FIELDS:
+        if not record[field]:
+            errors.append(f'Missing required field: {field}')
+
+    for field in ('requirements', 'responsibilities', 'conditions'):
+        value = record[field]
+        if not isinstance(value, list) or not all(isinstance(item, str) for item in value):
+            errors.append(f'{field} must be an array of strings')
+
+    coordinates = record['coordinates']
+    if (not isinstance(coordinates, list) or len(coordinates) != 2
+            or not all(isinstance(c, (int, float)) and not isinstance(c, bool) for c in coordinates)
+            or not -90 <= coordinates[0] <= 90 or not -180 <= coordinates[1] <= 180):
+        errors.append('coordinates must be [lat, lon]')
+    else:
+        record['coordinates'] = json.dumps(coordinates)
+        record['lat'], record['lon'] = float(coordinates[0]), float(coordinates[1])
+
+    if not isinstance(record['is_premium'], bool):
+        errors.append('isPremium must be a boolean')
+
+    record['salary_min'], record['salary_max'], record['salary_currency'] = parse_salary(record['salary'])
+
+    return record, errors
+
+
+def parse_import_body(body: str) -> List[Any]:
+    '''
+    Тело импорта: JSON-массив, объект {"jobs": [...]} или NDJSON (по вакансии в строке).
+    Нераспознанные строки NDJSON возвращаются как ValueError на своём месте
+    '''
+    try:
+        parsed = json.loads(body)
+        if isinstance(parsed, list):
+            return parsed
+        if isinstance(parsed, dict) and isinstance(parsed.get('jobs'), list):
+            return parsed['jobs']
+        return [parsed]
+    except ValueError:
+        pass
+
+    records: List[Any] = []
+    for line in body.splitlines():
+        if not line.strip():
+            continue
+        try:
+            records.append(json.loads(line))
+        except ValueError as e:
+            records.append(ValueError(f'Invalid JSON: {str(e)}'))
+    return records
+
+
+def import_jobs(cur: Any, records: List[Any], atomic: bool) -> Tuple[List[Dict[str, Any]], bool]:
+    '''
+    Валидирует все записи и одной командой INSERT ... ON CONFLICT (id) DO UPDATE
+    записывает корректные; возвращает результаты по каждой записи и признак записи
+    '''
+    results: List[Dict[str, Any]] = []
+    valid_rows: List[Tuple] = []
+    seen_ids = set()
+
+    for index, data in enumerate(records):
+        if isinstance(data, ValueError):
+            record, errors = {}, [str(data)]
+        else:
+            record, errors = normalize_job_record(data)
+        if record.get('id') in seen_ids:
+            errors.append('Duplicate id in batch')
+        result: Dict[str, Any] = {'index': index, 'id': record.get('id') or None}
+        if errors:
+            result.update({'status': 'invalid', 'errors': errors})
+        else:
+            seen_ids.add(record['id'])
+            valid_rows.append(tuple(record[column] for column in JOB_WRITE_COLUMNS))
+        results.append(result)
+
+    has_invalid = any(r.get('status') == 'invalid' for r in results)
+    if not valid_rows or (atomic and has_invalid):
+        for result in results:
+            result.setdefault('status', 'skipped')
+        return results, False
+
+    update_columns = [c for c in JOB_WRITE_COLUMNS if c != 'id']
+    placeholders = ', '.join(['%s'] * len(JOB_WRITE_COLUMNS))
+    started = time.perf_counter()
+    written = execute_values(cur, f"""
+        INSERT INTO t_p86122027_youth_job_portal.jobs
+        ({', '.join(JOB_WRITE_COLUMNS)}, created_at, updated_at)
+        VALUES %s
+        ON CONFLICT (id) DO UPDATE SET
+            {', '.join(f'{c} = EXCLUDED.{c}' for c in update_columns)},
+            updated_at = NOW()
+        RETURNING id, (xmax = 0) AS inserted
+    """, valid_rows, template=f"({placeholders}, NOW(), NOW())", page_size=len(valid_rows), fetch=True)
+    _record_statement_time('jobs_import', started)
+
+    statuses = {row[0]: 'created' if row[1] else 'updated' for row in written}
+    for result in results:
+        if 'status' not in result:
+            result['status'] = statuses.get(result['id'], 'skipped')
+    return results, True
+
 
 def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     '''
-    Универсальное API для управления всеми сущностями: пользователи, вакансии, отклики, сообщения
+    Универсальное API для управления всеми сущностями: пользователи, вакансии, отклики, сообщения.
+    Ответы сжимаются по Accept-Encoding (compress_response)
     '''
+    return compress_response(event, handle_request(event, context))
+
+
+def handle_request(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     method: str = event.get('httpMethod', 'GET')
     path: str = event.get('path', '/')
     
     cors_headers = {
         'Access-Control-Allow-Origin': '*',
         'Access-Control-Allow-Methods': 'GET, POST, PUT, DELETE, OPTIONS',
-        'Access-Control-Allow-Headers': 'Content-Type, X-Requested-With',
+        'Access-Control-Allow-Headers': 'Content-Type, X-Requested-With, If-None-Match, Authorization',
         'Access-Control-Max-Age': '86400'
     }
     
@@ -26,21 +1919,96 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             'isBase64Encoded': False
         }
     
-    db_url = os.environ.get('DATABASE_URL')
+    if method == 'GET' and (event.get('queryStringParameters') or {}).get('resource') == 'jobs':
+        cached_response = cached_jobs_response(event, event['queryStringParameters'], cors_headers)
+        if cached_response:
+            return cached_response
+    
+    if method == 'POST' and (event.get('queryStringParameters') or {}).get('resource') == 'login':
+        limited_response = login_rate_limited(event, cors_headers)
+        if limited_response:
+            return limited_response
     
+    conn_broken = False
+
     try:
-        conn = psycopg2.connect(db_url)
+        conn = get_connection()
         cur = conn.cursor()
         
         # Определяем ресурс из query параметра: ?resource=users
         query_params = event.get('queryStringParameters') or {}
         resource = query_params.get('resource', 'users')
         
+        # Токен необязателен; предъявленный должен быть действительным, и тогда
+        # id из тела запроса сверяются с ним
+        session = None
+        token = bearer_token(event) if SESSION_SECRET else ''
+        if token:
+            refresh_revoked_sessions(cur)
+            session = verify_session_token(token)
+            if session is None:
+                return {
+                    'statusCode': 401,
+                    'headers': {**cors_headers, 'Content-Type': 'application/json'},
+                    'body': dump_json({'error': 'Invalid or expired session token'}),
+                    'isBase64Encoded': False
+                }
+        
         # === USERS API ===
         if resource == 'users':
+            if method == 'GET' and query_params.get('ids'):
+                # Пакетное разрешение профилей (имена собеседников в чатах) вместо выгрузки всех users;
+                # profile=full добавляет контакты и возраст
+                user_ids = parse_user_ids(query_params['ids'])
+                if len(user_ids) > USERS_MAX_IDS:
+                    return {
+                        'statusCode': 400,
+                        'headers': {**cors_headers, 'Content-Type': 'application/json'},
+                        'body': dump_json({'error': f'ids must contain at most {USERS_MAX_IDS} user ids'}),
+                        'isBase64Encoded': False
+                    }
+                
+                print(f"Fetching users by id: {len(user_ids)}")
+                
+                if query_params.get('profile') == 'full':
+                    numeric_ids = sorted({int(user_id) for user_id in user_ids if is_user_id(user_id)})
+                    execute_prepared(cur, 'users_by_id', """
+                        SELECT id, email, full_name, 
+                               EXTRACT(YEAR FROM AGE(date_of_birth))::int as age,
+                               phone, test_result, role, created_at
+                        FROM t_p86122027_youth_job_portal.users
+                        WHERE id = ANY(%s)
+                    """, (numeric_ids,))
+                    found = {
+                        str(row[0]): {
+                            'id': str(row[0]),
+                            'email': row[1],
+                            'name': row[2],
+                            'age': row[3],
+                            'phone': row[4],
+                            'testResult': row[5],
+                            'role': row[6] if row[6] else 'user',
+                            'completedTest': bool(row[5]),
+                            'createdAt': row[7].isoformat() if row[7] else None
+                        }
+                        for row in cur.fetchall()
+                    }
+                else:
+                    found = fetch_user_summaries(cur, user_ids)
+                
+                return {
+                    'statusCode': 200,
+                    'headers': {**cors_headers, 'Content-Type': 'application/json'},
+                    'body': dump_json({
+                        'users': [found[user_id] for user_id in user_ids if user_id in found],
+                        'missing': [user_id for user_id in user_ids if user_id not in found]
+                    }),
+                    'isBase64Encoded': False
+                }
+            
             if method == 'GET':
                 print("Fetching all users from database")
-                cur.execute("""
+                execute(cur, 'users_list', """
                     SELECT id, email, full_name, 
                            EXTRACT(YEAR FROM AGE(date_of_birth))::int as age,
                            phone, test_result, role, created_at
@@ -67,25 +2035,25 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                 return {
                     'statusCode': 200,
                     'headers': {**cors_headers, 'Content-Type': 'application/json'},
-                    'body': json.dumps({'users': users}),
+                    'body': dump_json({'users': users}),
                     'isBase64Encoded': False
                 }
             
             if method == 'POST':
                 body_data = json.loads(event.get('body', '{}'))
-                email = str(body_data.get('email', '')).replace("'", "''")
-                password = str(body_data.get('password', '')).replace("'", "''")
-                name = str(body_data.get('name', '')).replace("'", "''")
+                email = str(body_data.get('email', ''))
+                password = str(body_data.get('password', ''))
+                name = str(body_data.get('name', ''))
                 age = body_data.get('age', 0)
-                phone = str(body_data.get('phone', '')).replace("'", "''")
-                role = str(body_data.get('role', 'user')).replace("'", "''")
+                phone = str(body_data.get('phone', ''))
+                role = str(body_data.get('role', 'user'))
                 
                 print(f"Attempting registration for email: {email}")
                 
-                cur.execute(f"""
+                execute_prepared(cur, 'user_by_email', """
                     SELECT id FROM t_p86122027_youth_job_portal.users 
-                    WHERE email = '{email}'
-                """)
+                    WHERE email = %s
+                """, (email,))
                 existing = cur.fetchone()
                 
                 if existing:
@@ -94,7 +2062,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                     return {
                         'statusCode': 400,
                         'headers': {**cors_headers, 'Content-Type': 'application/json'},
-                        'body': json.dumps({'error': 'Email already exists'}),
+                        'body': dump_json({'error': 'Email already exists'}),
                         'isBase64Encoded': False
                     }
                 
@@ -103,12 +2071,12 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                 birth_year = datetime.now().year - age
                 date_of_birth = f'{birth_year}-01-01'
                 
-                cur.execute(f"""
+                execute(cur, 'user_insert', """
                     INSERT INTO t_p86122027_youth_job_portal.users 
                     (email, password_hash, full_name, date_of_birth, phone, role, created_at, updated_at)
-                    VALUES ('{email}', '{password}', '{name}', '{date_of_birth}', '{phone}', '{role}', NOW(), NOW())
+                    VALUES (%s, %s, %s, %s, %s, %s, NOW(), NOW())
                     RETURNING id
-                """)
+                """, (email, hash_password(password), name, date_of_birth, phone, role))
                 
                 user_id = cur.fetchone()[0]
                 conn.commit()
@@ -118,7 +2086,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                 return {
                     'statusCode': 201,
                     'headers': {**cors_headers, 'Content-Type': 'application/json'},
-                    'body': json.dumps({
+                    'body': dump_json({
                         'id': str(user_id),
                         'email': email,
                         'name': name,
@@ -132,156 +2100,401 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         
         # === JOBS API ===
         elif resource == 'jobs':
-            if method == 'GET':
-                print("Fetching all jobs from database")
-                cur.execute("""
-                    SELECT id, title, company, location, type, salary, 
-                           description, requirements, employer_id, employer_email, created_at,
-                           age_range, category, coordinates, is_premium, 
-                           responsibilities, conditions, contact_phone, contact_email
-                    FROM t_p86122027_youth_job_portal.jobs
-                    ORDER BY created_at DESC
-                """)
+            if method == 'GET' and query_params.get('mode') == 'clusters':
+                # Кластеры для карты: тайлы видимой области берутся из кэша,
+                # недостающие считаются одним GROUP BY по сетке
+                try:
+                    zoom = int(query_params.get('zoom', ''))
+                    _, bbox, _ = parse_geo_params({'bbox': query_params.get('bbox', '')})
+                    if not bbox or not 0 <= zoom <= JOBS_CLUSTER_MAX_ZOOM:
+                        raise ValueError
+                except ValueError:
+                    return {
+                        'statusCode': 400,
+                        'headers': {**cors_headers, 'Content-Type': 'application/json'},
+                        'body': dump_json({'error': f'Clusters require bbox (south,west,north,east) and zoom (0-{JOBS_CLUSTER_MAX_ZOOM})'}),
+                        'isBase64Encoded': False
+                    }
+                try:
+                    filters, params = job_filters(query_params)
+                except ValueError as e:
+                    return {
+                        'statusCode': 400,
+                        'headers': {**cors_headers, 'Content-Type': 'application/json'},
+                        'body': dump_json({'error': str(e)}),
+                        'isBase64Encoded': False
+                    }
+                # Карта показывает ту же выборку, что и список, включая поиск q
+                q = query_params.get('q', '').strip()
+                if q:
+                    filters.append(JOB_SEARCH_FILTER_SQL)
+                    params.extend([q, q.lower()])
+                
+                # Широкий экран на мелком масштабе кластеризуется на более грубой сетке
+                zoom, tiles = viewport_tiles(bbox, zoom)
+                
+                etag, last_modified = resource_version(cur, 'jobs', query_params)
+                if etag_matches(event, etag):
+                    return not_modified_response(cors_headers, etag, last_modified)
+                
+                filter_params = {key: query_params[key] for key in JOB_FILTER_PARAMS if query_params.get(key)}
+                if q:
+                    filter_params['q'] = q
+                tiles_version, _ = resource_version(cur, 'jobs', filter_params)
+                cache_generation = jobs_cache_generation()
+                
+                tile_items: Dict[Tuple[int, int], Any] = {}
+                for x, y in tiles:
+                    cached = jobs_cache_get(f"tile:{zoom}/{x}/{y}?{jobs_cache_key(filter_params)}", tiles_version)
+                    if cached:
+                        tile_items[(x, y)] = json.loads(cached[2])
+                
+                missing_tiles = [tile for tile in tiles if tile not in tile_items]
+                print(f"Clustering jobs - zoom: {zoom}, tiles: {len(tiles)}, computed: {len(missing_tiles)}")
+                if missing_tiles:
+                    for (x, y), items in load_cluster_tiles(cur, missing_tiles, zoom, filters, params).items():
+                        tile_items[(x, y)] = items
+                        jobs_cache_put(f"tile:{zoom}/{x}/{y}?{jobs_cache_key(filter_params)}",
+                                       cache_generation, tiles_version, '', dump_json(items))
+                
+                items = [item for tile in tiles for item in tile_items[tile]]
+                response_body = {'zoom': zoom, 'clusters': [], 'points': []}
+                response_body['points' if zoom >= JOBS_CLUSTER_POINTS_ZOOM else 'clusters'] = items
                 
-                rows = cur.fetchall()
-                jobs = []
-                for row in rows:
-                    coords_str = row[13] or '[56.0184, 92.8672]'
+                return {
+                    'statusCode': 200,
+                    'headers': {**cors_headers, 'Content-Type': 'application/json', **cache_headers(etag, last_modified)},
+                    'body': dump_json(response_body),
+                    'isBase64Encoded': False
+                }
+            
+            if method == 'GET' and (query_params.get('id') or query_params.get('ids')):
+                # Поиск по первичному ключу: стоимость не зависит от размера каталога,
+                # а ETag считается по содержимому, поэтому не сбрасывается чужими правками
+                if query_params.get('id'):
+                    job_ids = [query_params['id']]
+                else:
+                    job_ids = list(dict.fromkeys(
+                        job_id.strip() for job_id in query_params['ids'].split(',') if job_id.strip()
+                    ))
+                
+                if not job_ids or len(job_ids) > JOBS_MAX_PAGE_SIZE:
+                    return {
+                        'statusCode': 400,
+                        'headers': {**cors_headers, 'Content-Type': 'application/json'},
+                        'body': dump_json({'error': f'ids must contain 1 to {JOBS_MAX_PAGE_SIZE} job ids'}),
+                        'isBase64Encoded': False
+                    }
+                try:
+                    fields = parse_fields(query_params.get('fields', ''), JOB_COLUMN_FIELDS)
+                except ValueError as e:
+                    return {
+                        'statusCode': 400,
+                        'headers': {**cors_headers, 'Content-Type': 'application/json'},
+                        'body': dump_json({'error': str(e)}),
+                        'isBase64Encoded': False
+                    }
+                
+                print(f"Fetching jobs by id: {len(job_ids)}")
+                jobs, missing, modified = fetch_jobs_by_ids(cur, job_ids, fields)
+                
+                if query_params.get('id') and not jobs:
+                    return {
+                        'statusCode': 404,
+                        'headers': {**cors_headers, 'Content-Type': 'application/json'},
+                        'body': dump_json({'error': 'Job not found'}),
+                        'isBase64Encoded': False
+                    }
+                
+                body = dump_json({'job': jobs[0]} if query_params.get('id') else {'jobs': jobs, 'missing': missing})
+                etag = f'"jobs-id-{zlib.crc32(body.encode("utf-8")):08x}"'
+                last_modified = format_datetime(modified.replace(tzinfo=timezone.utc), usegmt=True) if modified else ''
+                if etag_matches(event, etag):
+                    return not_modified_response(cors_headers, etag, last_modified)
+                
+                return {
+                    'statusCode': 200,
+                    'headers': {**cors_headers, 'Content-Type': 'application/json', **cache_headers(etag, last_modified)},
+                    'body': body,
+                    'isBase64Encoded': False
+                }
+            
+            if method == 'GET':
+                cache_key = jobs_cache_key(query_params)
+                cache_generation = jobs_cache_generation()
+                etag, last_modified = resource_version(cur, 'jobs', query_params)
+                if etag_matches(event, etag):
+                    return not_modified_response(cors_headers, etag, last_modified)
+                
+                # Без слушателя NOTIFY кэш сверяется с версией таблицы (иначе он уже проверен до соединения)
+                cached = None if _listener_ready.is_set() else jobs_cache_get(cache_key, etag)
+                if cached:
+                    return {
+                        'statusCode': 200,
+                        'headers': {**cors_headers, 'Content-Type': 'application/json', **cache_headers(etag, last_modified)},
+                        'body': cached[2],
+                        'isBase64Encoded': False
+                    }
+
+                # Пагинация включается параметром limit или cursor;
+                # без них отдаём весь список, как раньше. Поиск q и гео-запросы всегда постраничные
+                q = query_params.get('q', '').strip()
+                try:
+                    origin, bbox, radius_km = parse_geo_params(query_params)
+                    filters, params = job_filters(query_params)
+                    fields = parse_fields(query_params.get('fields', ''), JOB_COLUMN_FIELDS)
+                except ValueError as e:
+                    return {
+                        'statusCode': 400,
+                        'headers': {**cors_headers, 'Content-Type': 'application/json'},
+                        'body': dump_json({'error': str(e)}),
+                        'isBase64Encoded': False
+                    }
+                sort_by_salary = query_params.get('sort') == 'salary'
+                paginate = 'limit' in query_params or 'cursor' in query_params or bool(q) or bool(origin)
+
+                text = query_params.get('text', '').strip()
+                if text:
+                    pattern = '%' + text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+                    filters.append("(title ILIKE %s OR company ILIKE %s)")
+                    params.extend([pattern, pattern])
+
+                if q:
+                    filters.append(JOB_SEARCH_FILTER_SQL)
+                    params.extend([q, q.lower()])
+
+                # Прямоугольники проверяются по GiST-индексу point(lon, lat) из V0020;
+                # радиус сначала сужается до описанного прямоугольника, затем точной дистанцией
+                for box in (bbox, radius_bbox(origin, radius_km) if radius_km else None):
+                    if box:
+                        filters.append("point(lon, lat) <@ box(point(%s, %s), point(%s, %s))")
+                        params.extend([box[1], box[0], box[3], box[2]])
+
+                # Ранжированная выдача: по зарплате (sort=salary), релевантности (q) или расстоянию до точки
+                scored = sort_by_salary or bool(q) or bool(origin)
+                limit = None
+                cursor = None
+                if paginate:
                     try:
-                        coordinates = json.loads(coords_str)
-                    except:
-                        coordinates = [56.0184, 92.8672]
-                    
-                    jobs.append({
-                        'id': row[0],
-                        'title': row[1],
-                        'company': row[2],
-                        'location': row[3],
-                        'type': row[4],
-                        'salary': row[5],
-                        'description': row[6],
-                        'requirements': row[7] or [],
-                        'employerId': row[8],
-                        'employerEmail': row[9],
-                        'postedDate': row[10].isoformat() if row[10] else None,
-                        'ageRange': row[11] or '14-17',
-                        'category': row[12] or 'Работа с людьми',
-                        'coordinates': coordinates,
-                        'isPremium': row[14] or False,
-                        'responsibilities': row[15] or [],
-                        'conditions': row[16] or [],
-                        'contact': {
-                            'phone': row[17] or '+7 (391) 234-56-78',
-                            'email': row[18] or 'hr@company.ru'
+                        limit = min(max(int(query_params.get('limit', JOBS_PAGE_SIZE)), 1), JOBS_MAX_PAGE_SIZE)
+                        if query_params.get('cursor'):
+                            cursor = decode_score_cursor(query_params['cursor']) if scored else decode_cursor(query_params['cursor'])
+                            if sort_by_salary:
+                                cursor = (int(cursor[0]), cursor[1])
+                    except ValueError:
+                        return {
+                            'statusCode': 400,
+                            'headers': {**cors_headers, 'Content-Type': 'application/json'},
+                            'body': dump_json({'error': 'Invalid limit or cursor'}),
+                            'isBase64Encoded': False
                         }
-                    })
+                    if cursor and not scored:
+                        filters.append("(created_at, id) < (%s, %s)")
+                        params.extend(cursor)
+
+                where_clause = f"WHERE {' AND '.join(filters)}" if filters else ""
+                limit_clause = ""
+                limit_params = []
+                if limit:
+                    # Берём на одну строку больше, чтобы понять, есть ли следующая страница
+                    limit_clause = "LIMIT %s"
+                    limit_params = [limit + 1]
+
+                print(f"Fetching jobs - filters: {len(filters)}, limit: {limit}, search: {bool(q)}, geo: {bool(origin)}, salary sort: {sort_by_salary}")
+                if scored:
+                    distance_params = [origin[0], origin[0], origin[1]] if origin else []
+                    if sort_by_salary:
+                        score_sql, score_params = SALARY_SORT_SQL, []
+                        direction, cursor_op = 'DESC', '<'
+                    elif q:
+                        # Ранг: релевантность по словоформам (title/company весят больше описания)
+                        # плюс сходство по триграммам
+                        score_sql = """ts_rank_cd(search_vector, websearch_to_tsquery('russian', %s))::float8
+                                       + word_similarity(%s, search_text)::float8"""
+                        score_params: List[Any] = [q, q.lower()]
+                        direction, cursor_op = 'DESC', '<'
+                    else:
+                        score_sql, score_params = DISTANCE_KM_SQL, distance_params
+                        direction, cursor_op = 'ASC', '>'
+
+                    outer_filters = []
+                    outer_params: List[Any] = []
+                    if radius_km:
+                        outer_filters.append("distance_km <= %s")
+                        outer_params.append(radius_km)
+                    if cursor:
+                        outer_filters.append(f"(score, id) {cursor_op} (%s, %s)")
+                        outer_params.extend(cursor)
+
+                    statement_name = 'jobs_by_salary' if sort_by_salary else 'jobs_search' if q else 'jobs_nearby'
+                    execute_prepared(cur, statement_name, f"""
+                        SELECT * FROM (
+                            SELECT {job_columns(fields)},
+                                   {score_sql} AS score,
+                                   {DISTANCE_KM_SQL if origin else 'NULL::float8'} AS distance_km
+                            FROM t_p86122027_youth_job_portal.jobs
+                            {where_clause}
+                        ) scored
+                        {f"WHERE {' AND '.join(outer_filters)}" if outer_filters else ''}
+                        ORDER BY score {direction}, id {direction}
+                        {limit_clause}
+                    """, score_params + distance_params + params + outer_params + limit_params)
+                else:
+                    execute_prepared(cur, 'jobs_list', f"""
+                        SELECT {job_columns(fields)}
+                        FROM t_p86122027_youth_job_portal.jobs
+                        {where_clause}
+                        ORDER BY created_at DESC, id DESC
+                        {limit_clause}
+                    """, params + limit_params)
+
+                rows = cur.fetchall()
+                next_cursor = None
+                if limit and len(rows) > limit:
+                    rows = rows[:limit]
+                    next_cursor = encode_score_cursor(rows[-1][22], rows[-1][0]) if scored \
+                        else encode_cursor(rows[-1][10], rows[-1][0])
+
+                jobs = [project_fields(job_from_row(row), fields) for row in rows]
+                if origin:
+                    for job, row in zip(jobs, rows):
+                        job['distanceKm'] = round(row[23], 2)
+
+                response_body: Dict[str, Any] = {'jobs': jobs}
+                if paginate:
+                    response_body['nextCursor'] = next_cursor
+
+                body = dump_json(response_body)
+                jobs_cache_put(cache_key, cache_generation, etag, last_modified, body)
+
+                print(f"Returning {len(jobs)} jobs")
+                return {
+                    'statusCode': 200,
+                    'headers': {**cors_headers, 'Content-Type': 'application/json', **cache_headers(etag, last_modified)},
+                    'body': body,
+                    'isBase64Encoded': False
+                }
+            
+            if method == 'POST' and query_params.get('mode') == 'import':
+                # Пакетный импорт: JSON-массив или NDJSON, одна транзакция, upsert по id
+                records = parse_import_body(event.get('body') or '')
+                atomic = query_params.get('atomic', '').lower() in ('true', '1')
+                
+                if not records or len(records) > JOBS_IMPORT_MAX_RECORDS:
+                    return {
+                        'statusCode': 400,
+                        'headers': {**cors_headers, 'Content-Type': 'application/json'},
+                        'body': dump_json({'error': f'Import must contain 1 to {JOBS_IMPORT_MAX_RECORDS} records'}),
+                        'isBase64Encoded': False
+                    }
+                
+                if session:
+                    # С токеном импорт пишет только вакансии владельца сессии и не
+                    # перезаписывает чужие: upsert по id иначе сменил бы их владельца
+                    record_ids = [str(r.get('id') or '').strip() for r in records if isinstance(r, dict)]
+                    execute(cur, 'jobs_import_foreign', """
+                        SELECT COUNT(*) FROM t_p86122027_youth_job_portal.jobs
+                        WHERE id = ANY(%s) AND employer_id IS DISTINCT FROM %s
+                    """, (record_ids, session['sub']))
+                    foreign = cur.fetchone()[0]
+                    if foreign or any(isinstance(r, dict) and session_forbids(
+                            session, _job_field(r, 'employerId', 'employer_id', '')) for r in records):
+                        return {
+                            'statusCode': 403,
+                            'headers': {**cors_headers, 'Content-Type': 'application/json'},
+                            'body': dump_json({'error': 'Imported jobs must belong to the session user'}),
+                            'isBase64Encoded': False
+                        }
+                
+                print(f"Importing {len(records)} jobs, atomic: {atomic}")
+                
+                results, written = import_jobs(cur, records, atomic)
+                if written:
+                    conn.commit()
+                    invalidate_jobs_cache()
+                
+                summary = {status: sum(1 for r in results if r['status'] == status)
+                           for status in ('created', 'updated', 'invalid', 'skipped')}
+                print(f"Import finished: {summary}")
                 
-                print(f"Returning {len(jobs)} jobs")
                 return {
-                    'statusCode': 200,
+                    'statusCode': 200 if summary['invalid'] == 0 else (207 if written else 400),
                     'headers': {**cors_headers, 'Content-Type': 'application/json'},
-                    'body': json.dumps({'jobs': jobs}),
+                    'body': dump_json({'summary': summary, 'results': results}),
                     'isBase64Encoded': False
                 }
             
             if method == 'POST':
                 body_data = json.loads(event.get('body', '{}'))
+                record, errors = normalize_job_record(body_data)
+                if errors:
+                    return {
+                        'statusCode': 400,
+                        'headers': {**cors_headers, 'Content-Type': 'application/json'},
+                        'body': dump_json({'error': errors[0], 'errors': errors}),
+                        'isBase64Encoded': False
+                    }
                 
-                job_id = str(body_data.get('id', '')).replace("'", "''")
-                title = str(body_data.get('title', '')).replace("'", "''")
-                company = str(body_data.get('company', '')).replace("'", "''")
-                location = str(body_data.get('location', '')).replace("'", "''")
-                job_type = str(body_data.get('type', '')).replace("'", "''")
-                salary = str(body_data.get('salary', '')).replace("'", "''")
-                description = str(body_data.get('description', '')).replace("'", "''")
-                requirements = json.dumps(body_data.get('requirements', [])).replace("'", "''")
-                employer_id = str(body_data.get('employerId', '')).replace("'", "''")
-                employer_email = str(body_data.get('employerEmail', '')).replace("'", "''")
-                age_range = str(body_data.get('ageRange', '14-17')).replace("'", "''")
-                category = str(body_data.get('category', 'Работа с людьми')).replace("'", "''")
-                
-                coordinates = body_data.get('coordinates', [56.0184, 92.8672])
-                coords_json = json.dumps(coordinates).replace("'", "''")
-                
-                is_premium = 'true' if body_data.get('isPremium', False) else 'false'
-                
-                responsibilities = json.dumps(body_data.get('responsibilities', [])).replace("'", "''")
-                conditions = json.dumps(body_data.get('conditions', [])).replace("'", "''")
-                
-                contact = body_data.get('contact', {})
-                contact_phone = str(contact.get('phone', '+7 (391) 234-56-78')).replace("'", "''")
-                contact_email = str(contact.get('email', employer_email or 'hr@company.ru')).replace("'", "''")
+                if session_forbids(session, record['employer_id']):
+                    return {
+                        'statusCode': 403,
+                        'headers': {**cors_headers, 'Content-Type': 'application/json'},
+                        'body': dump_json({'error': 'employer_id does not match the session'}),
+                        'isBase64Encoded': False
+                    }
                 
-                print(f"Creating job: {title}")
+                print(f"Creating job: {record['title']}")
                 
-                cur.execute(f"""
+                execute(cur, 'job_insert', f"""
                     INSERT INTO t_p86122027_youth_job_portal.jobs 
-                    (id, title, company, location, type, salary, description, 
-                     requirements, employer_id, employer_email, created_at, updated_at,
-                     age_range, category, coordinates, is_premium, 
-                     responsibilities, conditions, contact_phone, contact_email)
-                    VALUES ('{job_id}', '{title}', '{company}', '{location}', '{job_type}', 
-                            '{salary}', '{description}', '{requirements}', '{employer_id}', 
-                            '{employer_email}', NOW(), NOW(), '{age_range}', '{category}', 
-                            '{coords_json}', {is_premium}, '{responsibilities}', '{conditions}', 
-                            '{contact_phone}', '{contact_email}')
+                    ({', '.join(JOB_WRITE_COLUMNS)}, created_at, updated_at)
+                    VALUES ({', '.join(['%s'] * len(JOB_WRITE_COLUMNS))}, NOW(), NOW())
                     RETURNING id
-                """)
+                """, [record[column] for column in JOB_WRITE_COLUMNS])
                 
                 result = cur.fetchone()
                 conn.commit()
+                invalidate_jobs_cache()
                 
                 print(f"Job created successfully: {result[0]}")
                 return {
                     'statusCode': 201,
                     'headers': {**cors_headers, 'Content-Type': 'application/json'},
-                    'body': json.dumps({'id': result[0]}),
+                    'body': dump_json({'id': result[0]}),
                     'isBase64Encoded': False
                 }
             
             if method == 'PUT':
                 body_data = json.loads(event.get('body', '{}'))
+                record, errors = normalize_job_record(body_data)
+                if errors:
+                    return {
+                        'statusCode': 400,
+                        'headers': {**cors_headers, 'Content-Type': 'application/json'},
+                        'body': dump_json({'error': errors[0], 'errors': errors}),
+                        'isBase64Encoded': False
+                    }
                 
-                job_id = str(body_data.get('id', '')).replace("'", "''")
-                title = str(body_data.get('title', '')).replace("'", "''")
-                company = str(body_data.get('company', '')).replace("'", "''")
-                location = str(body_data.get('location', '')).replace("'", "''")
-                job_type = str(body_data.get('type', '')).replace("'", "''")
-                salary = str(body_data.get('salary', '')).replace("'", "''")
-                description = str(body_data.get('description', '')).replace("'", "''")
-                requirements = json.dumps(body_data.get('requirements', [])).replace("'", "''")
-                employer_id = str(body_data.get('employerId', '')).replace("'", "''")
-                employer_email = str(body_data.get('employerEmail', '')).replace("'", "''")
-                age_range = str(body_data.get('ageRange', '14-17')).replace("'", "''")
-                category = str(body_data.get('category', 'Работа с людьми')).replace("'", "''")
-                
-                coordinates = body_data.get('coordinates', [56.0184, 92.8672])
-                coords_json = json.dumps(coordinates).replace("'", "''")
-                
-                is_premium = 'true' if body_data.get('isPremium', False) else 'false'
-                
-                responsibilities = json.dumps(body_data.get('responsibilities', [])).replace("'", "''")
-                conditions = json.dumps(body_data.get('conditions', [])).replace("'", "''")
-                
-                contact = body_data.get('contact', {})
-                contact_phone = str(contact.get('phone', '+7 (391) 234-56-78')).replace("'", "''")
-                contact_email = str(contact.get('email', employer_email or 'hr@company.ru')).replace("'", "''")
+                if session:
+                    current_employer = job_employer(cur, record['id'])
+                    if session_forbids(session, record['employer_id']) or \
+                            (current_employer is not None and session_forbids(session, current_employer)):
+                        return {
+                            'statusCode': 403,
+                            'headers': {**cors_headers, 'Content-Type': 'application/json'},
+                            'body': dump_json({'error': 'Only the employer can change the job'}),
+                            'isBase64Encoded': False
+                        }
                 
-                print(f"Updating job: {job_id}")
+                print(f"Updating job: {record['id']}")
                 
-                cur.execute(f"""
+                update_columns = [column for column in JOB_WRITE_COLUMNS if column != 'id']
+                execute(cur, 'job_update', f"""
                     UPDATE t_p86122027_youth_job_portal.jobs 
-                    SET title = '{title}', company = '{company}', location = '{location}', 
-                        type = '{job_type}', salary = '{salary}', description = '{description}', 
-                        requirements = '{requirements}', employer_id = '{employer_id}', 
-                        employer_email = '{employer_email}', updated_at = NOW(),
-                        age_range = '{age_range}', category = '{category}', 
-                        coordinates = '{coords_json}', is_premium = {is_premium},
-                        responsibilities = '{responsibilities}', conditions = '{conditions}', 
-                        contact_phone = '{contact_phone}', contact_email = '{contact_email}'
-                    WHERE id = '{job_id}'
+                    SET {', '.join(f'{column} = %s' for column in update_columns)}, updated_at = NOW()
+                    WHERE id = %s
                     RETURNING id
-                """)
+                """, [record[column] for column in update_columns] + [record['id']])
                 
                 result = cur.fetchone()
                 if not result:
@@ -289,39 +2502,40 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                     return {
                         'statusCode': 404,
                         'headers': {**cors_headers, 'Content-Type': 'application/json'},
-                        'body': json.dumps({'error': 'Job not found'}),
+                        'body': dump_json({'error': 'Job not found'}),
                         'isBase64Encoded': False
                     }
                 
                 conn.commit()
+                invalidate_jobs_cache()
                 
                 print(f"Job updated successfully: {result[0]}")
                 return {
                     'statusCode': 200,
                     'headers': {**cors_headers, 'Content-Type': 'application/json'},
-                    'body': json.dumps({'id': result[0]}),
+                    'body': dump_json({'id': result[0]}),
                     'isBase64Encoded': False
                 }
             
             if method == 'DELETE':
                 body_data = json.loads(event.get('body', '{}'))
-                job_id = str(body_data.get('id', '')).replace("'", "''")
+                job_id = str(body_data.get('id', ''))
                 
                 if not job_id:
                     return {
                         'statusCode': 400,
                         'headers': {**cors_headers, 'Content-Type': 'application/json'},
-                        'body': json.dumps({'error': 'Job ID required'}),
+                        'body': dump_json({'error': 'Job ID required'}),
                         'isBase64Encoded': False
                     }
                 
                 print(f"Deleting job: {job_id}")
                 
-                cur.execute(f"""
+                execute(cur, 'job_delete', """
                     DELETE FROM t_p86122027_youth_job_portal.jobs 
-                    WHERE id = '{job_id}'
-                    RETURNING id
-                """)
+                    WHERE id = %s
+                    RETURNING id, employer_id
+                """, (job_id,))
                 
                 result = cur.fetchone()
                 if not result:
@@ -329,51 +2543,127 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                     return {
                         'statusCode': 404,
                         'headers': {**cors_headers, 'Content-Type': 'application/json'},
-                        'body': json.dumps({'error': 'Job not found'}),
+                        'body': dump_json({'error': 'Job not found'}),
+                        'isBase64Encoded': False
+                    }
+                
+                if session_forbids(session, result[1]):
+                    conn.rollback()
+                    return {
+                        'statusCode': 403,
+                        'headers': {**cors_headers, 'Content-Type': 'application/json'},
+                        'body': dump_json({'error': 'Only the employer can delete the job'}),
                         'isBase64Encoded': False
                     }
                 
                 conn.commit()
+                invalidate_jobs_cache()
                 
                 print(f"Job deleted successfully: {result[0]}")
                 return {
                     'statusCode': 200,
                     'headers': {**cors_headers, 'Content-Type': 'application/json'},
-                    'body': json.dumps({'id': result[0], 'message': 'Job deleted'}),
+                    'body': dump_json({'id': result[0], 'message': 'Job deleted'}),
                     'isBase64Encoded': False
                 }
         
         # === APPLICATIONS API ===
         elif resource == 'applications':
             if method == 'GET':
+                # Обязательная область: вакансия, кандидат или все вакансии работодателя
+                # (scope=all — весь каталог для администратора площадки). Пагинация
+                # keyset по (created_at, id) включается параметром limit или cursor
                 job_id = query_params.get('job_id', '')
                 user_id = query_params.get('user_id', '')
+                employer_id = query_params.get('employer_id', '')
+                statuses = [s.strip() for s in query_params.get('status', '').split(',') if s.strip()]
+                # Весь каталог (scope=all) отдаётся только постранично
+                paginate = 'limit' in query_params or 'cursor' in query_params or query_params.get('scope') == 'all'
+                limit = None
+                cursor = None
+                try:
+                    if not (job_id or user_id or employer_id or query_params.get('scope') == 'all'):
+                        raise ValueError('job_id, user_id, employer_id or scope=all is required')
+                    fields = parse_fields(query_params.get('fields', ''), APPLICATION_COLUMN_FIELDS)
+                    if paginate:
+                        limit = min(max(int(query_params.get('limit', APPLICATIONS_PAGE_SIZE)), 1),
+                                    APPLICATIONS_MAX_PAGE_SIZE)
+                    if query_params.get('cursor'):
+                        cursor = decode_cursor(query_params['cursor'])
+                        uuid.UUID(cursor[1])
+                except ValueError as e:
+                    return {
+                        'statusCode': 400,
+                        'headers': {**cors_headers, 'Content-Type': 'application/json'},
+                        'body': dump_json({'error': str(e)}),
+                        'isBase64Encoded': False
+                    }
                 
-                print(f"Fetching applications with filters - job_id: {job_id}, user_id: {user_id}")
+                # С токеном — только свои отклики или отклики на свои вакансии
+                if session_forbids_scope(cur, session, user_id, employer_id, job_id):
+                    return {
+                        'statusCode': 403,
+                        'headers': {**cors_headers, 'Content-Type': 'application/json'},
+                        'body': dump_json({'error': 'Applications are visible only to the applicant and the employer'}),
+                        'isBase64Encoded': False
+                    }
                 
-                query = """
-                    SELECT id, job_id, user_id, user_name, user_email, user_phone, 
-                           user_age, cover_letter, status, created_at, updated_at
-                    FROM t_p86122027_youth_job_portal.applications
-                    WHERE 1=1
-                """
+                print(f"Fetching applications - job_id: {job_id}, user_id: {user_id}, employer_id: {employer_id}, "
+                      f"statuses: {len(statuses)}, limit: {limit}")
                 
+                filters = []
+                params: List[Any] = []
                 if job_id:
-                    job_id_safe = str(job_id).replace("'", "''")
-                    query += f" AND job_id = '{job_id_safe}'"
-                
+                    filters.append("job_id = %s")
+                    params.append(job_id)
                 if user_id:
-                    user_id_safe = str(user_id).replace("'", "''")
-                    query += f" AND user_id = '{user_id_safe}'"
+                    filters.append("user_id = %s")
+                    params.append(user_id)
+                if employer_id:
+                    filters.append("job_id IN (SELECT id FROM t_p86122027_youth_job_portal.jobs WHERE employer_id = %s)")
+                    params.append(employer_id)
+                
+                # Версия считается по области запроса, поэтому отклики на чужие вакансии её не меняют
+                etag, last_modified = applications_version(cur, filters or ['TRUE'], params, query_params)
+                if etag_matches(event, etag):
+                    return not_modified_response(cors_headers, etag, last_modified)
+                
+                if statuses:
+                    filters.append("status = ANY(%s)")
+                    params.append(statuses)
+                if cursor:
+                    filters.append("(created_at, id) < (%s, %s)")
+                    params.extend(cursor)
                 
-                query += " ORDER BY created_at DESC"
-                
-                cur.execute(query)
+                where_clause = f"WHERE {' AND '.join(filters)}" if filters else ""
+                limit_clause = ""
+                if limit:
+                    limit_clause = "LIMIT %s"
+                    params.append(limit + 1)
+                
+                # Страница выбирается по индексам applications, профили кандидатов
+                # подтягиваются по первичному ключу users только для её строк
+                execute_prepared(cur, 'applications_list', f"""
+                    SELECT {projected_columns(APPLICATION_COLUMN_FIELDS, fields, ('id', 'createdAt'))}
+                    FROM (
+                        SELECT * FROM t_p86122027_youth_job_portal.applications
+                        {where_clause}
+                        ORDER BY created_at DESC, id DESC
+                        {limit_clause}
+                    ) a
+                    LEFT JOIN t_p86122027_youth_job_portal.users u
+                        ON u.id = {USER_ID_JOIN_SQL.format(column='a.user_id')}
+                    ORDER BY a.created_at DESC, a.id DESC
+                """, params)
                 
                 rows = cur.fetchall()
+                next_cursor = None
+                if limit and len(rows) > limit:
+                    rows = rows[:limit]
+                    next_cursor = encode_cursor(rows[-1][9], rows[-1][0])
                 applications = []
                 for row in rows:
-                    applications.append({
+                    applications.append(project_fields({
                         'id': str(row[0]),
                         'jobId': str(row[1]),
                         'userId': str(row[2]),
@@ -385,56 +2675,60 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                         'status': row[8],
                         'createdAt': row[9].isoformat() if row[9] else None,
                         'updatedAt': row[10].isoformat() if row[10] else None
-                    })
+                    }, fields))
                 
                 return {
                     'statusCode': 200,
-                    'headers': {**cors_headers, 'Content-Type': 'application/json'},
-                    'body': json.dumps({'applications': applications}),
+                    'headers': {**cors_headers, 'Content-Type': 'application/json', **cache_headers(etag, last_modified)},
+                    'body': dump_json({'applications': applications, 'nextCursor': next_cursor} if paginate
+                                      else {'applications': applications}),
                     'isBase64Encoded': False
                 }
             
             if method == 'POST':
                 body_data = json.loads(event.get('body', '{}'))
                 
-                job_id = str(body_data.get('job_id', '')).replace("'", "''")
-                user_id = str(body_data.get('user_id', '')).replace("'", "''")
-                user_name = str(body_data.get('user_name', '')).replace("'", "''")
-                user_email = str(body_data.get('user_email', '')).replace("'", "''")
-                user_phone = str(body_data.get('user_phone', '')).replace("'", "''")
+                job_id = str(body_data.get('job_id', ''))
+                user_id = str(body_data.get('user_id', ''))
+                user_name = str(body_data.get('user_name', ''))
+                user_email = str(body_data.get('user_email', ''))
+                user_phone = str(body_data.get('user_phone', ''))
                 user_age = int(body_data.get('user_age', 0))
-                cover_letter = str(body_data.get('cover_letter', '')).replace("'", "''")
-                status = str(body_data.get('status', 'pending')).replace("'", "''")
-                
-                print(f"Creating application - user: {user_email}, job: {job_id}")
-                
-                cur.execute(f"""
-                    SELECT id FROM t_p86122027_youth_job_portal.applications 
-                    WHERE job_id = '{job_id}' AND user_id = '{user_id}'
-                """)
-                existing = cur.fetchone()
+                cover_letter = str(body_data.get('cover_letter', ''))
+                status = str(body_data.get('status', 'pending'))
                 
-                if existing:
-                    print(f"User {user_id} already applied to job {job_id}")
-                    conn.rollback()
+                if session and session['sub'] != user_id:
                     return {
-                        'statusCode': 400,
+                        'statusCode': 403,
                         'headers': {**cors_headers, 'Content-Type': 'application/json'},
-                        'body': json.dumps({'error': 'You have already applied to this job'}),
+                        'body': dump_json({'error': 'user_id does not match the session'}),
                         'isBase64Encoded': False
                     }
                 
-                cur.execute(f"""
+                print(f"Creating application - user: {user_email}, job: {job_id}")
+                
+                # Повторный отклик отсекает уникальный индекс (job_id, user_id) из V0022:
+                # одна команда без окна гонки между проверкой и вставкой
+                execute_prepared(cur, 'application_insert', """
                     INSERT INTO t_p86122027_youth_job_portal.applications 
                     (job_id, user_id, user_name, user_email, user_phone, user_age, 
                      cover_letter, status, created_at, updated_at)
-                    VALUES ('{job_id}', '{user_id}', '{user_name}', '{user_email}', 
-                            '{user_phone}', {user_age}, '{cover_letter}', '{status}', 
-                            NOW(), NOW())
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, NOW(), NOW())
+                    ON CONFLICT (job_id, user_id) DO NOTHING
                     RETURNING id, created_at
-                """)
+                """, (job_id, user_id, user_name, user_email, user_phone, user_age, cover_letter, status))
                 
                 result = cur.fetchone()
+                if not result:
+                    print(f"User {user_id} already applied to job {job_id}")
+                    conn.rollback()
+                    return {
+                        'statusCode': 400,
+                        'headers': {**cors_headers, 'Content-Type': 'application/json'},
+                        'body': dump_json({'error': 'You have already applied to this job'}),
+                        'isBase64Encoded': False
+                    }
+                
                 application_id = result[0]
                 created_at = result[1]
                 conn.commit()
@@ -444,7 +2738,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                 return {
                     'statusCode': 201,
                     'headers': {**cors_headers, 'Content-Type': 'application/json'},
-                    'body': json.dumps({
+                    'body': dump_json({
                         'id': str(application_id),
                         'jobId': job_id,
                         'userId': user_id,
@@ -462,26 +2756,26 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             if method == 'PUT':
                 body_data = json.loads(event.get('body', '{}'))
                 
-                application_id = str(body_data.get('id', '')).replace("'", "''")
-                status = str(body_data.get('status', '')).replace("'", "''")
+                application_id = str(body_data.get('id', ''))
+                status = str(body_data.get('status', ''))
                 
                 if not application_id or not status:
                     return {
                         'statusCode': 400,
                         'headers': {**cors_headers, 'Content-Type': 'application/json'},
-                        'body': json.dumps({'error': 'Missing required fields: id, status'}),
+                        'body': dump_json({'error': 'Missing required fields: id, status'}),
                         'isBase64Encoded': False
                     }
                 
                 print(f"Updating application {application_id} status to {status}")
                 
-                cur.execute(f"""
+                execute(cur, 'application_update_status', """
                     UPDATE t_p86122027_youth_job_portal.applications 
-                    SET status = '{status}', updated_at = NOW()
-                    WHERE id = '{application_id}'
+                    SET status = %s, updated_at = NOW()
+                    WHERE id = %s
                     RETURNING id, job_id, user_id, user_name, user_email, user_phone, 
                               user_age, cover_letter, status, created_at, updated_at
-                """)
+                """, (status, application_id))
                 
                 row = cur.fetchone()
                 
@@ -490,7 +2784,17 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                     return {
                         'statusCode': 404,
                         'headers': {**cors_headers, 'Content-Type': 'application/json'},
-                        'body': json.dumps({'error': 'Application not found'}),
+                        'body': dump_json({'error': 'Application not found'}),
+                        'isBase64Encoded': False
+                    }
+                
+                # Статус отклика ведёт работодатель вакансии
+                if session and session_forbids(session, job_employer(cur, row[1])):
+                    conn.rollback()
+                    return {
+                        'statusCode': 403,
+                        'headers': {**cors_headers, 'Content-Type': 'application/json'},
+                        'body': dump_json({'error': 'Only the employer can change the application status'}),
                         'isBase64Encoded': False
                     }
                 
@@ -515,36 +2819,46 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                 return {
                     'statusCode': 200,
                     'headers': {**cors_headers, 'Content-Type': 'application/json'},
-                    'body': json.dumps(application),
+                    'body': dump_json(application),
                     'isBase64Encoded': False
                 }
             
             if method == 'DELETE':
-                application_id = str(query_params.get('id', '')).replace("'", "''")
+                application_id = str(query_params.get('id', ''))
                 
                 if not application_id:
                     return {
                         'statusCode': 400,
                         'headers': {**cors_headers, 'Content-Type': 'application/json'},
-                        'body': json.dumps({'error': 'Missing required parameter: id'}),
+                        'body': dump_json({'error': 'Missing required parameter: id'}),
                         'isBase64Encoded': False
                     }
                 
                 print(f"Deleting application {application_id}")
                 
-                cur.execute(f"""
+                execute(cur, 'application_delete', """
                     DELETE FROM t_p86122027_youth_job_portal.applications 
-                    WHERE id = '{application_id}'
-                """)
+                    WHERE id = %s
+                    RETURNING user_id, job_id
+                """, (application_id,))
                 
-                deleted_count = cur.rowcount
+                deleted = cur.fetchone()
+                # Отклик удаляет кандидат или работодатель вакансии
+                if deleted and session and session_forbids(session, deleted[0], job_employer(cur, deleted[1])):
+                    conn.rollback()
+                    return {
+                        'statusCode': 403,
+                        'headers': {**cors_headers, 'Content-Type': 'application/json'},
+                        'body': dump_json({'error': 'Only the applicant or the employer can delete the application'}),
+                        'isBase64Encoded': False
+                    }
                 conn.commit()
                 
-                if deleted_count == 0:
+                if not deleted:
                     return {
                         'statusCode': 404,
                         'headers': {**cors_headers, 'Content-Type': 'application/json'},
-                        'body': json.dumps({'error': 'Application not found'}),
+                        'body': dump_json({'error': 'Application not found'}),
                         'isBase64Encoded': False
                     }
                 
@@ -553,7 +2867,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                 return {
                     'statusCode': 200,
                     'headers': {**cors_headers, 'Content-Type': 'application/json'},
-                    'body': json.dumps({'message': 'Application deleted successfully'}),
+                    'body': dump_json({'message': 'Application deleted successfully'}),
                     'isBase64Encoded': False
                 }
         
@@ -564,101 +2878,188 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                 receiver_id = query_params.get('receiver_id', '')
                 user_id = query_params.get('user_id', '')
                 job_id = query_params.get('job_id', '')
+
+                # С токеном читать можно только свою переписку и свой список
+                if (sender_id or user_id) and session_forbids(session, sender_id or user_id):
+                    return {
+                        'statusCode': 403,
+                        'headers': {**cors_headers, 'Content-Type': 'application/json'},
+                        'body': dump_json({'error': 'sender_id or user_id does not match the session'}),
+                        'isBase64Encoded': False
+                    }
+
+                # Версия своей переписки или своего списка: чужие сообщения ETag не сбрасывают.
+                # В режиме long-poll совпадение ETag означает "ждать", а не 304
+                etag, last_modified = '', ''
+                if (sender_id and receiver_id) or user_id:
+                    etag, last_modified = conversation_version(cur, sender_id or user_id,
+                                                               receiver_id if sender_id else '', job_id, query_params)
+                if etag and 'wait' not in query_params and etag_matches(event, etag):
+                    return not_modified_response(cors_headers, etag, last_modified)
+
+                if 'wait' in query_params and ((sender_id and receiver_id) or user_id):
+                    try:
+                        wait = min(max(float(query_params['wait']), 0.0), LONG_POLL_MAX_WAIT)
+                        if query_params.get('after_id'):
+                            uuid.UUID(query_params['after_id'])
+                        if query_params.get('after_created_at'):
+                            datetime.fromisoformat(query_params['after_created_at'])
+                        if query_params.get('since'):
+                            datetime.fromisoformat(query_params['since'])
+                    except ValueError:
+                        return {
+                            'statusCode': 400,
+                            'headers': {**cors_headers, 'Content-Type': 'application/json'},
+                            'body': dump_json({'error': 'Invalid wait, after_id, after_created_at or since'}),
+                            'isBase64Encoded': False
+                        }
+
+                    waiter_id = sender_id or user_id
+                    ensure_message_listener()
+                    deadline = time.monotonic() + wait
+                    # Номер события фиксируем до проверки в БД, чтобы не потерять
+                    # сообщение, пришедшее между проверкой и началом ожидания
+                    seen_seq = current_message_event_seq()
+                    while not has_new_messages(cur, waiter_id, receiver_id, job_id, query_params.get('after_id', ''),
+                                               query_params.get('after_created_at', ''), query_params.get('since', '')):
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        # На время сна соединение возвращается в пул: ждущие клиенты
+                        # не должны занимать его у остальных запросов экземпляра
+                        cur.close()
+                        release_connection(conn)
+                        del cur, conn
+                        seen_seq = wait_for_message_event(waiter_id, seen_seq, min(remaining, LONG_POLL_RECHECK_INTERVAL))
+                        conn = get_connection()
+                        cur = conn.cursor()
+
+                    # ETag ответа должен описывать состояние после ожидания
+                    etag, last_modified = conversation_version(cur, waiter_id,
+                                                               receiver_id if sender_id else '', job_id, query_params)
                 
                 if sender_id and receiver_id:
-                    sender_id_safe = str(sender_id).replace("'", "''")
-                    receiver_id_safe = str(receiver_id).replace("'", "''")
-                    
+                    since = query_params.get('since', '')
+                    after_id = query_params.get('after_id', '')
+                    after_created_at = query_params.get('after_created_at', '')
+                    read_since = query_params.get('read_since', '') or since
+                    delta = bool(since or after_id)
+
+                    # pair_key + job_id + created_at покрываются индексом из V0017
+                    filters = ["pair_key = %s"]
+                    params: List[Any] = [pair_key(sender_id, receiver_id)]
                     if job_id:
-                        job_id_safe = str(job_id).replace("'", "''")
-                        print(f"Fetching conversation between {sender_id} and {receiver_id} for job {job_id}")
-                        
-                        cur.execute(f"""
-                            SELECT id, sender_id, receiver_id, job_id, message_text, is_read, created_at
-                            FROM t_p86122027_youth_job_portal.messages
-                            WHERE ((sender_id = '{sender_id_safe}' AND receiver_id = '{receiver_id_safe}')
-                               OR (sender_id = '{receiver_id_safe}' AND receiver_id = '{sender_id_safe}'))
-                               AND job_id = '{job_id_safe}'
-                            ORDER BY created_at ASC
-                        """)
-                    else:
-                        print(f"Fetching conversation between {sender_id} and {receiver_id}")
-                        
-                        cur.execute(f"""
-                            SELECT id, sender_id, receiver_id, job_id, message_text, is_read, created_at
-                            FROM t_p86122027_youth_job_portal.messages
-                            WHERE (sender_id = '{sender_id_safe}' AND receiver_id = '{receiver_id_safe}')
-                               OR (sender_id = '{receiver_id_safe}' AND receiver_id = '{sender_id_safe}')
-                            ORDER BY created_at ASC
-                        """)
-                    
+                        filters.append("job_id = %s")
+                        params.append(job_id)
+                    conversation_filter = ' AND '.join(filters)
+                    conversation_params = list(params)
+
+                    limit_clause = ""
+                    if delta:
+                        try:
+                            limit = min(max(int(query_params.get('limit', MESSAGES_PAGE_SIZE)), 1), MESSAGES_MAX_PAGE_SIZE)
+                            since_ts = datetime.fromisoformat(since) if since else None
+                            read_since_ts = datetime.fromisoformat(read_since) if read_since else None
+                            after_created_at_ts = datetime.fromisoformat(after_created_at) if after_created_at else None
+                            if after_id:
+                                uuid.UUID(after_id)
+                        except ValueError:
+                            return {
+                                'statusCode': 400,
+                                'headers': {**cors_headers, 'Content-Type': 'application/json'},
+                                'body': dump_json({'error': 'Invalid since, read_since, after_created_at or limit'}),
+                                'isBase64Encoded': False
+                            }
+
+                        # after_id точнее since: разрешает совпадения created_at по id
+                        cursor_filter, cursor_params = message_cursor_filter(cur, after_id, after_created_at_ts, since_ts)
+                        filters.append(cursor_filter)
+                        params.extend(cursor_params)
+                        # Берём на одну строку больше, чтобы понять, есть ли продолжение
+                        limit_clause = "LIMIT %s"
+                        params.append(limit + 1)
+
+                    print(f"Fetching conversation between {sender_id} and {receiver_id}, job: {job_id or '-'}, delta: {delta}")
+
+                    execute(cur, 'clock', "SELECT NOW()")
+                    synced_at = cur.fetchone()[0]
+
+                    execute_prepared(cur, 'conversation_messages', f"""
+                        SELECT {MESSAGE_COLUMNS}
+                        FROM t_p86122027_youth_job_portal.messages
+                        WHERE {' AND '.join(filters)}
+                        ORDER BY created_at ASC, id ASC
+                        {limit_clause}
+                    """, params)
+
                     rows = cur.fetchall()
-                    messages = []
-                    for row in rows:
-                        messages.append({
-                            'id': str(row[0]),
-                            'senderId': str(row[1]),
-                            'receiverId': str(row[2]),
-                            'jobId': str(row[3]) if row[3] else None,
-                            'messageText': row[4],
-                            'isRead': row[5],
-                            'createdAt': row[6].isoformat() if row[6] else None
-                        })
-                    
+                    has_more = delta and len(rows) > limit
+                    if has_more:
+                        rows = rows[:limit]
+                    messages = [message_from_row(row) for row in rows]
+
+                    response_body: Dict[str, Any] = {'messages': messages, 'syncedAt': synced_at.isoformat()}
+
+                    if delta:
+                        read_updates = []
+                        if read_since_ts:
+                            execute_prepared(cur, 'conversation_read_updates', f"""
+                                SELECT id, is_read
+                                FROM t_p86122027_youth_job_portal.messages
+                                WHERE {conversation_filter} AND read_changed_at > %s
+                                LIMIT %s
+                            """, conversation_params + [read_since_ts, MESSAGES_MAX_PAGE_SIZE])
+                            read_updates = [{'id': str(row[0]), 'isRead': row[1]} for row in cur.fetchall()]
+                        response_body['readUpdates'] = read_updates
+                        response_body['hasMore'] = has_more
+
                     return {
                         'statusCode': 200,
-                        'headers': {**cors_headers, 'Content-Type': 'application/json'},
-                        'body': json.dumps({'messages': messages}),
+                        'headers': {**cors_headers, 'Content-Type': 'application/json', **cache_headers(etag, last_modified)},
+                        'body': dump_json(response_body),
                         'isBase64Encoded': False
                     }
                 
                 elif user_id:
-                    user_id_safe = str(user_id).replace("'", "''")
-                    
                     print(f"Fetching all conversations for user {user_id}")
                     
-                    cur.execute(f"""
-                        WITH user_messages AS (
-                            SELECT 
-                                CASE 
-                                    WHEN sender_id = '{user_id_safe}' THEN receiver_id
-                                    ELSE sender_id
-                                END AS other_user_id,
-                                id, sender_id, receiver_id, job_id, message_text, is_read, created_at,
-                                ROW_NUMBER() OVER (
-                                    PARTITION BY CASE 
-                                        WHEN sender_id = '{user_id_safe}' THEN receiver_id
-                                        ELSE sender_id
-                                    END 
-                                    ORDER BY created_at DESC
-                                ) AS rn
-                            FROM t_p86122027_youth_job_portal.messages
-                            WHERE sender_id = '{user_id_safe}' OR receiver_id = '{user_id_safe}'
-                        )
-                        SELECT id, sender_id, receiver_id, job_id, message_text, is_read, created_at, other_user_id
-                        FROM user_messages
-                        WHERE rn = 1
-                        ORDER BY created_at DESC
-                    """)
+                    # Сводка ведётся при записи сообщений (V0016), поэтому список переписок —
+                    # два диапазонных чтения по индексам (user_a, ...) и (user_b, ...)
+                    execute_prepared(cur, 'conversations_list', """
+                        SELECT last_message_id, last_sender_id, job_id, last_message_text, last_is_read,
+                               last_message_at, user_b AS other_user_id, unread_a AS unread_count
+                        FROM t_p86122027_youth_job_portal.conversations
+                        WHERE user_a = %s
+                        UNION ALL
+                        SELECT last_message_id, last_sender_id, job_id, last_message_text, last_is_read,
+                               last_message_at, user_a AS other_user_id, unread_b AS unread_count
+                        FROM t_p86122027_youth_job_portal.conversations
+                        WHERE user_b = %s AND user_a <> %s
+                        ORDER BY last_message_at DESC
+                    """, (user_id, user_id, user_id))
                     
                     rows = cur.fetchall()
+                    other_users = fetch_user_summaries(cur, [str(row[6]) for row in rows])
                     conversations = []
                     for row in rows:
+                        other_user_id = str(row[6])
                         conversations.append({
                             'id': str(row[0]),
                             'senderId': str(row[1]),
-                            'receiverId': str(row[2]),
-                            'jobId': str(row[3]) if row[3] else None,
-                            'messageText': row[4],
-                            'isRead': row[5],
-                            'createdAt': row[6].isoformat() if row[6] else None,
-                            'otherUserId': str(row[7])
+                            'receiverId': other_user_id if str(row[1]) == str(user_id) else str(user_id),
+                            'jobId': str(row[2]) if row[2] else None,
+                            'messageText': row[3],
+                            'isRead': row[4],
+                            'createdAt': row[5].isoformat() if row[5] else None,
+                            'otherUserId': other_user_id,
+                            'otherUser': other_users.get(other_user_id),
+                            'unreadCount': row[7]
                         })
                     
                     return {
                         'statusCode': 200,
-                        'headers': {**cors_headers, 'Content-Type': 'application/json'},
-                        'body': json.dumps({'conversations': conversations}),
+                        'headers': {**cors_headers, 'Content-Type': 'application/json', **cache_headers(etag, last_modified)},
+                        'body': dump_json({'conversations': conversations}),
                         'isBase64Encoded': False
                     }
                 
@@ -666,55 +3067,57 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                     return {
                         'statusCode': 400,
                         'headers': {**cors_headers, 'Content-Type': 'application/json'},
-                        'body': json.dumps({'error': 'Missing required parameters. Provide either sender_id & receiver_id or user_id'}),
+                        'body': dump_json({'error': 'Missing required parameters. Provide either sender_id & receiver_id or user_id'}),
                         'isBase64Encoded': False
                     }
             
             if method == 'POST':
                 body_data = json.loads(event.get('body', '{}'))
                 
-                sender_id = str(body_data.get('sender_id', '')).replace("'", "''")
-                receiver_id = str(body_data.get('receiver_id', '')).replace("'", "''")
+                sender_id = str(body_data.get('sender_id', ''))
+                receiver_id = str(body_data.get('receiver_id', ''))
                 job_id = body_data.get('job_id', None)
-                message_text = str(body_data.get('message_text', '')).replace("'", "''")
+                message_text = str(body_data.get('message_text', ''))
                 
                 if not sender_id or not receiver_id or not message_text:
                     return {
                         'statusCode': 400,
                         'headers': {**cors_headers, 'Content-Type': 'application/json'},
-                        'body': json.dumps({'error': 'Missing required fields: sender_id, receiver_id, message_text'}),
+                        'body': dump_json({'error': 'Missing required fields: sender_id, receiver_id, message_text'}),
+                        'isBase64Encoded': False
+                    }
+                
+                if session and session['sub'] != sender_id:
+                    return {
+                        'statusCode': 403,
+                        'headers': {**cors_headers, 'Content-Type': 'application/json'},
+                        'body': dump_json({'error': 'sender_id does not match the session'}),
                         'isBase64Encoded': False
                     }
                 
                 print(f"Sending message from {sender_id} to {receiver_id}")
                 
-                if job_id:
-                    job_id_safe = str(job_id).replace("'", "''")
-                    cur.execute(f"""
-                        INSERT INTO t_p86122027_youth_job_portal.messages 
-                        (sender_id, receiver_id, job_id, message_text, is_read, created_at)
-                        VALUES ('{sender_id}', '{receiver_id}', '{job_id_safe}', '{message_text}', FALSE, NOW())
-                        RETURNING id, created_at
-                    """)
-                else:
-                    cur.execute(f"""
-                        INSERT INTO t_p86122027_youth_job_portal.messages 
-                        (sender_id, receiver_id, job_id, message_text, is_read, created_at)
-                        VALUES ('{sender_id}', '{receiver_id}', NULL, '{message_text}', FALSE, NOW())
-                        RETURNING id, created_at
-                    """)
+                execute(cur, 'message_insert', """
+                    INSERT INTO t_p86122027_youth_job_portal.messages 
+                    (sender_id, receiver_id, job_id, message_text, is_read, created_at)
+                    VALUES (%s, %s, %s, %s, FALSE, NOW())
+                    RETURNING id, created_at
+                """, (sender_id, receiver_id, str(job_id) if job_id else None, message_text))
                 
                 result = cur.fetchone()
                 message_id = result[0]
                 created_at = result[1]
+                record_message_in_conversation(cur, message_id, sender_id, receiver_id,
+                                               job_id, message_text, created_at)
                 conn.commit()
+                publish_message_event([sender_id, receiver_id])
                 
                 print(f"Message sent successfully with id: {message_id}")
                 
                 return {
                     'statusCode': 201,
                     'headers': {**cors_headers, 'Content-Type': 'application/json'},
-                    'body': json.dumps({
+                    'body': dump_json({
                         'id': str(message_id),
                         'senderId': sender_id,
                         'receiverId': receiver_id,
@@ -729,27 +3132,80 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             if method == 'PUT':
                 body_data = json.loads(event.get('body', '{}'))
                 
-                message_id = str(body_data.get('id', '')).replace("'", "''")
+                # Пакетная отметка: всё входящее в переписке до сообщения/момента
+                if body_data.get('reader_id'):
+                    reader_id = str(body_data.get('reader_id', ''))
+                    partner_id = str(body_data.get('partner_id', ''))
+                    up_to_id = str(body_data.get('up_to_id', '') or '')
+                    up_to = str(body_data.get('up_to', '') or '')
+                    
+                    if not partner_id:
+                        return {
+                            'statusCode': 400,
+                            'headers': {**cors_headers, 'Content-Type': 'application/json'},
+                            'body': dump_json({'error': 'Missing required field: partner_id'}),
+                            'isBase64Encoded': False
+                        }
+                    
+                    if session and session['sub'] != reader_id:
+                        return {
+                            'statusCode': 403,
+                            'headers': {**cors_headers, 'Content-Type': 'application/json'},
+                            'body': dump_json({'error': 'reader_id does not match the session'}),
+                            'isBase64Encoded': False
+                        }
+                    
+                    try:
+                        if up_to_id:
+                            uuid.UUID(up_to_id)
+                        up_to_ts = datetime.fromisoformat(up_to) if up_to else None
+                    except ValueError:
+                        return {
+                            'statusCode': 400,
+                            'headers': {**cors_headers, 'Content-Type': 'application/json'},
+                            'body': dump_json({'error': 'Invalid up_to_id or up_to'}),
+                            'isBase64Encoded': False
+                        }
+                    
+                    print(f"Marking conversation {reader_id} <- {partner_id} as read, job: {body_data.get('job_id') or '-'}")
+                    
+                    marked_count = mark_conversation_read(cur, reader_id, partner_id, str(body_data.get('job_id') or ''),
+                                                          up_to_id, up_to_ts)
+                    conn.commit()
+                    
+                    return {
+                        'statusCode': 200,
+                        'headers': {**cors_headers, 'Content-Type': 'application/json'},
+                        'body': dump_json({'marked': marked_count}),
+                        'isBase64Encoded': False
+                    }
+                
+                message_id = str(body_data.get('id', ''))
                 is_read = body_data.get('is_read', True)
                 
                 if not message_id:
                     return {
                         'statusCode': 400,
                         'headers': {**cors_headers, 'Content-Type': 'application/json'},
-                        'body': json.dumps({'error': 'Missing required field: id'}),
+                        'body': dump_json({'error': 'Missing required field: id'}),
                         'isBase64Encoded': False
                     }
                 
                 print(f"Marking message {message_id} as read: {is_read}")
                 
-                is_read_str = 'TRUE' if is_read else 'FALSE'
-                
-                cur.execute(f"""
-                    UPDATE t_p86122027_youth_job_portal.messages 
-                    SET is_read = {is_read_str}
-                    WHERE id = '{message_id}'
-                    RETURNING id, sender_id, receiver_id, job_id, message_text, is_read, created_at
-                """)
+                execute(cur, 'message_mark_read', """
+                    WITH old AS (
+                        SELECT id, is_read FROM t_p86122027_youth_job_portal.messages
+                        WHERE id = %s
+                        FOR UPDATE
+                    )
+                    UPDATE t_p86122027_youth_job_portal.messages m
+                    SET is_read = %s, read_changed_at = NOW()
+                    FROM old
+                    WHERE m.id = old.id
+                    RETURNING m.id, m.sender_id, m.receiver_id, m.job_id, m.message_text, m.is_read, m.created_at,
+                              old.is_read
+                """, (message_id, bool(is_read)))
                 
                 row = cur.fetchone()
                 
@@ -758,10 +3214,24 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                     return {
                         'statusCode': 404,
                         'headers': {**cors_headers, 'Content-Type': 'application/json'},
-                        'body': json.dumps({'error': 'Message not found'}),
+                        'body': dump_json({'error': 'Message not found'}),
                         'isBase64Encoded': False
                     }
                 
+                # Признак прочтения меняет только получатель
+                if session and session['sub'] != str(row[2]):
+                    conn.rollback()
+                    return {
+                        'statusCode': 403,
+                        'headers': {**cors_headers, 'Content-Type': 'application/json'},
+                        'body': dump_json({'error': 'Only the receiver can change the read state'}),
+                        'isBase64Encoded': False
+                    }
+                
+                was_read = bool(row[7])
+                if was_read != bool(is_read):
+                    adjust_conversation_read_state(cur, row[0], row[2], row[1], row[3],
+                                                   -1 if is_read else 1, bool(is_read))
                 conn.commit()
                 
                 message = {
@@ -779,37 +3249,49 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                 return {
                     'statusCode': 200,
                     'headers': {**cors_headers, 'Content-Type': 'application/json'},
-                    'body': json.dumps(message),
+                    'body': dump_json(message),
                     'isBase64Encoded': False
                 }
             
             if method == 'DELETE':
                 body_data = json.loads(event.get('body', '{}'))
-                message_id = str(body_data.get('id', '')).replace("'", "''")
+                message_id = str(body_data.get('id', ''))
                 
                 if not message_id:
                     return {
                         'statusCode': 400,
                         'headers': {**cors_headers, 'Content-Type': 'application/json'},
-                        'body': json.dumps({'error': 'Missing required field: id'}),
+                        'body': dump_json({'error': 'Missing required field: id'}),
                         'isBase64Encoded': False
                     }
                 
                 print(f"Deleting message {message_id}")
                 
-                cur.execute(f"""
+                execute(cur, 'message_delete', """
                     DELETE FROM t_p86122027_youth_job_portal.messages 
-                    WHERE id = '{message_id}'
-                """)
+                    WHERE id = %s
+                    RETURNING sender_id, receiver_id, job_id
+                """, (message_id,))
                 
-                deleted_count = cur.rowcount
+                deleted = cur.fetchone()
+                # Сообщение удаляет любой из участников переписки
+                if deleted and session_forbids(session, deleted[0], deleted[1]):
+                    conn.rollback()
+                    return {
+                        'statusCode': 403,
+                        'headers': {**cors_headers, 'Content-Type': 'application/json'},
+                        'body': dump_json({'error': 'Only a participant can delete the message'}),
+                        'isBase64Encoded': False
+                    }
+                if deleted:
+                    refresh_conversation(cur, deleted[0], deleted[1], deleted[2])
                 conn.commit()
                 
-                if deleted_count == 0:
+                if not deleted:
                     return {
                         'statusCode': 404,
                         'headers': {**cors_headers, 'Content-Type': 'application/json'},
-                        'body': json.dumps({'error': 'Message not found'}),
+                        'body': dump_json({'error': 'Message not found'}),
                         'isBase64Encoded': False
                     }
                 
@@ -818,40 +3300,89 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                 return {
                     'statusCode': 200,
                     'headers': {**cors_headers, 'Content-Type': 'application/json'},
-                    'body': json.dumps({'message': 'Message deleted successfully'}),
+                    'body': dump_json({'message': 'Message deleted successfully'}),
                     'isBase64Encoded': False
                 }
         
         # === INTERVIEWS API ===
         elif resource == 'interviews':
             if method == 'GET':
+                etag, last_modified = resource_version(cur, 'interviews', query_params)
+                if etag_matches(event, etag):
+                    return not_modified_response(cors_headers, etag, last_modified)
+
                 user_id = query_params.get('user_id', '')
                 job_id = query_params.get('job_id', '')
+                employer_id = query_params.get('employer_id', '')
+                # Пагинация по (interview_date, id) включается параметром limit или cursor
+                paginate = 'limit' in query_params or 'cursor' in query_params
+                limit = None
+                cursor = None
+                try:
+                    fields = parse_fields(query_params.get('fields', ''), INTERVIEW_COLUMN_FIELDS)
+                    if paginate:
+                        limit = min(max(int(query_params.get('limit', INTERVIEWS_PAGE_SIZE)), 1),
+                                    INTERVIEWS_MAX_PAGE_SIZE)
+                    if query_params.get('cursor'):
+                        cursor = decode_cursor(query_params['cursor'])
+                        cursor = (cursor[0], int(cursor[1]))
+                except ValueError as e:
+                    return {
+                        'statusCode': 400,
+                        'headers': {**cors_headers, 'Content-Type': 'application/json'},
+                        'body': dump_json({'error': str(e)}),
+                        'isBase64Encoded': False
+                    }
+                
+                if session_forbids_scope(cur, session, user_id, employer_id, job_id):
+                    return {
+                        'statusCode': 403,
+                        'headers': {**cors_headers, 'Content-Type': 'application/json'},
+                        'body': dump_json({'error': 'Interviews are visible only to the candidate and the employer'}),
+                        'isBase64Encoded': False
+                    }
                 
-                print(f"Fetching interviews - user_id: {user_id}, job_id: {job_id}")
+                print(f"Fetching interviews - user_id: {user_id}, job_id: {job_id}, employer_id: {employer_id}, "
+                      f"limit: {limit}")
                 
                 filters = []
+                params: List[Any] = []
                 if user_id:
-                    user_id_safe = str(user_id).replace("'", "''")
-                    filters.append(f"user_id = '{user_id_safe}'")
+                    filters.append("user_id = %s")
+                    params.append(user_id)
                 if job_id:
-                    job_id_safe = str(job_id).replace("'", "''")
-                    filters.append(f"job_id = '{job_id_safe}'")
+                    filters.append("job_id = %s")
+                    params.append(job_id)
+                if employer_id:
+                    filters.append("job_id IN (SELECT id FROM t_p86122027_youth_job_portal.jobs WHERE employer_id = %s)")
+                    params.append(employer_id)
+                if cursor:
+                    filters.append("(interview_date, id) < (%s, %s)")
+                    params.extend(cursor)
                 
                 where_clause = f"WHERE {' AND '.join(filters)}" if filters else ""
-                
-                cur.execute(f"""
-                    SELECT id, user_id, job_id, user_name, user_email, user_age,
-                           job_title, interview_date, location, notes, created_at
+                limit_clause = ""
+                if limit:
+                    # Берём на одну строку больше, чтобы понять, есть ли следующая страница
+                    limit_clause = "LIMIT %s"
+                    params.append(limit + 1)
+                
+                execute_prepared(cur, 'interviews_list', f"""
+                    SELECT {projected_columns(INTERVIEW_COLUMN_FIELDS, fields, ('id', 'date'))}
                     FROM t_p86122027_youth_job_portal.interviews
                     {where_clause}
-                    ORDER BY interview_date DESC
-                """)
+                    ORDER BY interview_date DESC, id DESC
+                    {limit_clause}
+                """, params)
                 
                 rows = cur.fetchall()
+                next_cursor = None
+                if limit and len(rows) > limit:
+                    rows = rows[:limit]
+                    next_cursor = encode_cursor(rows[-1][7], rows[-1][0])
                 interviews = []
                 for row in rows:
-                    interviews.append({
+                    interviews.append(project_fields({
                         'id': row[0],
                         'userId': str(row[1]),
                         'jobId': str(row[2]),
@@ -863,39 +3394,48 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                         'location': row[8],
                         'notes': row[9],
                         'timestamp': int(row[10].timestamp() * 1000) if row[10] else None
-                    })
+                    }, fields))
                 
                 return {
                     'statusCode': 200,
-                    'headers': {**cors_headers, 'Content-Type': 'application/json'},
-                    'body': json.dumps({'interviews': interviews}),
+                    'headers': {**cors_headers, 'Content-Type': 'application/json', **cache_headers(etag, last_modified)},
+                    'body': dump_json({'interviews': interviews, 'nextCursor': next_cursor} if paginate
+                                      else {'interviews': interviews}),
                     'isBase64Encoded': False
                 }
             
             if method == 'POST':
                 body_data = json.loads(event.get('body', '{}'))
                 
-                user_id = str(body_data.get('userId', '')).replace("'", "''")
-                job_id = str(body_data.get('jobId', '')).replace("'", "''")
-                user_name = str(body_data.get('userName', '')).replace("'", "''")
-                user_email = str(body_data.get('userEmail', '')).replace("'", "''")
+                user_id = str(body_data.get('userId', ''))
+                job_id = str(body_data.get('jobId', ''))
+                user_name = str(body_data.get('userName', ''))
+                user_email = str(body_data.get('userEmail', ''))
                 user_age = int(body_data.get('userAge', 0))
-                job_title = str(body_data.get('jobTitle', '')).replace("'", "''")
-                interview_date = str(body_data.get('date', '')).replace("'", "''")
-                location = str(body_data.get('location', '')).replace("'", "''")
-                notes = str(body_data.get('notes', '')).replace("'", "''")
+                job_title = str(body_data.get('jobTitle', ''))
+                interview_date = str(body_data.get('date', ''))
+                location = str(body_data.get('location', ''))
+                notes = str(body_data.get('notes', ''))
+                
+                # Собеседование назначает работодатель вакансии
+                if session and session_forbids(session, job_employer(cur, job_id)):
+                    return {
+                        'statusCode': 403,
+                        'headers': {**cors_headers, 'Content-Type': 'application/json'},
+                        'body': dump_json({'error': 'Only the employer can schedule an interview'}),
+                        'isBase64Encoded': False
+                    }
                 
                 print(f"Creating interview for user {user_id} on job {job_id}")
                 
-                cur.execute(f"""
+                execute(cur, 'interview_insert', """
                     INSERT INTO t_p86122027_youth_job_portal.interviews 
                     (user_id, job_id, user_name, user_email, user_age, job_title, 
                      interview_date, location, notes, created_at)
-                    VALUES ('{user_id}', '{job_id}', '{user_name}', '{user_email}', 
-                            {user_age}, '{job_title}', '{interview_date}', '{location}', 
-                            '{notes}', NOW())
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, NOW())
                     RETURNING id, created_at
-                """)
+                """, (user_id, job_id, user_name, user_email, user_age, job_title,
+                      interview_date, location, notes))
                 
                 result = cur.fetchone()
                 interview_id = result[0]
@@ -907,7 +3447,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                 return {
                     'statusCode': 201,
                     'headers': {**cors_headers, 'Content-Type': 'application/json'},
-                    'body': json.dumps({
+                    'body': dump_json({
                         'id': interview_id,
                         'userId': user_id,
                         'jobId': job_id,
@@ -918,31 +3458,40 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             
             if method == 'DELETE':
                 body_data = json.loads(event.get('body', '{}'))
-                interview_id = str(body_data.get('id', '')).replace("'", "''")
+                interview_id = str(body_data.get('id', ''))
                 
-                if not interview_id:
+                if not interview_id.isdigit():
                     return {
                         'statusCode': 400,
                         'headers': {**cors_headers, 'Content-Type': 'application/json'},
-                        'body': json.dumps({'error': 'Missing required field: id'}),
+                        'body': dump_json({'error': 'Missing required field: id'}),
                         'isBase64Encoded': False
                     }
                 
                 print(f"Deleting interview {interview_id}")
                 
-                cur.execute(f"""
+                execute(cur, 'interview_delete', """
                     DELETE FROM t_p86122027_youth_job_portal.interviews 
-                    WHERE id = {interview_id}
-                """)
+                    WHERE id = %s
+                    RETURNING user_id, job_id
+                """, (int(interview_id),))
                 
-                deleted_count = cur.rowcount
+                deleted = cur.fetchone()
+                if deleted and session and session_forbids(session, deleted[0], job_employer(cur, deleted[1])):
+                    conn.rollback()
+                    return {
+                        'statusCode': 403,
+                        'headers': {**cors_headers, 'Content-Type': 'application/json'},
+                        'body': dump_json({'error': 'Only the candidate or the employer can delete the interview'}),
+                        'isBase64Encoded': False
+                    }
                 conn.commit()
                 
-                if deleted_count == 0:
+                if not deleted:
                     return {
                         'statusCode': 404,
                         'headers': {**cors_headers, 'Content-Type': 'application/json'},
-                        'body': json.dumps({'error': 'Interview not found'}),
+                        'body': dump_json({'error': 'Interview not found'}),
                         'isBase64Encoded': False
                     }
                 
@@ -951,59 +3500,209 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                 return {
                     'statusCode': 200,
                     'headers': {**cors_headers, 'Content-Type': 'application/json'},
-                    'body': json.dumps({'message': 'Interview deleted successfully'}),
+                    'body': dump_json({'message': 'Interview deleted successfully'}),
+                    'isBase64Encoded': False
+                }
+        
+        # === RECOMMENDATIONS API ===
+        elif resource == 'recommendations':
+            if method == 'GET':
+                # Рекомендации пользователю: кандидаты из предрассчитанных пулов категорий
+                # (результат теста и категории прошлых откликов), персональный балл, keyset по (балл, id)
+                user_id = query_params.get('user_id', '')
+                try:
+                    if not user_id:
+                        raise ValueError('user_id is required')
+                    if not is_user_id(user_id):
+                        raise ValueError('Invalid user_id')
+                    origin, _, _ = parse_geo_params({'near': query_params.get('near', '')})
+                    limit = min(max(int(query_params.get('limit', JOBS_PAGE_SIZE)), 1), JOBS_MAX_PAGE_SIZE)
+                    cursor = decode_score_cursor(query_params['cursor']) if query_params.get('cursor') else None
+                    fields = parse_fields(query_params.get('fields', ''), JOB_COLUMN_FIELDS)
+                except ValueError as e:
+                    return {
+                        'statusCode': 400,
+                        'headers': {**cors_headers, 'Content-Type': 'application/json'},
+                        'body': dump_json({'error': str(e)}),
+                        'isBase64Encoded': False
+                    }
+                
+                if session_forbids(session, user_id):
+                    return {
+                        'statusCode': 403,
+                        'headers': {**cors_headers, 'Content-Type': 'application/json'},
+                        'body': dump_json({'error': 'user_id does not match the session'}),
+                        'isBase64Encoded': False
+                    }
+                
+                execute_prepared(cur, 'recommendation_user', """
+                    SELECT test_result, EXTRACT(YEAR FROM AGE(date_of_birth))::int
+                    FROM t_p86122027_youth_job_portal.users
+                    WHERE id = %s
+                """, (int(user_id),))
+                user_row = cur.fetchone()
+                if not user_row:
+                    return {
+                        'statusCode': 404,
+                        'headers': {**cors_headers, 'Content-Type': 'application/json'},
+                        'body': dump_json({'error': 'User not found'}),
+                        'isBase64Encoded': False
+                    }
+                test_result, age = user_row
+                
+                execute_prepared(cur, 'recommendation_history', """
+                    SELECT a.job_id, j.category
+                    FROM t_p86122027_youth_job_portal.applications a
+                    LEFT JOIN t_p86122027_youth_job_portal.jobs j ON j.id = a.job_id
+                    WHERE a.user_id = %s
+                """, (user_id,))
+                applied = {row[0]: row[1] for row in cur.fetchall()}
+                
+                categories = list(dict.fromkeys(c for c in [test_result, *applied.values()] if c))
+                jobs_version, _ = resource_version(cur, 'jobs', {})
+                pools = [load_recommendation_pool(cur, category, jobs_version)
+                         for category in categories or [RECOMMENDATIONS_ANY_CATEGORY]]
+                ranked = rank_recommendations(pools, test_result, age, applied, origin)
+                if cursor:
+                    ranked = [item for item in ranked if item < cursor]
+                
+                page = ranked[:limit]
+                next_cursor = encode_score_cursor(*page[-1]) if len(ranked) > limit else None
+                jobs, _, _ = fetch_jobs_by_ids(cur, [job_id for _, job_id in page], fields)
+                scores = {job_id: score for score, job_id in page}
+                for job in jobs:
+                    job['score'] = scores[job['id']]
+                
+                print(f"Recommendations for user {user_id}: {len(ranked)} candidates, categories: {len(categories)}")
+                return {
+                    'statusCode': 200,
+                    'headers': {**cors_headers, 'Content-Type': 'application/json'},
+                    'body': dump_json({'jobs': jobs, 'nextCursor': next_cursor}),
+                    'isBase64Encoded': False
+                }
+        
+        # === EMPLOYER STATS API ===
+        elif resource == 'employer_stats':
+            if method == 'GET':
+                # Кабинет работодателя одной маленькой сводкой вместо полных списков откликов
+                # и собеседований; scope=all — по всем вакансиям (администратор площадки)
+                employer_id = query_params.get('employer_id', '')
+                employer_email = query_params.get('employer_email', '')
+                try:
+                    since = parse_since(query_params.get('since', ''))
+                    upcoming_limit = min(max(int(query_params.get('upcoming_limit', EMPLOYER_UPCOMING_INTERVIEWS)), 0),
+                                         EMPLOYER_MAX_UPCOMING_INTERVIEWS)
+                    if not (employer_id or employer_email or query_params.get('scope') == 'all'):
+                        raise ValueError('employer_id, employer_email or scope=all is required')
+                except ValueError as e:
+                    return {
+                        'statusCode': 400,
+                        'headers': {**cors_headers, 'Content-Type': 'application/json'},
+                        'body': dump_json({'error': str(e)}),
+                        'isBase64Encoded': False
+                    }
+                
+                if employer_id and session_forbids(session, employer_id):
+                    return {
+                        'statusCode': 403,
+                        'headers': {**cors_headers, 'Content-Type': 'application/json'},
+                        'body': dump_json({'error': 'employer_id does not match the session'}),
+                        'isBase64Encoded': False
+                    }
+                
+                conditions = []
+                employer_params: List[Any] = []
+                if employer_id:
+                    conditions.append("j.employer_id = %s")
+                    employer_params.append(employer_id)
+                if employer_email:
+                    conditions.append("j.employer_email = %s")
+                    employer_params.append(employer_email)
+                employer_filter = f"({' OR '.join(conditions)})" if conditions else "TRUE"
+                
+                print(f"Employer stats - employer_id: {employer_id}, employer_email: {employer_email}, since: {since}")
+                stats = load_employer_stats(cur, employer_filter, employer_params, since, upcoming_limit)
+                
+                return {
+                    'statusCode': 200,
+                    'headers': {**cors_headers, 'Content-Type': 'application/json'},
+                    'body': dump_json({**stats, 'since': since.isoformat() if since else None}),
                     'isBase64Encoded': False
                 }
         
+        # === HEALTH API ===
+        elif resource == 'health':
+            if method == 'GET':
+                return {
+                    'statusCode': 200,
+                    'headers': {**cors_headers, 'Content-Type': 'application/json'},
+                    'body': dump_json({'status': 'ok', 'pool': get_pool_stats(),
+                                        'statements': get_statement_stats(),
+                                        'jobsCache': get_jobs_cache_stats()}),
+                    'isBase64Encoded': False
+                }
+
         # === LOGIN API ===
         if resource == 'login':
             if method == 'POST':
                 body_data = json.loads(event.get('body', '{}'))
-                email = str(body_data.get('email', '')).replace("'", "''")
-                password = str(body_data.get('password', '')).replace("'", "''")
+                email = str(body_data.get('email', ''))
+                password = str(body_data.get('password', ''))
                 
                 if not email or not password:
                     return {
                         'statusCode': 400,
                         'headers': {**cors_headers, 'Content-Type': 'application/json'},
-                        'body': json.dumps({'error': 'Email and password required'}),
+                        'body': dump_json({'error': 'Email and password required'}),
                         'isBase64Encoded': False
                     }
                 
                 print(f"Login attempt for email: {email}")
                 
-                cur.execute(f"""
+                execute_prepared(cur, 'login_by_email', """
                     SELECT id, email, full_name, password_hash,
                            EXTRACT(YEAR FROM AGE(date_of_birth))::int as age,
                            phone, test_result, role, created_at
                     FROM t_p86122027_youth_job_portal.users
-                    WHERE email = '{email}'
-                """)
+                    WHERE email = %s
+                """, (email,))
                 
                 row = cur.fetchone()
                 
                 if not row:
                     print(f"User not found: {email}")
+                    # Тот же scrypt, что при неверном пароле: по времени ответа не видно, есть ли email
+                    hash_password(password)
                     return {
                         'statusCode': 401,
                         'headers': {**cors_headers, 'Content-Type': 'application/json'},
-                        'body': json.dumps({'error': 'Invalid credentials'}),
+                        'body': dump_json({'error': 'Invalid credentials'}),
                         'isBase64Encoded': False
                     }
                 
-                db_password = row[3]
+                password_ok, needs_rehash = verify_password(password, row[3])
                 
-                if db_password != password:
+                if not password_ok:
                     print(f"Invalid password for: {email}")
                     return {
                         'statusCode': 401,
                         'headers': {**cors_headers, 'Content-Type': 'application/json'},
-                        'body': json.dumps({'error': 'Invalid credentials'}),
+                        'body': dump_json({'error': 'Invalid credentials'}),
                         'isBase64Encoded': False
                     }
                 
                 print(f"Login successful for: {email}")
                 
+                if needs_rehash:
+                    # Пароль в открытом виде или хеш старой стоимости: пересчитываем,
+                    # если строку не успел обновить параллельный вход
+                    execute(cur, 'user_rehash_password', """
+                        UPDATE t_p86122027_youth_job_portal.users
+                        SET password_hash = %s, updated_at = NOW()
+                        WHERE id = %s AND password_hash = %s
+                    """, (hash_password(password), row[0], row[3]))
+                    conn.commit()
+                
                 user_data = {
                     'id': str(row[0]),
                     'email': row[1],
@@ -1015,29 +3714,72 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                     'completedTest': bool(row[6]),
                     'createdAt': row[8].isoformat() if row[8] else None
                 }
+                response_body = {'user': user_data}
+                if SESSION_SECRET:
+                    token, expires_at = issue_session_token(user_data['id'], user_data['role'])
+                    response_body['token'] = token
+                    response_body['expiresAt'] = datetime.fromtimestamp(expires_at, timezone.utc).isoformat()
+                
+                return {
+                    'statusCode': 200,
+                    'headers': {**cors_headers, 'Content-Type': 'application/json'},
+                    'body': dump_json(response_body),
+                    'isBase64Encoded': False
+                }
+        
+        # === LOGOUT API ===
+        if resource == 'logout':
+            if method == 'POST':
+                if not session:
+                    return {
+                        'statusCode': 401,
+                        'headers': {**cors_headers, 'Content-Type': 'application/json'},
+                        'body': dump_json({'error': 'Session token required'}),
+                        'isBase64Encoded': False
+                    }
+                
+                print(f"Logout for user: {session['sub']}")
+                
+                # Заодно вычищаем записи о токенах, которые уже истекли сами
+                execute(cur, 'revoked_sessions_cleanup', """
+                    DELETE FROM t_p86122027_youth_job_portal.revoked_sessions
+                    WHERE expires_at <= NOW()
+                """)
+                execute_prepared(cur, 'revoked_sessions_insert', """
+                    INSERT INTO t_p86122027_youth_job_portal.revoked_sessions (jti, user_id, expires_at)
+                    VALUES (%s, %s, to_timestamp(%s))
+                    ON CONFLICT (jti) DO NOTHING
+                """, (session['jti'], session['sub'], session['exp']))
+                conn.commit()
+                revoke_session_locally(session['jti'], float(session['exp']))
                 
                 return {
                     'statusCode': 200,
                     'headers': {**cors_headers, 'Content-Type': 'application/json'},
-                    'body': json.dumps({'user': user_data}),
+                    'body': dump_json({'success': True}),
                     'isBase64Encoded': False
                 }
         
         return {
             'statusCode': 404,
             'headers': {**cors_headers, 'Content-Type': 'application/json'},
-            'body': json.dumps({'error': f'Resource not found: {resource}'}),
+            'body': dump_json({'error': f'Resource not found: {resource}'}),
             'isBase64Encoded': False
         }
     
     except Exception as e:
         print(f"Error: {str(e)}")
-        if 'conn' in locals():
-            conn.rollback()
+        if isinstance(e, (psycopg2.OperationalError, psycopg2.InterfaceError)):
+            conn_broken = True
+        elif 'conn' in locals():
+            try:
+                conn.rollback()
+            except psycopg2.Error:
+                conn_broken = True
         return {
             'statusCode': 500,
             'headers': {**cors_headers, 'Content-Type': 'application/json'},
-            'body': json.dumps({'error': str(e)}),
+            'body': dump_json({'error': str(e)}),
             'isBase64Encoded': False
         }
     
@@ -1045,4 +3787,4 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         if 'cur' in locals():
             cur.close()
         if 'conn' in locals():
-            conn.close()
\ No newline at end of file
+            release_connection(conn, broken=conn_broken)
\ No newline at end of file
@@ -303,36 +303,42 @@ export async function handler(req: Request) {
     errors: [] as any[]
   };
 
-  for (const vacancy of vacancies) {
-    try {
-      const response = await fetch(API_ENDPOINT, {
-        method: 'POST',
-        headers: {
-          'Content-Type': 'application/json'
-        },
-        body: JSON.stringify(vacancy)
-      });
+  // One bulk import request: all vacancies are validated and upserted in a single transaction
+  try {
+    const response = await fetch(`${API_ENDPOINT}&mode=import`, {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json'
+      },
+      body: JSON.stringify(vacancies)
+    });
 
-      if (response.ok) {
+    const data = await response.json();
+    for (const result of data.results || []) {
+      if (result.status === 'created' || result.status === 'updated') {
         results.success++;
       } else {
         results.failed++;
         results.errors.push({
-          vacancy: vacancy.title,
-          status: response.status,
-          message: await response.text()
+          vacancy: vacancies[result.index]?.title,
+          status: result.status,
+          message: result.errors
         });
       }
-    } catch (error: any) {
-      results.failed++;
+    }
+
+    if (!data.results) {
+      results.failed = vacancies.length;
       results.errors.push({
-        vacancy: vacancy.title,
-        error: error.message
+        status: response.status,
+        message: data.error
       });
     }
-    
-    // Small delay between requests
-    await new Promise(resolve => setTimeout(resolve, 300));
+  } catch (error: any) {
+    results.failed = vacancies.length;
+    results.errors.push({
+      error: error.message
+    });
   }
 
   return new Response(JSON.stringify(results, null, 2), {
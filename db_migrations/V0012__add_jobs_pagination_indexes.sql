@@ -0,0 +1,7 @@
+-- Индексы для keyset-пагинации и серверной фильтрации вакансий
+-- Все индексы заканчиваются на (created_at DESC, id DESC), чтобы страница читалась одним диапазоном
+CREATE INDEX IF NOT EXISTS idx_jobs_created_at_id ON t_p86122027_youth_job_portal.jobs(created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_jobs_category_created_at ON t_p86122027_youth_job_portal.jobs(category, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_jobs_type_created_at ON t_p86122027_youth_job_portal.jobs(type, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_jobs_age_range_created_at ON t_p86122027_youth_job_portal.jobs(age_range, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_jobs_premium_created_at ON t_p86122027_youth_job_portal.jobs(is_premium, created_at DESC, id DESC);
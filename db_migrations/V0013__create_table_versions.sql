@@ -0,0 +1,38 @@
+-- Счётчики изменений таблиц для условных GET-запросов (ETag / If-None-Match)
+-- Версия увеличивается триггером в той же транзакции, что и изменение данных,
+-- поэтому проверка "изменилось ли что-нибудь" стоит одного чтения по первичному ключу
+CREATE TABLE IF NOT EXISTS t_p86122027_youth_job_portal.table_versions (
+    table_name TEXT PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+INSERT INTO t_p86122027_youth_job_portal.table_versions (table_name)
+VALUES ('jobs'), ('applications'), ('messages'), ('interviews')
+ON CONFLICT (table_name) DO NOTHING;
+
+CREATE OR REPLACE FUNCTION t_p86122027_youth_job_portal.bump_table_version()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE t_p86122027_youth_job_portal.table_versions
+    SET version = version + 1, updated_at = NOW()
+    WHERE table_name = TG_TABLE_NAME;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_jobs_version
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON t_p86122027_youth_job_portal.jobs
+FOR EACH STATEMENT EXECUTE FUNCTION t_p86122027_youth_job_portal.bump_table_version();
+
+CREATE TRIGGER trg_applications_version
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON t_p86122027_youth_job_portal.applications
+FOR EACH STATEMENT EXECUTE FUNCTION t_p86122027_youth_job_portal.bump_table_version();
+
+CREATE TRIGGER trg_messages_version
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON t_p86122027_youth_job_portal.messages
+FOR EACH STATEMENT EXECUTE FUNCTION t_p86122027_youth_job_portal.bump_table_version();
+
+CREATE TRIGGER trg_interviews_version
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON t_p86122027_youth_job_portal.interviews
+FOR EACH STATEMENT EXECUTE FUNCTION t_p86122027_youth_job_portal.bump_table_version();
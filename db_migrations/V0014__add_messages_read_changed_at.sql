@@ -0,0 +1,12 @@
+-- Время последнего изменения признака прочтения: по нему дельта-запрос чата
+-- отдаёт только сообщения, чей статус прочтения поменялся с прошлого опроса
+ALTER TABLE t_p86122027_youth_job_portal.messages
+ADD COLUMN IF NOT EXISTS read_changed_at TIMESTAMP;
+
+UPDATE t_p86122027_youth_job_portal.messages
+SET read_changed_at = created_at
+WHERE is_read = TRUE AND read_changed_at IS NULL;
+
+CREATE INDEX IF NOT EXISTS idx_messages_read_changed_at
+ON t_p86122027_youth_job_portal.messages(read_changed_at)
+WHERE read_changed_at IS NOT NULL;
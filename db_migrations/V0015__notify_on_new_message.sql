@@ -0,0 +1,18 @@
+-- Уведомление о новом сообщении для long-poll: обработчик слушает канал message_events
+-- и будит запросы, ожидающие сообщений для отправителя или получателя
+CREATE OR REPLACE FUNCTION t_p86122027_youth_job_portal.notify_new_message()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM pg_notify('message_events', json_build_object(
+        'id', NEW.id,
+        'sender_id', NEW.sender_id,
+        'receiver_id', NEW.receiver_id,
+        'job_id', NEW.job_id
+    )::text);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_messages_notify
+AFTER INSERT ON t_p86122027_youth_job_portal.messages
+FOR EACH ROW EXECUTE FUNCTION t_p86122027_youth_job_portal.notify_new_message();
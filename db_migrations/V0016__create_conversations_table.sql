@@ -0,0 +1,53 @@
+-- Денормализованная сводка переписок: одна строка на пару собеседников и вакансию.
+-- Пара хранится в каноническом порядке (user_a < user_b в сортировке "C"),
+-- строка обновляется в той же транзакции, что и INSERT/PUT/DELETE сообщений
+CREATE TABLE IF NOT EXISTS t_p86122027_youth_job_portal.conversations (
+    user_a VARCHAR(255) NOT NULL,
+    user_b VARCHAR(255) NOT NULL,
+    job_id VARCHAR(255) NOT NULL DEFAULT '',
+    last_message_id UUID NOT NULL,
+    last_sender_id VARCHAR(255) NOT NULL,
+    last_message_text TEXT NOT NULL,
+    last_is_read BOOLEAN NOT NULL DEFAULT FALSE,
+    last_message_at TIMESTAMP NOT NULL,
+    unread_a INTEGER NOT NULL DEFAULT 0,
+    unread_b INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_a, user_b, job_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_conversations_user_a
+ON t_p86122027_youth_job_portal.conversations(user_a, last_message_at DESC);
+CREATE INDEX IF NOT EXISTS idx_conversations_user_b
+ON t_p86122027_youth_job_portal.conversations(user_b, last_message_at DESC);
+
+-- Заполняем сводку по уже существующим сообщениям
+WITH keyed AS (
+    SELECT
+        LEAST(sender_id COLLATE "C", receiver_id COLLATE "C") AS user_a,
+        GREATEST(sender_id COLLATE "C", receiver_id COLLATE "C") AS user_b,
+        COALESCE(job_id, '') AS conv_job_id,
+        id, sender_id, receiver_id, message_text, is_read, created_at
+    FROM t_p86122027_youth_job_portal.messages
+),
+last_messages AS (
+    SELECT DISTINCT ON (user_a, user_b, conv_job_id)
+        user_a, user_b, conv_job_id, id, sender_id, message_text, is_read, created_at
+    FROM keyed
+    ORDER BY user_a, user_b, conv_job_id, created_at DESC, id DESC
+),
+unread AS (
+    SELECT
+        user_a, user_b, conv_job_id,
+        COUNT(*) FILTER (WHERE is_read IS NOT TRUE AND receiver_id = user_a) AS unread_a,
+        COUNT(*) FILTER (WHERE is_read IS NOT TRUE AND receiver_id = user_b) AS unread_b
+    FROM keyed
+    GROUP BY user_a, user_b, conv_job_id
+)
+INSERT INTO t_p86122027_youth_job_portal.conversations
+(user_a, user_b, job_id, last_message_id, last_sender_id, last_message_text,
+ last_is_read, last_message_at, unread_a, unread_b)
+SELECT l.user_a, l.user_b, l.conv_job_id, l.id, l.sender_id, l.message_text,
+       COALESCE(l.is_read, FALSE), l.created_at, u.unread_a, u.unread_b
+FROM last_messages l
+JOIN unread u USING (user_a, user_b, conv_job_id)
+ON CONFLICT (user_a, user_b, job_id) DO NOTHING;
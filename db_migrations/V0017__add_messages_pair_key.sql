@@ -0,0 +1,12 @@
+-- Канонический ключ пары собеседников: переписка A<->B читается одним
+-- диапазонным сканированием индекса вместо OR по sender_id/receiver_id.
+-- Столбец вычисляемый, поэтому ALTER заполняет его для существующих строк,
+-- а новые сообщения получают ключ без участия обработчика
+ALTER TABLE t_p86122027_youth_job_portal.messages
+ADD COLUMN IF NOT EXISTS pair_key TEXT GENERATED ALWAYS AS (
+    LEAST(sender_id COLLATE "C", receiver_id COLLATE "C") || ':' ||
+    GREATEST(sender_id COLLATE "C", receiver_id COLLATE "C")
+) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_messages_pair_job_created_at
+ON t_p86122027_youth_job_portal.messages(pair_key, job_id, created_at, id);
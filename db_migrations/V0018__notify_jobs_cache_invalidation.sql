@@ -0,0 +1,14 @@
+-- Сигнал сброса кэша вакансий для всех экземпляров функции: обработчик слушает канал
+-- cache_invalidation и при payload 'jobs' очищает кэш списка. NOTIFY доставляется
+-- только после фиксации транзакции, поэтому кэш не наполнится неподтверждёнными данными
+CREATE OR REPLACE FUNCTION t_p86122027_youth_job_portal.notify_cache_invalidation()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM pg_notify('cache_invalidation', TG_TABLE_NAME);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_jobs_cache_invalidation
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON t_p86122027_youth_job_portal.jobs
+FOR EACH STATEMENT EXECUTE FUNCTION t_p86122027_youth_job_portal.notify_cache_invalidation();
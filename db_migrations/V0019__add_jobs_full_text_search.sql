@@ -0,0 +1,38 @@
+-- Полнотекстовый поиск по вакансиям (?resource=jobs&q=...): tsvector с русской
+-- морфологией по названию, компании, описанию, требованиям и обязанностям
+-- плюс триграммы по названию и компании для запросов с опечатками.
+-- Столбцы заполняет триггер: array_to_string не IMMUTABLE, поэтому
+-- вычисляемый столбец здесь не подходит
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+ALTER TABLE t_p86122027_youth_job_portal.jobs
+ADD COLUMN IF NOT EXISTS search_vector TSVECTOR,
+ADD COLUMN IF NOT EXISTS search_text TEXT;
+
+CREATE OR REPLACE FUNCTION t_p86122027_youth_job_portal.update_jobs_search()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('russian', COALESCE(NEW.title, '')), 'A') ||
+        setweight(to_tsvector('russian', COALESCE(NEW.company, '')), 'A') ||
+        setweight(to_tsvector('russian', COALESCE(NEW.description, '')), 'B') ||
+        setweight(to_tsvector('russian', COALESCE(array_to_string(NEW.requirements, ' '), '')), 'C') ||
+        setweight(to_tsvector('russian', COALESCE(array_to_string(NEW.responsibilities, ' '), '')), 'C');
+    NEW.search_text := lower(COALESCE(NEW.title, '') || ' ' || COALESCE(NEW.company, ''));
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_jobs_search
+BEFORE INSERT OR UPDATE OF title, company, description, requirements, responsibilities
+ON t_p86122027_youth_job_portal.jobs
+FOR EACH ROW EXECUTE FUNCTION t_p86122027_youth_job_portal.update_jobs_search();
+
+-- Заполняем существующие вакансии через тот же триггер
+UPDATE t_p86122027_youth_job_portal.jobs SET title = title;
+
+CREATE INDEX IF NOT EXISTS idx_jobs_search_vector
+ON t_p86122027_youth_job_portal.jobs USING GIN (search_vector);
+
+CREATE INDEX IF NOT EXISTS idx_jobs_search_text_trgm
+ON t_p86122027_youth_job_portal.jobs USING GIN (search_text gin_trgm_ops);
@@ -0,0 +1,23 @@
+-- Типизированные координаты вакансий вместо JSON-строки coordinates: широта и долгота
+-- как числа и GiST-индекс по point(lon, lat) для запросов по прямоугольнику карты
+-- и радиусу (?resource=jobs&bbox=... / &near=...). Столбец coordinates сохраняется
+-- для совместимости и продолжает заполняться при записи
+ALTER TABLE t_p86122027_youth_job_portal.jobs
+ADD COLUMN IF NOT EXISTS lat DOUBLE PRECISION NOT NULL DEFAULT 56.0184,
+ADD COLUMN IF NOT EXISTS lon DOUBLE PRECISION NOT NULL DEFAULT 92.8672;
+
+-- Переносим разбираемые значения: JSON '[lat, lon]' от обработчика и '{lat,lon}'
+-- из ARRAY[...] в V0007 (их обработчик не разбирал и показывал точку по умолчанию);
+-- остальные строки остаются с координатами по умолчанию
+UPDATE t_p86122027_youth_job_portal.jobs j
+SET lat = parsed.m[1]::double precision,
+    lon = parsed.m[2]::double precision
+FROM (
+    SELECT id, regexp_match(coordinates,
+        '^\s*[\[{]\s*(-?[0-9]+(?:\.[0-9]+)?)\s*,\s*(-?[0-9]+(?:\.[0-9]+)?)\s*[\]}]\s*$') AS m
+    FROM t_p86122027_youth_job_portal.jobs
+) parsed
+WHERE j.id = parsed.id AND parsed.m IS NOT NULL;
+
+CREATE INDEX IF NOT EXISTS idx_jobs_location_point
+ON t_p86122027_youth_job_portal.jobs USING GIST (point(lon, lat));
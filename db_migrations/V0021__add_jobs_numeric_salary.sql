@@ -0,0 +1,57 @@
+-- Числовая зарплата вакансий для фильтров salary_min/salary_max и sort=salary:
+-- вилка (min, max) и валюта, разобранные из текстового salary. Новые и изменённые
+-- вакансии заполняет обработчик (parse_salary), существующие — бэкфилл ниже
+ALTER TABLE t_p86122027_youth_job_portal.jobs
+ADD COLUMN IF NOT EXISTS salary_min INTEGER,
+ADD COLUMN IF NOT EXISTS salary_max INTEGER,
+ADD COLUMN IF NOT EXISTS salary_currency VARCHAR(3);
+
+-- Тот же разбор, что в parse_salary: пробелы между разрядами убираются, из кандидатов
+-- (привязка 'от'/'до'/'зарплата', знак валюты, число или вилка, валюта после) берётся
+-- первый, у которого есть привязка или валюта либо сумма от 1000 — так график
+-- ('2/2 смены', '9-18') не становится зарплатой. 'от X' — только минимум, 'до X' — только максимум
+UPDATE t_p86122027_youth_job_portal.jobs j
+SET salary_min = CASE
+        WHEN parsed.m[4] IS NOT NULL THEN LEAST(parsed.m[3]::integer, parsed.m[4]::integer)
+        WHEN parsed.m[1] = 'до' THEN NULL
+        ELSE parsed.m[3]::integer
+    END,
+    salary_max = CASE
+        WHEN parsed.m[4] IS NOT NULL THEN GREATEST(parsed.m[3]::integer, parsed.m[4]::integer)
+        WHEN parsed.m[1] = 'от' THEN NULL
+        ELSE parsed.m[3]::integer
+    END,
+    salary_currency = CASE
+        WHEN parsed.s ~ '\$|usd' THEN 'USD'
+        WHEN parsed.s ~ '€|eur' THEN 'EUR'
+        ELSE 'RUB'
+    END
+FROM (
+    SELECT normalized.id, normalized.s, candidate.m
+    FROM (
+        SELECT id, regexp_replace(lower(COALESCE(salary, '')), '(?<=\d)[\s\u00a0]+(?=\d)', '', 'g') AS s
+        FROM t_p86122027_youth_job_portal.jobs
+    ) normalized
+    CROSS JOIN LATERAL (
+        SELECT r.m
+        FROM regexp_matches(
+            normalized.s,
+            '(?:(?<![а-яё])(от|до|зарплата|з/п|оплата|доход))?\s*:?\s*([$€])?\s*([0-9]+)(?:\s*(?:-|–|—|до)\s*([0-9]+))?\s*(₽|руб|р(?![а-яё])|\$|usd|€|eur)?',
+            'g'
+        ) WITH ORDINALITY AS r(m, ord)
+        WHERE length(r.m[3]) <= 9
+          AND COALESCE(length(r.m[4]), 0) <= 9
+          AND (r.m[1] IS NOT NULL OR r.m[2] IS NOT NULL OR r.m[5] IS NOT NULL
+               OR GREATEST(r.m[3]::numeric, COALESCE(r.m[4]::numeric, 0)) >= 1000)
+        ORDER BY r.ord
+        LIMIT 1
+    ) candidate
+) parsed
+WHERE j.id = parsed.id;
+
+-- Сортировка по зарплате и фильтр salary_min идут по одному выражению (SALARY_SORT_SQL)
+CREATE INDEX IF NOT EXISTS idx_jobs_salary_sort
+ON t_p86122027_youth_job_portal.jobs ((COALESCE(salary_max, salary_min, 0)), id);
+
+CREATE INDEX IF NOT EXISTS idx_jobs_salary_floor
+ON t_p86122027_youth_job_portal.jobs ((COALESCE(salary_min, salary_max)));
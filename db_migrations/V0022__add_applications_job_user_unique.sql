@@ -0,0 +1,18 @@
+-- Один отклик пользователя на вакансию: уникальный индекс (job_id, user_id), на котором
+-- держится INSERT ... ON CONFLICT DO NOTHING в обработчике вместо проверки отдельным SELECT.
+-- Сначала убираем накопившиеся дубли: оставляем отклик, по которому работодатель уже
+-- принял решение, иначе самый ранний
+DELETE FROM t_p86122027_youth_job_portal.applications
+WHERE id IN (
+    SELECT id FROM (
+        SELECT id, ROW_NUMBER() OVER (
+            PARTITION BY job_id, user_id
+            ORDER BY (status IS DISTINCT FROM 'pending') DESC, created_at NULLS LAST, id
+        ) AS duplicate_rank
+        FROM t_p86122027_youth_job_portal.applications
+    ) ranked
+    WHERE duplicate_rank > 1
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_applications_job_user
+ON t_p86122027_youth_job_portal.applications(job_id, user_id);
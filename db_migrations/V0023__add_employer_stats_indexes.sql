@@ -0,0 +1,10 @@
+-- Индексы для сводки работодателя (?resource=employer_stats): вакансии по employer_id
+-- (по employer_email индекс есть с V0002) и собеседования вакансии по дате,
+-- чтобы ближайшие читались диапазоном
+CREATE INDEX IF NOT EXISTS idx_jobs_employer_id ON t_p86122027_youth_job_portal.jobs(employer_id);
+
+CREATE INDEX IF NOT EXISTS idx_interviews_job_date
+ON t_p86122027_youth_job_portal.interviews(job_id, interview_date);
+
+-- Поиск по job_id обслуживает префикс нового индекса
+DROP INDEX IF EXISTS t_p86122027_youth_job_portal.idx_interviews_job;
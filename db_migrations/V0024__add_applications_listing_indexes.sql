@@ -0,0 +1,12 @@
+-- Индексы постраничного списка откликов (?resource=applications&limit=...): keyset
+-- по (created_at DESC, id DESC) внутри вакансии, вакансии и статуса, кандидата.
+-- Индексы idx_applications_* из V0004 не создавались: эти имена уже заняты индексами
+-- job_applications из V0001, поэтому у applications не было индекса по user_id
+CREATE INDEX IF NOT EXISTS idx_applications_job_status_created
+ON t_p86122027_youth_job_portal.applications(job_id, status, created_at DESC, id DESC);
+
+CREATE INDEX IF NOT EXISTS idx_applications_job_created
+ON t_p86122027_youth_job_portal.applications(job_id, created_at DESC, id DESC);
+
+CREATE INDEX IF NOT EXISTS idx_applications_user_created
+ON t_p86122027_youth_job_portal.applications(user_id, created_at DESC, id DESC);
@@ -0,0 +1,16 @@
+-- Отозванные сессионные токены (выход до истечения срока). Обработчик держит
+-- список в памяти и перечитывает его по NOTIFY 'revoked_sessions' на канале
+-- cache_invalidation (функция из V0018); истёкшие строки удаляются при выходе
+CREATE TABLE IF NOT EXISTS t_p86122027_youth_job_portal.revoked_sessions (
+    jti VARCHAR(64) PRIMARY KEY,
+    user_id VARCHAR(255) NOT NULL,
+    expires_at TIMESTAMPTZ NOT NULL,
+    revoked_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_revoked_sessions_expires_at
+ON t_p86122027_youth_job_portal.revoked_sessions (expires_at);
+
+CREATE TRIGGER trg_revoked_sessions_cache_invalidation
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON t_p86122027_youth_job_portal.revoked_sessions
+FOR EACH STATEMENT EXECUTE FUNCTION t_p86122027_youth_job_portal.notify_cache_invalidation();
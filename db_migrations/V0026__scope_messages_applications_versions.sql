@@ -0,0 +1,17 @@
+-- Счётчик table_versions обновлялся в каждой транзакции с записью сообщения или отклика
+-- и держал блокировку строки до фиксации: записи всех пользователей выстраивались в очередь,
+-- а любое сообщение сбрасывало ETag у всех клиентов. Версия переписки теперь хранится
+-- в её строке сводки — номер из последовательности, которая не блокирует параллельные записи;
+-- версия списка откликов считается по выборке (число строк и последний updated_at)
+DROP TRIGGER IF EXISTS trg_messages_version ON t_p86122027_youth_job_portal.messages;
+DROP TRIGGER IF EXISTS trg_applications_version ON t_p86122027_youth_job_portal.applications;
+
+DELETE FROM t_p86122027_youth_job_portal.table_versions
+WHERE table_name IN ('messages', 'applications');
+
+CREATE SEQUENCE IF NOT EXISTS t_p86122027_youth_job_portal.conversation_version_seq;
+
+ALTER TABLE t_p86122027_youth_job_portal.conversations
+ADD COLUMN IF NOT EXISTS version BIGINT NOT NULL
+    DEFAULT nextval('t_p86122027_youth_job_portal.conversation_version_seq'),
+ADD COLUMN IF NOT EXISTS changed_at TIMESTAMP NOT NULL DEFAULT NOW();
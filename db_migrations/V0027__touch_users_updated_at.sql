@@ -0,0 +1,14 @@
+-- Отклики и список переписок подставляют профили из users, поэтому их ETag учитывает
+-- users.updated_at. Построчный триггер обновляет время при любой правке профиля,
+-- в том числе мимо обработчика; общих счётчиков и блокировок он не добавляет
+CREATE OR REPLACE FUNCTION t_p86122027_youth_job_portal.touch_updated_at()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.updated_at = NOW();
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_users_touch_updated_at
+BEFORE UPDATE ON t_p86122027_youth_job_portal.users
+FOR EACH ROW EXECUTE FUNCTION t_p86122027_youth_job_portal.touch_updated_at();
@@ -3,15 +3,56 @@ import { Link } from 'react-router-dom';
 import { Button } from '@/components/ui/button';
 import Icon from '@/components/ui/icon';
 import { Job } from '@/data/jobs';
+import { JobListFilters, loadJobByIdFromDatabase, loadMapClustersFromDatabase, MapCluster } from '@/utils/syncData';
 
 interface VacancyMapProps {
   jobs: Job[];
   recommendedCategory?: string;
+  filters?: JobListFilters;
 }
 
-const VacancyMap = ({ jobs, recommendedCategory }: VacancyMapProps) => {
+const popupContentFor = (job: Job, isRecommended: boolean) => {
+  return `
+    <div style="padding: 8px; min-width: 200px;">
+      ${isRecommended ? `
+        <div style="display: flex; align-items: center; gap: 4px; font-size: 12px; color: hsl(var(--primary)); margin-bottom: 8px;">
+          <svg xmlns="http://www.w3.org/2000/svg" width="12" height="12" viewBox="0 0 24 24" fill="currentColor"><path d="M12 2l3.09 6.26L22 9.27l-5 4.87 1.18 6.88L12 17.77l-6.18 3.25L7 14.14 2 9.27l6.91-1.01L12 2z"/></svg>
+          <span>Рекомендовано</span>
+        </div>
+      ` : ''}
+      <h3 style="font-weight: 600; font-size: 16px; margin-bottom: 4px; color: hsl(var(--foreground));">${job.title}</h3>
+      <p style="font-size: 14px; color: hsl(var(--muted-foreground)); margin-bottom: 8px;">${job.company}</p>
+      <div style="margin-bottom: 12px;">
+        <div style="display: flex; align-items: center; gap: 8px; font-size: 12px; margin-bottom: 4px; color: hsl(var(--foreground));">
+          <svg xmlns="http://www.w3.org/2000/svg" width="12" height="12" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><path d="M20 10c0 6-8 12-8 12s-8-6-8-12a8 8 0 0 1 16 0Z"/><circle cx="12" cy="10" r="3"/></svg>
+          <span>${job.location}</span>
+        </div>
+        <div style="display: flex; align-items: center; gap: 8px; font-size: 12px; color: hsl(var(--foreground));">
+          <svg xmlns="http://www.w3.org/2000/svg" width="12" height="12" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><circle cx="12" cy="12" r="10"/><polyline points="12 6 12 12 16 14"/></svg>
+          <span>${job.type}</span>
+        </div>
+      </div>
+      <div style="display: flex; align-items: center; justify-content: space-between;">
+        <span style="font-weight: 700; color: hsl(var(--primary));">${job.salary}</span>
+        <a href="/job/${job.id}" style="padding: 4px 12px; background: hsl(var(--primary)); color: hsl(var(--primary-foreground)); border-radius: 4px; text-decoration: none; font-size: 12px;">Подробнее</a>
+      </div>
+    </div>
+  `;
+};
+
+const VacancyMap = ({ jobs, recommendedCategory, filters = {} }: VacancyMapProps) => {
   const [map, setMap] = useState<any>(null);
   const mapRef = useRef<HTMLDivElement>(null);
+  const jobsRef = useRef<Job[]>(jobs);
+  const filtersRef = useRef<JobListFilters>(filters);
+  const reloadRef = useRef<(() => void) | null>(null);
+
+  jobsRef.current = jobs;
+  filtersRef.current = filters;
+
+  useEffect(() => {
+    reloadRef.current?.();
+  }, [filters.type, filters.includePremium, filters.q]);
 
   useEffect(() => {
     if (typeof window === 'undefined') return;
@@ -45,40 +86,73 @@ const VacancyMap = ({ jobs, recommendedCategory }: VacancyMapProps) => {
         attribution: '&copy; <a href="https://www.openstreetmap.org/copyright">OpenStreetMap</a>',
       }).addTo(leafletMap);
 
-      jobs.forEach((job) => {
-        const isRecommended = recommendedCategory && job.category === recommendedCategory;
-        
-        const marker = L.marker(job.coordinates, { icon: customIcon }).addTo(leafletMap);
-        
-        const popupContent = `
-          <div style="padding: 8px; min-width: 200px;">
-            ${isRecommended ? `
-              <div style="display: flex; align-items: center; gap: 4px; font-size: 12px; color: hsl(var(--primary)); margin-bottom: 8px;">
-                <svg xmlns="http://www.w3.org/2000/svg" width="12" height="12" viewBox="0 0 24 24" fill="currentColor"><path d="M12 2l3.09 6.26L22 9.27l-5 4.87 1.18 6.88L12 17.77l-6.18 3.25L7 14.14 2 9.27l6.91-1.01L12 2z"/></svg>
-                <span>Рекомендовано</span>
-              </div>
-            ` : ''}
-            <h3 style="font-weight: 600; font-size: 16px; margin-bottom: 4px; color: hsl(var(--foreground));">${job.title}</h3>
-            <p style="font-size: 14px; color: hsl(var(--muted-foreground)); margin-bottom: 8px;">${job.company}</p>
-            <div style="margin-bottom: 12px;">
-              <div style="display: flex; align-items: center; gap: 8px; font-size: 12px; margin-bottom: 4px; color: hsl(var(--foreground));">
-                <svg xmlns="http://www.w3.org/2000/svg" width="12" height="12" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><path d="M20 10c0 6-8 12-8 12s-8-6-8-12a8 8 0 0 1 16 0Z"/><circle cx="12" cy="10" r="3"/></svg>
-                <span>${job.location}</span>
-              </div>
-              <div style="display: flex; align-items: center; gap: 8px; font-size: 12px; color: hsl(var(--foreground));">
-                <svg xmlns="http://www.w3.org/2000/svg" width="12" height="12" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><circle cx="12" cy="12" r="10"/><polyline points="12 6 12 12 16 14"/></svg>
-                <span>${job.type}</span>
-              </div>
-            </div>
-            <div style="display: flex; align-items: center; justify-content: space-between;">
-              <span style="font-weight: 700; color: hsl(var(--primary));">${job.salary}</span>
-              <a href="/job/${job.id}" style="padding: 4px 12px; background: hsl(var(--primary)); color: hsl(var(--primary-foreground)); border-radius: 4px; text-decoration: none; font-size: 12px;">Подробнее</a>
-            </div>
-          </div>
-        `;
-        
-        marker.bindPopup(popupContent);
-      });
+      const markersLayer = L.layerGroup().addTo(leafletMap);
+
+      const renderMarkers = (visibleJobs: Job[]) => {
+        visibleJobs.forEach((job) => {
+          const isRecommended = recommendedCategory && job.category === recommendedCategory;
+          const marker = L.marker(job.coordinates, { icon: customIcon }).addTo(markersLayer);
+          marker.bindPopup(popupContentFor(job, !!isRecommended));
+        });
+      };
+
+      const renderClusters = (clusters: MapCluster[]) => {
+        clusters.forEach((cluster) => {
+          if (cluster.count === 1 && cluster.jobId) {
+            // Одиночная вакансия: детали подгружаются при клике
+            const marker = L.marker(cluster.coordinates, { icon: customIcon }).addTo(markersLayer);
+            marker.on('click', async () => {
+              const job = await loadJobByIdFromDatabase(cluster.jobId!);
+              if (job) {
+                const isRecommended = recommendedCategory && job.category === recommendedCategory;
+                marker.bindPopup(popupContentFor(job, !!isRecommended)).openPopup();
+              }
+            });
+            return;
+          }
+          const size = cluster.count < 10 ? 36 : cluster.count < 100 ? 44 : 52;
+          const clusterIcon = L.divIcon({
+            html: `<div style="width: ${size}px; height: ${size}px; border-radius: 50%; background: hsl(var(--primary)); color: hsl(var(--primary-foreground)); display: flex; align-items: center; justify-content: center; font-weight: 700; font-size: 14px; border: 3px solid hsl(var(--background));">${cluster.count}</div>`,
+            className: '',
+            iconSize: [size, size],
+            iconAnchor: [size / 2, size / 2],
+          });
+          L.marker(cluster.coordinates, { icon: clusterIcon })
+            .addTo(markersLayer)
+            .on('click', () => leafletMap.setView(cluster.coordinates, Math.min(leafletMap.getZoom() + 2, 18)));
+        });
+      };
+
+      // Только видимая область: сервер группирует вакансии в кластеры по тайлам
+      // и отдаёт отдельные точки лишь на крупном масштабе; без API показываем переданный список.
+      // Ответы могут прийти не по порядку: рисуем только ответ на последний запрос
+      let viewportSeq = 0;
+      const loadViewport = async () => {
+        const seq = ++viewportSeq;
+        const bounds = leafletMap.getBounds();
+        const mapData = await loadMapClustersFromDatabase(
+          [
+            Math.max(bounds.getSouth(), -85),
+            Math.max(bounds.getWest(), -180),
+            Math.min(bounds.getNorth(), 85),
+            Math.min(bounds.getEast(), 180)
+          ],
+          leafletMap.getZoom(),
+          filtersRef.current
+        );
+        if (seq !== viewportSeq) return;
+        markersLayer.clearLayers();
+        if (mapData) {
+          renderClusters(mapData.clusters);
+          renderMarkers(mapData.points);
+        } else {
+          renderMarkers(jobsRef.current);
+        }
+      };
+
+      leafletMap.on('moveend', loadViewport);
+      reloadRef.current = loadViewport;
+      loadViewport();
 
       setMap(leafletMap);
     };
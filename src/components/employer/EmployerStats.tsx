@@ -3,13 +3,14 @@ import Icon from '@/components/ui/icon';
 
 interface EmployerStatsProps {
   responsesCount: number;
+  newResponsesCount?: number;
   interviewsCount: number;
   candidatesCount: number;
   vacanciesCount: number;
   userEmail: string;
 }
 
-const EmployerStats = ({ responsesCount, interviewsCount, candidatesCount, vacanciesCount, userEmail }: EmployerStatsProps) => {
+const EmployerStats = ({ responsesCount, newResponsesCount = 0, interviewsCount, candidatesCount, vacanciesCount, userEmail }: EmployerStatsProps) => {
   const showCandidates = userEmail === 'mininkonstantin@gmail.com';
   
   return (
@@ -19,6 +20,9 @@ const EmployerStats = ({ responsesCount, interviewsCount, candidatesCount, vacan
           <Icon name="Send" size={32} className="mx-auto mb-2 text-blue-500" />
           <div className="text-3xl font-bold">{responsesCount}</div>
           <div className="text-muted-foreground text-sm">Откликов получено</div>
+          {newResponsesCount > 0 && (
+            <div className="text-xs font-medium text-blue-500 mt-1">+{newResponsesCount} с прошлого визита</div>
+          )}
         </CardContent>
       </Card>
       <Card>
@@ -17,9 +17,11 @@ export interface InterviewData {
 
 interface InterviewsTabProps {
   interviews: InterviewData[];
+  hasMore?: boolean;
+  onLoadMore?: () => void;
 }
 
-const InterviewsTab = ({ interviews }: InterviewsTabProps) => {
+const InterviewsTab = ({ interviews, hasMore, onLoadMore }: InterviewsTabProps) => {
   const navigate = useNavigate();
 
   return (
@@ -81,6 +83,13 @@ const InterviewsTab = ({ interviews }: InterviewsTabProps) => {
             ))}
           </div>
         )}
+        {hasMore && onLoadMore && (
+          <div className="text-center mt-6">
+            <Button variant="outline" onClick={onLoadMore}>
+              Показать ещё
+            </Button>
+          </div>
+        )}
       </CardContent>
     </Card>
   );
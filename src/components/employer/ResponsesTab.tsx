@@ -28,7 +28,10 @@ export interface ResponseData {
 interface ResponsesTabProps {
   responses: ResponseData[];
   responsesByJob: Record<number | string, ResponseData[]>;
+  applicationsByJob?: Record<string, number>;
   formatTime: (timestamp: number) => string;
+  hasMore?: boolean;
+  onLoadMore?: () => void;
 }
 
 interface CandidateFullData {
@@ -43,7 +46,7 @@ interface CandidateFullData {
   testAnswers?: any[];
 }
 
-const ResponsesTab = ({ responses, responsesByJob, formatTime }: ResponsesTabProps) => {
+const ResponsesTab = ({ responses, responsesByJob, applicationsByJob, formatTime, hasMore, onLoadMore }: ResponsesTabProps) => {
   const navigate = useNavigate();
   const { user } = useAuth();
   const isPremium = user?.subscription === 'premium';
@@ -69,11 +72,13 @@ const ResponsesTab = ({ responses, responsesByJob, formatTime }: ResponsesTabPro
           </div>
         ) : (
           <div className="space-y-6">
-            {Object.entries(responsesByJob).map(([jobId, jobResponses]) => (
+            {Object.entries(responsesByJob).map(([jobId, jobResponses]) => {
+              const total = applicationsByJob?.[jobId] ?? jobResponses.length;
+              return (
               <div key={jobId} className="border border-border rounded-lg p-4">
                 <div className="flex items-center justify-between mb-4">
                   <h3 className="font-semibold text-lg">{jobResponses[0].jobTitle}</h3>
-                  <Badge>{jobResponses.length} {jobResponses.length === 1 ? 'отклик' : 'откликов'}</Badge>
+                  <Badge>{total} {total === 1 ? 'отклик' : 'откликов'}</Badge>
                 </div>
                 <div className="space-y-3">
                   {jobResponses.map((response, index) => (
@@ -226,7 +231,15 @@ const ResponsesTab = ({ responses, responsesByJob, formatTime }: ResponsesTabPro
                   ))}
                 </div>
               </div>
-            ))}
+              );
+            })}
+          </div>
+        )}
+        {hasMore && onLoadMore && (
+          <div className="text-center mt-6">
+            <Button variant="outline" onClick={onLoadMore}>
+              Показать ещё
+            </Button>
           </div>
         )}
       </CardContent>
@@ -9,9 +9,12 @@ import { ResponseData } from './ResponsesTab';
 interface VacanciesTabProps {
   allJobs: Job[];
   responsesByJob: Record<number, ResponseData[]>;
+  applicationsByJob?: Record<string, number>;
+  hasMore?: boolean;
+  onLoadMore?: () => void;
 }
 
-const VacanciesTab = ({ allJobs, responsesByJob }: VacanciesTabProps) => {
+const VacanciesTab = ({ allJobs, responsesByJob, applicationsByJob, hasMore, onLoadMore }: VacanciesTabProps) => {
   const navigate = useNavigate();
 
   return (
@@ -44,6 +47,8 @@ const VacanciesTab = ({ allJobs, responsesByJob }: VacanciesTabProps) => {
           <div className="space-y-4">
             {allJobs.map((job) => {
             const jobResponses = responsesByJob[job.id] || [];
+            // Загружена лишь часть откликов; полное число — из сводки
+            const total = applicationsByJob?.[String(job.id)] ?? jobResponses.length;
             return (
               <div key={job.id} className="p-4 rounded-lg border border-border hover:bg-secondary/50 transition">
                 <div className="flex items-start justify-between mb-3">
@@ -54,8 +59,8 @@ const VacanciesTab = ({ allJobs, responsesByJob }: VacanciesTabProps) => {
                       <span>{job.company}</span>
                     </div>
                   </div>
-                  <Badge variant={jobResponses.length > 0 ? "default" : "secondary"}>
-                    {jobResponses.length} {jobResponses.length === 1 ? 'отклик' : 'откликов'}
+                  <Badge variant={total > 0 ? "default" : "secondary"}>
+                    {total} {total === 1 ? 'отклик' : 'откликов'}
                   </Badge>
                 </div>
                 <div className="flex items-center gap-4 text-sm mb-3">
@@ -78,8 +83,8 @@ const VacanciesTab = ({ allJobs, responsesByJob }: VacanciesTabProps) => {
                           {response.userName}
                         </Badge>
                       ))}
-                      {jobResponses.length > 3 && (
-                        <Badge variant="secondary">+{jobResponses.length - 3} ещё</Badge>
+                      {total > 3 && (
+                        <Badge variant="secondary">+{total - 3} ещё</Badge>
                       )}
                     </div>
                   </div>
@@ -89,6 +94,13 @@ const VacanciesTab = ({ allJobs, responsesByJob }: VacanciesTabProps) => {
           })}
           </div>
         )}
+        {hasMore && onLoadMore && (
+          <div className="text-center mt-6">
+            <Button variant="outline" onClick={onLoadMore}>
+              Показать ещё
+            </Button>
+          </div>
+        )}
       </CardContent>
     </Card>
   );
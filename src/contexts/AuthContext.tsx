@@ -1,4 +1,5 @@
 import React, { createContext, useContext, useState, useEffect } from 'react';
+import { authHeaders } from '@/utils/syncData';
 
 interface User {
   id: string;
@@ -91,6 +92,14 @@ export const AuthProvider: React.FC<{ children: React.ReactNode }> = ({ children
         };
         setUser(userToSet);
         localStorage.setItem('user', JSON.stringify(userToSet));
+        // Без SESSION_SECRET на сервере токен не выдаётся — старый тогда не храним
+        if (data.token) {
+          localStorage.setItem('session_token', data.token);
+          localStorage.setItem('session_expires_at', data.expiresAt);
+        } else {
+          localStorage.removeItem('session_token');
+          localStorage.removeItem('session_expires_at');
+        }
         return true;
       }
       
@@ -193,8 +202,18 @@ export const AuthProvider: React.FC<{ children: React.ReactNode }> = ({ children
   };
 
   const logout = () => {
+    // Отзываем токен на сервере, чтобы им нельзя было воспользоваться до истечения срока
+    const headers = authHeaders();
+    if (headers.Authorization) {
+      fetch('https://functions.poehali.dev/81ba1a01-47ea-40ac-9ce8-1dc2aa32d523?resource=logout', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json', ...headers }
+      }).catch((error) => console.error('Logout error:', error));
+    }
     setUser(null);
     localStorage.removeItem('user');
+    localStorage.removeItem('session_token');
+    localStorage.removeItem('session_expires_at');
   };
 
   const updateTestResult = (result: string) => {
@@ -6,6 +6,9 @@ export interface Job {
   type: string;
   ageRange: string;
   salary: string;
+  salaryMin?: number | null;
+  salaryMax?: number | null;
+  salaryCurrency?: string | null;
   category: string;
   coordinates: [number, number];
   isPremium?: boolean;
@@ -6,7 +6,7 @@ import Icon from '@/components/ui/icon';
 import { useAuth } from '@/contexts/AuthContext';
 import { Dialog, DialogContent, DialogDescription, DialogHeader, DialogTitle, DialogTrigger, DialogFooter } from '@/components/ui/dialog';
 import { Label } from '@/components/ui/label';
-import { loadJobByIdFromDatabase } from '@/utils/syncData';
+import { authHeaders, loadJobByIdFromDatabase } from '@/utils/syncData';
 
 interface Message {
   id: string;
@@ -15,6 +15,7 @@ interface Message {
   senderName: string;
   senderRole: 'user' | 'employer';
   timestamp: number;
+  isRead: boolean;
 }
 
 const API_BASE = 'https://functions.poehali.dev/81ba1a01-47ea-40ac-9ce8-1dc2aa32d523';
@@ -32,6 +33,10 @@ const Chat = () => {
   const [isDialogOpen, setIsDialogOpen] = useState(false);
   const [jobInfo, setJobInfo] = useState<any>(null);
   const messagesEndRef = useRef<HTMLDivElement>(null);
+  const lastMessageIdRef = useRef<string | null>(null);
+  const lastCreatedAtRef = useRef<string | null>(null);
+  const syncedAtRef = useRef<string | null>(null);
+  const hasMoreRef = useRef(false);
   
   const urlParams = new URLSearchParams(window.location.search);
   const otherUserId = urlParams.get('userId');
@@ -60,8 +65,15 @@ const Chat = () => {
   }, [id]);
 
   useEffect(() => {
-    const loadMessages = async () => {
-      if (!user || !chatPartnerId || !id) return;
+    lastMessageIdRef.current = null;
+    lastCreatedAtRef.current = null;
+    syncedAtRef.current = null;
+    hasMoreRef.current = false;
+
+    let cancelled = false;
+
+    const loadMessages = async (): Promise<boolean> => {
+      if (!user || !chatPartnerId || !id) return false;
       
       try {
         const params = new URLSearchParams();
@@ -69,17 +81,29 @@ const Chat = () => {
         params.append('sender_id', user.id);
         params.append('receiver_id', chatPartnerId!);
         params.append('job_id', id);
+
+        // После первой загрузки запрашиваем только новые сообщения
+        const isDelta = lastMessageIdRef.current !== null;
+        if (isDelta) {
+          // Курсор (created_at, id) не зависит от того, существует ли ещё
+          // последнее сообщение: его удаление не останавливает чат
+          if (lastMessageIdRef.current) {
+            params.append('after_id', lastMessageIdRef.current);
+            if (lastCreatedAtRef.current) params.append('after_created_at', lastCreatedAtRef.current);
+          }
+          if (syncedAtRef.current) {
+            params.append('since', syncedAtRef.current);
+            params.append('read_since', syncedAtRef.current);
+          }
+          // Long-poll: сервер держит запрос, пока не придёт новое сообщение.
+          // Если прошлая страница была неполной выборкой, следующую берём сразу
+          if (!hasMoreRef.current) params.append('wait', '25');
+        }
         
-        console.log('📨 Загрузка сообщений:', {
-          sender_id: user.id,
-          receiver_id: chatPartnerId,
-          job_id: id,
-          userRole: user.role
-        });
-        
-        const response = await fetch(`${MESSAGES_API}&${params.toString()}`);
+        const response = await fetch(`${MESSAGES_API}&${params.toString()}`, { headers: authHeaders() });
         if (response.ok) {
           const data = await response.json();
+          if (cancelled) return false;
           const dbMessages = data.messages || [];
           
           const formattedMessages = dbMessages.map((msg: any) => ({
@@ -88,19 +112,68 @@ const Chat = () => {
             senderId: msg.senderId || msg.sender_id,
             senderName: (msg.senderId || msg.sender_id) === user.id ? user.name : 'Работодатель',
             senderRole: (msg.senderId || msg.sender_id) === user.id ? (user.role === 'employer' ? 'employer' : 'user') : 'employer',
-            timestamp: new Date(msg.createdAt || msg.created_at).getTime()
+            timestamp: new Date(msg.createdAt || msg.created_at).getTime(),
+            isRead: Boolean(msg.isRead)
           }));
-          
-          setMessages(formattedMessages);
+
+          const unreadIncoming = dbMessages.filter((msg: any) => msg.receiverId === user.id && !msg.isRead);
+          if (unreadIncoming.length > 0) {
+            // Одна пакетная отметка вместо запроса на каждое сообщение
+            fetch(MESSAGES_API, {
+              method: 'PUT',
+              headers: { 'Content-Type': 'application/json', ...authHeaders() },
+              body: JSON.stringify({
+                reader_id: user.id,
+                partner_id: chatPartnerId,
+                job_id: id,
+                up_to_id: unreadIncoming[unreadIncoming.length - 1].id
+              })
+            }).catch(error => console.error('Error marking messages as read:', error));
+          }
+
+          hasMoreRef.current = Boolean(data.hasMore);
+          // Пока сервер отдаёт страницы, syncedAt не сдвигаем: иначе при
+          // откате на since пропустим сообщения между страницами
+          if (!hasMoreRef.current) syncedAtRef.current = data.syncedAt || syncedAtRef.current;
+          if (dbMessages.length > 0) {
+            const lastMessage = dbMessages[dbMessages.length - 1];
+            lastMessageIdRef.current = lastMessage.id;
+            lastCreatedAtRef.current = lastMessage.createdAt || lastMessage.created_at || null;
+          } else if (!isDelta) {
+            lastMessageIdRef.current = '';
+          }
+
+          if (isDelta) {
+            const readUpdates: { id: string; isRead: boolean }[] = data.readUpdates || [];
+            if (formattedMessages.length > 0 || readUpdates.length > 0) {
+              const readById = new Map(readUpdates.map(update => [update.id, update.isRead]));
+              setMessages(prev => [
+                ...prev.map(m => (readById.has(m.id) ? { ...m, isRead: readById.get(m.id)! } : m)),
+                ...formattedMessages.filter((msg: Message) => !prev.some(m => m.id === msg.id))
+              ]);
+            }
+          } else {
+            setMessages(formattedMessages);
+          }
+          return true;
         }
       } catch (error) {
         console.error('Error loading messages:', error);
       }
+      return false;
     };
 
-    loadMessages();
-    const interval = setInterval(loadMessages, 2000);
-    return () => clearInterval(interval);
+    const pollMessages = async () => {
+      while (!cancelled) {
+        const ok = await loadMessages();
+        if (!ok) await new Promise(resolve => setTimeout(resolve, 2000));
+      }
+    };
+
+    pollMessages();
+    return () => {
+      cancelled = true;
+    };
   }, [user, chatPartnerId, id]);
 
   useEffect(() => {
@@ -115,7 +188,7 @@ const Chat = () => {
       
       const response = await fetch(MESSAGES_API, {
         method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
+        headers: { 'Content-Type': 'application/json', ...authHeaders() },
         body: JSON.stringify({
           sender_id: user.id,
           receiver_id: receiverId,
@@ -133,7 +206,7 @@ const Chat = () => {
         params.append('receiver_id', chatPartnerId!);
         if (id) params.append('job_id', id);
         
-        const refreshResponse = await fetch(`${MESSAGES_API}&${params.toString()}`);
+        const refreshResponse = await fetch(`${MESSAGES_API}&${params.toString()}`, { headers: authHeaders() });
         if (refreshResponse.ok) {
           const data = await refreshResponse.json();
           const dbMessages = data.messages || [];
@@ -144,7 +217,8 @@ const Chat = () => {
             senderId: msg.senderId || msg.sender_id,
             senderName: (msg.senderId || msg.sender_id) === user.id ? user.name : 'Работодатель',
             senderRole: (msg.senderId || msg.sender_id) === user.id ? (user.role === 'employer' ? 'employer' : 'user') : 'employer',
-            timestamp: new Date(msg.createdAt || msg.created_at).getTime()
+            timestamp: new Date(msg.createdAt || msg.created_at).getTime(),
+            isRead: Boolean(msg.isRead)
           }));
           
           setMessages(formattedMessages);
@@ -163,14 +237,14 @@ const Chat = () => {
 
     try {
       console.log('📅 Запрос пользователей для назначения собеседования...');
-      const usersResponse = await fetch(`${API_BASE}?resource=users`);
+      const usersResponse = await fetch(`${API_BASE}?resource=users&ids=${encodeURIComponent(chatPartnerId)}&profile=full`);
       if (!usersResponse.ok) {
         console.error('❌ Не удалось загрузить пользователей:', usersResponse.status);
         return;
       }
       
       const usersData = await usersResponse.json();
-      const responseUser = usersData.users.find((u: any) => u.id === chatPartnerId);
+      const responseUser = usersData.users?.[0];
 
       if (!responseUser) {
         console.error('❌ Пользователь не найден:', chatPartnerId);
@@ -189,7 +263,7 @@ const Chat = () => {
       
       const response = await fetch(`${API_BASE}?resource=interviews`, {
         method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
+        headers: { 'Content-Type': 'application/json', ...authHeaders() },
         body: JSON.stringify({
           userId: responseUser.id,
           userName: responseUser.name,
@@ -240,7 +314,7 @@ const Chat = () => {
       
       await fetch(MESSAGES_API, {
         method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
+        headers: { 'Content-Type': 'application/json', ...authHeaders() },
         body: JSON.stringify({
           sender_id: user.id,
           receiver_id: receiverId,
@@ -260,7 +334,7 @@ const Chat = () => {
       console.log('🗑️ Удаление сообщения:', messageId);
       const response = await fetch(MESSAGES_API, {
         method: 'DELETE',
-        headers: { 'Content-Type': 'application/json' },
+        headers: { 'Content-Type': 'application/json', ...authHeaders() },
         body: JSON.stringify({ id: messageId })
       });
 
@@ -405,11 +479,14 @@ const Chat = () => {
                       {message.senderName}
                     </p>
                     <p className="break-words">{message.text}</p>
-                    <p className="text-xs opacity-70 mt-1">
+                    <p className="text-xs opacity-70 mt-1 flex items-center gap-1">
                       {new Date(message.timestamp).toLocaleTimeString('ru-RU', {
                         hour: '2-digit',
                         minute: '2-digit'
                       })}
+                      {message.senderId === user.id && (
+                        <Icon name={message.isRead ? 'CheckCheck' : 'Check'} size={12} />
+                      )}
                     </p>
                   </div>
                   {message.senderId !== user.id && (
@@ -3,111 +3,148 @@ import { useAuth } from '@/contexts/AuthContext';
 import { Button } from '@/components/ui/button';
 import { Tabs, TabsContent, TabsList, TabsTrigger } from '@/components/ui/tabs';
 import Icon from '@/components/ui/icon';
-import { useState, useEffect } from 'react';
-import { Job, defaultJobs } from '@/data/jobs';
+import { useState, useEffect, useRef } from 'react';
+import { Job } from '@/data/jobs';
 import EmployerHeader from '@/components/employer/EmployerHeader';
 import EmployerStats from '@/components/employer/EmployerStats';
 import ResponsesTab, { ResponseData } from '@/components/employer/ResponsesTab';
 import InterviewsTab, { InterviewData } from '@/components/employer/InterviewsTab';
 import VacanciesTab from '@/components/employer/VacanciesTab';
 import CandidatesTab from '@/components/employer/CandidatesTab';
-import { loadJobsFromDatabase, loadApplicationsFromDatabase } from '@/utils/syncData';
+import {
+  loadJobsPageFromDatabase,
+  loadEmployerApplicationsPageFromDatabase,
+  loadEmployerInterviewsPageFromDatabase,
+  loadEmployerStatsFromDatabase,
+  EmployerStatsData
+} from '@/utils/syncData';
 
+const ADMIN_EMAIL = 'mininkonstantin@gmail.com';
 
 const EmployerProfile = () => {
   const { user, logout } = useAuth();
   const navigate = useNavigate();
+  const [activeTab, setActiveTab] = useState('responses');
   const [responses, setResponses] = useState<ResponseData[]>([]);
-  const [allUsers, setAllUsers] = useState<any[]>([]);
+  const [responsesCursor, setResponsesCursor] = useState<string | null>(null);
+  const [responsesLoaded, setResponsesLoaded] = useState(false);
   const [interviews, setInterviews] = useState<InterviewData[]>([]);
-  const [allJobs, setAllJobs] = useState<Job[]>([]);
+  const [interviewsCursor, setInterviewsCursor] = useState<string | null>(null);
+  const [interviewsLoaded, setInterviewsLoaded] = useState(false);
+  const [jobs, setJobs] = useState<Job[]>([]);
+  const [jobsCursor, setJobsCursor] = useState<string | null>(null);
+  const [jobsLoaded, setJobsLoaded] = useState(false);
+  const [allUsers, setAllUsers] = useState<any[]>([]);
+  const [stats, setStats] = useState<EmployerStatsData | null>(null);
+  const lastVisitRef = useRef<string | null>(null);
+
+  const isAdmin = user?.email === ADMIN_EMAIL;
+  // null — все вакансии площадки (администратор)
+  const employerScope = user ? (isAdmin ? null : user.id) : null;
 
+  // Момент прошлого визита: отклики после него сервер считает новыми
   useEffect(() => {
-    const loadData = async () => {
-      if (!user) return;
-
-      const dbJobs = await loadJobsFromDatabase();
-      const stored = localStorage.getItem('jobs');
-      const localJobs: Job[] = stored ? JSON.parse(stored) : defaultJobs;
-      const loadedJobs = dbJobs.length > 0 ? dbJobs : localJobs;
-      setAllJobs(loadedJobs);
-      if (dbJobs.length > 0) {
-        localStorage.setItem('jobs', JSON.stringify(dbJobs));
-      }
+    if (!user) return;
+    const key = `employer_last_visit_${user.id}`;
+    lastVisitRef.current = localStorage.getItem(key);
+    localStorage.setItem(key, new Date().toISOString());
+  }, [user?.id]);
+
+  // Счётчики и воронка — из сводки employer_stats; опрашивается только она,
+  // полные списки грузятся постранично при открытии вкладки
+  useEffect(() => {
+    if (!user) return;
+
+    const loadStats = async () => {
+      const statsData = await loadEmployerStatsFromDatabase({
+        employerId: user.id,
+        all: isAdmin,
+        since: lastVisitRef.current ?? undefined
+      });
+      if (statsData) setStats(statsData);
+    };
+
+    loadStats();
+    const interval = setInterval(loadStats, 3000);
+    return () => clearInterval(interval);
+  }, [user]);
 
+  useEffect(() => {
+    if (!user || !isAdmin) return;
+    const loadUsers = async () => {
       try {
         const response = await fetch('https://functions.poehali.dev/81ba1a01-47ea-40ac-9ce8-1dc2aa32d523?resource=users');
         if (response.ok) {
           const data = await response.json();
-          const usersList = (data.users || []).filter((u: any) => u.role !== 'employer');
-          console.log('✅ Загружено кандидатов из БД:', usersList.length);
-          setAllUsers(usersList);
+          setAllUsers((data.users || []).filter((u: any) => u.role !== 'employer'));
         } else {
           console.error('❌ Ошибка загрузки пользователей:', response.status);
-          setAllUsers([]);
         }
       } catch (error) {
         console.error('❌ Критическая ошибка при загрузке:', error);
-        setAllUsers([]);
       }
+    };
+    loadUsers();
+  }, [user]);
 
-      const employerJobs = user.email === 'mininkonstantin@gmail.com'
-        ? loadedJobs
-        : loadedJobs.filter(job => job.employerId === user.id);
-      const employerJobIds = employerJobs.map(job => String(job.id));
-
-      const dbResponses = await loadApplicationsFromDatabase();
-      const relevantResponses = dbResponses
-        .filter((r: any) => {
-          const jobIdFromResponse = r.jobId || r.job_id;
-          return employerJobIds.includes(String(jobIdFromResponse));
-        })
-        .map((r: any) => {
-          const jobIdFromResponse = r.jobId || r.job_id;
-          const job = loadedJobs.find(j => String(j.id) === String(jobIdFromResponse));
-          return {
-            userId: r.userId || r.user_id,
-            userName: r.userName || r.user_name,
-            userEmail: r.userEmail || r.user_email,
-            userAge: r.userAge || r.user_age,
-            jobId: jobIdFromResponse,
-            jobTitle: job?.title || 'Вакансия',
-            timestamp: r.createdAt ? new Date(r.createdAt).getTime() : (r.created_at ? new Date(r.created_at).getTime() : Date.now())
-          };
-        });
-      console.log('📋 Отклики после фильтрации:', relevantResponses.length);
-      setResponses(relevantResponses);
+  const toResponseData = (r: any): ResponseData => ({
+    userId: r.userId,
+    userName: r.userName,
+    userEmail: r.userEmail,
+    userAge: r.userAge,
+    jobId: r.jobId,
+    jobTitle: 'Вакансия',
+    timestamp: r.createdAt ? new Date(r.createdAt).getTime() : Date.now()
+  });
 
-      try {
-        console.log('📋 Загрузка собеседований для вакансий:', employerJobIds);
-        const interviewsResponse = await fetch('https://functions.poehali.dev/81ba1a01-47ea-40ac-9ce8-1dc2aa32d523?resource=interviews');
-        if (interviewsResponse.ok) {
-          const data = await interviewsResponse.json();
-          const allDbInterviews = data.interviews || [];
-          console.log('📊 Всего собеседований в БД:', allDbInterviews.length);
-          console.log('🔍 Пример первого собеседования:', allDbInterviews[0]);
-          
-          const employerInterviews = allDbInterviews.filter((interview: any) => 
-            employerJobIds.includes(String(interview.jobId))
-          );
-          employerInterviews.sort((a: any, b: any) => b.timestamp - a.timestamp);
-          setInterviews(employerInterviews);
-          console.log('✅ Загружено собеседований работодателя:', employerInterviews.length);
-        } else {
-          console.error('❌ Ошибка ответа при загрузке собеседований:', interviewsResponse.status);
-          setInterviews([]);
-        }
-      } catch (error) {
-        console.error('❌ Критическая ошибка загрузки собеседований:', error);
-        setInterviews([]);
-      }
-    };
+  const loadResponses = async (cursor: string | null) => {
+    const page = await loadEmployerApplicationsPageFromDatabase(employerScope, cursor);
+    if (!page) return;
+    const loaded = page.applications.map(toResponseData);
+    setResponses(prev => (cursor ? [...prev, ...loaded] : loaded));
+    setResponsesCursor(page.nextCursor);
+    setResponsesLoaded(true);
+  };
 
-    loadData();
-    
-    const interval = setInterval(loadData, 3000);
-    return () => clearInterval(interval);
-  }, [user]);
+  const loadInterviews = async (cursor: string | null) => {
+    const page = await loadEmployerInterviewsPageFromDatabase(employerScope, cursor);
+    if (!page) return;
+    setInterviews(prev => (cursor ? [...prev, ...page.interviews] : page.interviews));
+    setInterviewsCursor(page.nextCursor);
+    setInterviewsLoaded(true);
+  };
+
+  const loadJobs = async (cursor: string | null) => {
+    const page = await loadJobsPageFromDatabase({ includePremium: true, employerId: employerScope }, cursor);
+    if (!page || page === 'not-modified') return;
+    setJobs(prev => (cursor ? [...prev, ...page.jobs] : page.jobs));
+    setJobsCursor(page.nextCursor);
+    setJobsLoaded(true);
+  };
+
+  // Первая страница списка — при первом открытии вкладки
+  useEffect(() => {
+    if (!user) return;
+    if (activeTab === 'responses' && !responsesLoaded) loadResponses(null);
+    if (activeTab === 'interviews' && !interviewsLoaded) loadInterviews(null);
+    if (activeTab === 'vacancies') {
+      if (!jobsLoaded) loadJobs(null);
+      if (!responsesLoaded) loadResponses(null);
+    }
+  }, [user, activeTab]);
+
+  // Сводка изменилась — обновляем первую страницу уже открытых списков
+  useEffect(() => {
+    if (responsesLoaded) loadResponses(null);
+  }, [stats?.totals.applications]);
+
+  useEffect(() => {
+    if (interviewsLoaded) loadInterviews(null);
+  }, [stats?.interviews.total]);
+
+  useEffect(() => {
+    if (jobsLoaded) loadJobs(null);
+  }, [stats?.totals.jobs]);
 
   useEffect(() => {
     if (!user || user.role !== 'employer') {
@@ -143,7 +180,16 @@ const EmployerProfile = () => {
     return `${days} ${days === 1 ? 'день' : days < 5 ? 'дня' : 'дней'} назад`;
   };
 
-  const responsesByJob = responses.reduce((acc, response) => {
+  // Названия вакансий приходят в сводке, поэтому подставляются при отрисовке
+  const jobTitles: Record<string, string> = Object.fromEntries(
+    (stats?.jobs || []).map(job => [String(job.jobId), job.title])
+  );
+  const titledResponses = responses.map(response => ({
+    ...response,
+    jobTitle: jobTitles[String(response.jobId)] || response.jobTitle
+  }));
+
+  const responsesByJob = titledResponses.reduce((acc, response) => {
     if (!acc[response.jobId]) {
       acc[response.jobId] = [];
     }
@@ -151,9 +197,10 @@ const EmployerProfile = () => {
     return acc;
   }, {} as Record<number | string, ResponseData[]>);
 
-  const employerJobs = user.email === 'mininkonstantin@gmail.com'
-    ? allJobs
-    : allJobs.filter(job => job.employerId === user.id);
+  // Полное число откликов по вакансии — из сводки, а не из загруженных страниц
+  const applicationsByJob: Record<string, number> = Object.fromEntries(
+    (stats?.jobs || []).map(job => [String(job.jobId), job.applications])
+  );
 
   return (
     <div className="min-h-screen bg-secondary/10">
@@ -182,14 +229,15 @@ const EmployerProfile = () => {
           <EmployerHeader user={user} />
 
           <EmployerStats 
-            responsesCount={responses.length}
-            interviewsCount={interviews.length}
+            responsesCount={stats?.totals.applications ?? 0}
+            newResponsesCount={stats?.totals.new ?? 0}
+            interviewsCount={stats?.interviews.total ?? 0}
             candidatesCount={allUsers.length}
-            vacanciesCount={employerJobs.length}
+            vacanciesCount={stats?.totals.jobs ?? 0}
             userEmail={user.email}
           />
 
-          <Tabs defaultValue="responses" className="w-full">
+          <Tabs value={activeTab} onValueChange={setActiveTab} className="w-full">
             <TabsList className="grid w-full grid-cols-4">
               <TabsTrigger value="responses">
                 <Icon name="Send" size={16} className="mr-2" />
@@ -203,7 +251,7 @@ const EmployerProfile = () => {
                 <Icon name="Briefcase" size={16} className="mr-2" />
                 Вакансии
               </TabsTrigger>
-              {user?.email === 'mininkonstantin@gmail.com' && (
+              {isAdmin && (
                 <TabsTrigger value="candidates">
                   <Icon name="Users" size={16} className="mr-2" />
                   База кандидатов
@@ -213,24 +261,34 @@ const EmployerProfile = () => {
 
             <TabsContent value="responses" className="mt-6">
               <ResponsesTab 
-                responses={responses}
+                responses={titledResponses}
                 responsesByJob={responsesByJob}
+                applicationsByJob={applicationsByJob}
                 formatTime={formatTime}
+                hasMore={responsesCursor !== null}
+                onLoadMore={() => loadResponses(responsesCursor)}
               />
             </TabsContent>
 
             <TabsContent value="interviews" className="mt-6">
-              <InterviewsTab interviews={interviews} />
+              <InterviewsTab
+                interviews={interviews}
+                hasMore={interviewsCursor !== null}
+                onLoadMore={() => loadInterviews(interviewsCursor)}
+              />
             </TabsContent>
 
             <TabsContent value="vacancies" className="mt-6">
               <VacanciesTab 
-                allJobs={employerJobs}
+                allJobs={jobs}
                 responsesByJob={responsesByJob}
+                applicationsByJob={applicationsByJob}
+                hasMore={jobsCursor !== null}
+                onLoadMore={() => loadJobs(jobsCursor)}
               />
             </TabsContent>
 
-            {user?.email === 'mininkonstantin@gmail.com' && (
+            {isAdmin && (
               <TabsContent value="candidates" className="mt-6">
                 <CandidatesTab allUsers={allUsers} userSubscription={user.subscription} />
               </TabsContent>
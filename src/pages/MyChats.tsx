@@ -4,7 +4,7 @@ import { Button } from '@/components/ui/button';
 import { Card, CardContent } from '@/components/ui/card';
 import Icon from '@/components/ui/icon';
 import { useState, useEffect } from 'react';
-import { loadJobByIdFromDatabase } from '@/utils/syncData';
+import { authHeaders, loadJobsByIdsFromDatabase } from '@/utils/syncData';
 
 const API_BASE = 'https://functions.poehali.dev/81ba1a01-47ea-40ac-9ce8-1dc2aa32d523';
 const MESSAGES_API = `${API_BASE}?resource=messages`;
@@ -32,52 +32,62 @@ const MyChats = () => {
   }
 
   useEffect(() => {
-    const loadConversations = async () => {
+    let cancelled = false;
+    let latestCreatedAt = '';
+
+    const loadConversations = async (): Promise<boolean> => {
       try {
-        const response = await fetch(`${MESSAGES_API}&user_id=${user.id}`);
+        // Long-poll: после первой загрузки сервер отвечает, когда появится новое сообщение
+        const waitParams = latestCreatedAt ? `&since=${encodeURIComponent(latestCreatedAt)}&wait=25` : '';
+        const response = await fetch(`${MESSAGES_API}&user_id=${user.id}${waitParams}`, { headers: authHeaders() });
         if (response.ok) {
           const data = await response.json();
           const convos = data.conversations || [];
-          
-          const conversationsWithJobs = await Promise.all(
-            convos.map(async (conv: any) => {
-              const job = conv.jobId ? await loadJobByIdFromDatabase(conv.jobId) : null;
-              
-              const usersResponse = await fetch(`${API_BASE}?resource=users`);
-              let otherUserName = 'Пользователь';
-              if (usersResponse.ok) {
-                const usersData = await usersResponse.json();
-                const otherUser = usersData.users?.find((u: any) => u.id === conv.otherUserId);
-                if (otherUser) {
-                  otherUserName = otherUser.name;
-                }
-              }
-              
-              return {
-                id: conv.id,
-                otherUserId: conv.otherUserId,
-                otherUserName,
-                jobId: conv.jobId || '',
-                jobTitle: job?.title || 'Вакансия',
-                company: job?.company || 'Компания',
-                lastMessage: conv.messageText || '',
-                timestamp: conv.createdAt ? new Date(conv.createdAt).getTime() : Date.now()
-              };
-            })
+          latestCreatedAt = convos.reduce(
+            (latest: string, conv: any) => (conv.createdAt && conv.createdAt > latest ? conv.createdAt : latest),
+            latestCreatedAt || '1970-01-01T00:00:00'
           );
           
-          setConversations(conversationsWithJobs);
+          // Вакансии всех переписок одним запросом по ids
+          const jobsById = await loadJobsByIdsFromDatabase(convos.map((conv: any) => conv.jobId).filter(Boolean));
+          
+          const conversationsWithJobs = convos.map((conv: any) => {
+            const job = conv.jobId ? jobsById[String(conv.jobId)] : null;
+            
+            return {
+              id: conv.id,
+              otherUserId: conv.otherUserId,
+              otherUserName: conv.otherUser?.name || 'Пользователь',
+              jobId: conv.jobId || '',
+              jobTitle: job?.title || 'Вакансия',
+              company: job?.company || 'Компания',
+              lastMessage: conv.messageText || '',
+              timestamp: conv.createdAt ? new Date(conv.createdAt).getTime() : Date.now()
+            };
+          });
+          
+          if (!cancelled) setConversations(conversationsWithJobs);
+          return true;
         }
       } catch (error) {
         console.error('Error loading conversations:', error);
       } finally {
         setLoading(false);
       }
+      return false;
     };
 
-    loadConversations();
-    const interval = setInterval(loadConversations, 5000);
-    return () => clearInterval(interval);
+    const pollConversations = async () => {
+      while (!cancelled) {
+        const ok = await loadConversations();
+        if (!ok) await new Promise(resolve => setTimeout(resolve, 5000));
+      }
+    };
+
+    pollConversations();
+    return () => {
+      cancelled = true;
+    };
   }, [user.id]);
 
   const formatTime = (timestamp: number) => {
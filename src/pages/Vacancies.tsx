@@ -1,4 +1,4 @@
-import { useState, useEffect } from 'react';
+import { useState, useEffect, useRef } from 'react';
 import { Link } from 'react-router-dom';
 import { Button } from '@/components/ui/button';
 import { Input } from '@/components/ui/input';
@@ -8,53 +8,124 @@ import Icon from '@/components/ui/icon';
 import { useAuth } from '@/contexts/AuthContext';
 import VacancyMap from '@/components/VacancyMap';
 import { Job } from '@/data/jobs';
-import { loadJobsFromDatabase } from '@/utils/syncData';
+import { JobListFilters, loadJobsPageFromDatabase, loadRecommendationsFromDatabase } from '@/utils/syncData';
+
+// Без API показываем встроенный список, отфильтрованный на месте
+const filterJobsLocally = (jobs: Job[], filters: JobListFilters): Job[] => {
+  const query = (filters.q || '').trim().toLowerCase();
+  return jobs.filter((job) =>
+    (!filters.type || job.type === filters.type) &&
+    (filters.includePremium || !job.isPremium) &&
+    (!query || job.title.toLowerCase().includes(query) || job.company.toLowerCase().includes(query))
+  );
+};
 
 const Vacancies = () => {
   const { user } = useAuth();
   const [searchQuery, setSearchQuery] = useState('');
+  const [debouncedQuery, setDebouncedQuery] = useState('');
   const [selectedType, setSelectedType] = useState<string | null>(null);
   const [allJobs, setAllJobs] = useState<Job[]>([]);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
+  const [types, setTypes] = useState<string[]>([]);
+  const [serverRecommendations, setServerRecommendations] = useState<Job[] | null>(null);
+  const firstPageEtag = useRef<string | null>(null);
+  const loadedMore = useRef(false);
+
+  const includePremium = !!user && (user.subscription === 'premium' || user.subscription === 'premium_plus');
+  const filters: JobListFilters = { type: selectedType, includePremium, q: debouncedQuery };
+
+  const rememberTypes = (jobs: Job[]) => {
+    setTypes((prev) => Array.from(new Set([...prev, ...jobs.map((job) => job.type).filter(Boolean)])));
+  };
 
   useEffect(() => {
-    const loadJobs = async () => {
-      const jobsFromDB = await loadJobsFromDatabase();
-      if (jobsFromDB.length > 0) {
-        setAllJobs(jobsFromDB);
-      } else {
-        const { defaultJobs } = require('@/data/jobs');
-        setAllJobs(defaultJobs);
+    const timeout = setTimeout(() => setDebouncedQuery(searchQuery.trim()), 300);
+    return () => clearTimeout(timeout);
+  }, [searchQuery]);
+
+  // Фильтрация и поиск (полнотекстовый, с учётом опечаток) выполняются на сервере.
+  // Опрос раз в 2 секунды перезапрашивает только первую страницу с If-None-Match,
+  // так что без изменений сервер отвечает 304 без тела
+  useEffect(() => {
+    let cancelled = false;
+    firstPageEtag.current = null;
+    loadedMore.current = false;
+    setAllJobs([]);
+    setNextCursor(null);
+
+    const refreshFirstPage = async () => {
+      const page = await loadJobsPageFromDatabase(filters, null, firstPageEtag.current);
+      if (cancelled || page === 'not-modified') return;
+      if (!page) {
+        if (!firstPageEtag.current) {
+          const { defaultJobs } = require('@/data/jobs');
+          setAllJobs(filterJobsLocally(defaultJobs, filters));
+          rememberTypes(defaultJobs);
+        }
+        return;
       }
+      firstPageEtag.current = page.etag;
+      rememberTypes(page.jobs);
+      // Подгруженные кнопкой «Показать ещё» страницы остаются на месте
+      setAllJobs((prev) => {
+        const ids = new Set(page.jobs.map((job) => job.id));
+        return loadedMore.current ? [...page.jobs, ...prev.filter((job) => !ids.has(job.id))] : page.jobs;
+      });
+      if (!loadedMore.current) setNextCursor(page.nextCursor);
     };
 
-    loadJobs();
-    const interval = setInterval(loadJobs, 2000);
-    return () => clearInterval(interval);
-  }, []);
-
-  const filteredJobs = allJobs
-    .filter((job) => {
-      const matchesSearch = job.title.toLowerCase().includes(searchQuery.toLowerCase()) ||
-                           job.company.toLowerCase().includes(searchQuery.toLowerCase());
-      const matchesType = !selectedType || job.type === selectedType;
-      
-      if (job.isPremium && (!user || (user.subscription !== 'premium' && user.subscription !== 'premium_plus'))) {
-        return false;
-      }
-      
-      return matchesSearch && matchesType;
-    })
-    .sort((a, b) => {
-      if (a.isPremium && !b.isPremium) return -1;
-      if (!a.isPremium && b.isPremium) return 1;
-      return 0;
+    refreshFirstPage();
+    const interval = setInterval(refreshFirstPage, 2000);
+    return () => {
+      cancelled = true;
+      clearInterval(interval);
+    };
+  }, [selectedType, includePremium, debouncedQuery]);
+
+  const loadMore = async () => {
+    if (!nextCursor || loadingMore) return;
+    setLoadingMore(true);
+    const page = await loadJobsPageFromDatabase(filters, nextCursor);
+    setLoadingMore(false);
+    if (!page || page === 'not-modified') return;
+    loadedMore.current = true;
+    rememberTypes(page.jobs);
+    setAllJobs((prev) => {
+      const ids = new Set(prev.map((job) => job.id));
+      return [...prev, ...page.jobs.filter((job) => !ids.has(job.id))];
     });
+    setNextCursor(page.nextCursor);
+  };
 
-  const recommendedJobs = user?.testResult 
-    ? allJobs.filter(job => job.category === user.testResult)
-    : [];
+  // Рекомендации ранжирует сервер (тест, возраст, прошлые отклики); без него — совпадение по категории
+  useEffect(() => {
+    if (!user?.id || !user.testResult) {
+      setServerRecommendations(null);
+      return;
+    }
+    let cancelled = false;
+    loadRecommendationsFromDatabase(user.id).then((results) => {
+      if (!cancelled) setServerRecommendations(results);
+    });
+    return () => {
+      cancelled = true;
+    };
+  }, [user?.id, user?.testResult]);
+
+  // Поисковая выдача уже упорядочена по релевантности; иначе премиум-вакансии идут первыми
+  const filteredJobs = debouncedQuery
+    ? allJobs
+    : [...allJobs].sort((a, b) => {
+        if (a.isPremium && !b.isPremium) return -1;
+        if (!a.isPremium && b.isPremium) return 1;
+        return 0;
+      });
 
-  const types = Array.from(new Set(allJobs.map(job => job.type)));
+  const recommendedJobs = user?.testResult
+    ? serverRecommendations ?? allJobs.filter(job => job.category === user.testResult)
+    : [];
 
   return (
     <div className="min-h-screen">
@@ -87,7 +158,7 @@ const Vacancies = () => {
         <div className="mb-8">
           <h1 className="text-4xl font-bold mb-4">Вакансии в Красноярске</h1>
           <p className="text-muted-foreground text-lg">
-            {allJobs.length} доступных вакансий для подростков 14-17 лет
+            {allJobs.length}{nextCursor ? '+' : ''} доступных вакансий для подростков 14-17 лет
           </p>
         </div>
 
@@ -220,6 +291,14 @@ const Vacancies = () => {
               })}
             </div>
 
+            {nextCursor && (
+              <div className="text-center mt-8">
+                <Button variant="outline" onClick={loadMore} disabled={loadingMore}>
+                  {loadingMore ? 'Загрузка...' : 'Показать ещё'}
+                </Button>
+              </div>
+            )}
+
             {filteredJobs.length === 0 && (
               <div className="text-center py-12">
                 <div className="bg-muted/50 p-4 rounded-full w-20 h-20 mx-auto mb-4 flex items-center justify-center">
@@ -234,7 +313,11 @@ const Vacancies = () => {
           </TabsContent>
 
           <TabsContent value="map" className="mt-0">
-            <VacancyMap jobs={filteredJobs} recommendedCategory={user?.testResult} />
+            <VacancyMap
+              jobs={filteredJobs}
+              recommendedCategory={user?.testResult}
+              filters={filters}
+            />
           </TabsContent>
         </Tabs>
       </div>
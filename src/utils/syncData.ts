@@ -3,6 +3,19 @@
 const API_BASE = 'https://functions.poehali.dev/81ba1a01-47ea-40ac-9ce8-1dc2aa32d523';
 const JOBS_API = `${API_BASE}?resource=jobs`;
 const APPLICATIONS_API = `${API_BASE}?resource=applications`;
+const RECOMMENDATIONS_API = `${API_BASE}?resource=recommendations`;
+const EMPLOYER_STATS_API = `${API_BASE}?resource=employer_stats`;
+const INTERVIEWS_API = `${API_BASE}?resource=interviews`;
+
+// Заголовок с токеном сессии из входа; истёкший токен сервер отклонил бы с 401, поэтому не отправляем его
+export function authHeaders(): Record<string, string> {
+  const token = localStorage.getItem('session_token');
+  const expiresAt = localStorage.getItem('session_expires_at');
+  if (!token || (expiresAt && Date.parse(expiresAt) <= Date.now())) {
+    return {};
+  }
+  return { Authorization: `Bearer ${token}` };
+}
 
 export async function syncJobsToDatabase(jobs: any[]) {
   for (const job of jobs) {
@@ -18,13 +31,19 @@ export async function syncJobsToDatabase(jobs: any[]) {
   }
 }
 
-export async function loadJobsFromDatabase(): Promise<any[]> {
+// Поля карточки и маркера вакансии: списку не нужны описание, требования и контакты
+export const JOB_LIST_FIELDS = [
+  'title', 'company', 'location', 'type', 'ageRange', 'salary', 'category', 'coordinates', 'isPremium', 'employerId'
+];
+
+export async function loadJobsFromDatabase(fields?: string[]): Promise<any[]> {
   try {
-    const response = await fetch(JOBS_API);
+    const response = await fetch(fields ? `${JOBS_API}&fields=${fields.join(',')}` : JOBS_API);
     if (response.ok) {
       const data = await response.json();
       const jobs = data.jobs || [];
-      if (jobs.length > 0) {
+      // Кеш для офлайна хранит только полные вакансии
+      if (jobs.length > 0 && !fields) {
         localStorage.setItem('jobs_cache', JSON.stringify(jobs));
       }
       return jobs;
@@ -39,11 +58,65 @@ export async function loadJobsFromDatabase(): Promise<any[]> {
   return [];
 }
 
+export interface JobListFilters {
+  type?: string | null;
+  includePremium?: boolean;
+  q?: string;
+  employerId?: string | null;
+}
+
+export interface JobsPage {
+  jobs: any[];
+  nextCursor: string | null;
+  etag: string | null;
+}
+
+export const JOBS_PAGE_SIZE = 20;
+
+// Фильтры списка уходят на сервер, а не применяются к загруженному каталогу
+export function jobFilterParams(filters: JobListFilters): URLSearchParams {
+  const params = new URLSearchParams();
+  if (filters.type) params.append('type', filters.type);
+  if (!filters.includePremium) params.append('is_premium', 'false');
+  if (filters.q?.trim()) params.append('q', filters.q.trim());
+  if (filters.employerId) params.append('employer_id', filters.employerId);
+  return params;
+}
+
+// Страница списка по курсору (created_at, id; при q — по релевантности). С etag сервер
+// отвечает 304, если страница не изменилась, — тогда возвращается 'not-modified'
+export async function loadJobsPageFromDatabase(
+  filters: JobListFilters,
+  cursor: string | null = null,
+  etag: string | null = null,
+  limit = JOBS_PAGE_SIZE
+): Promise<JobsPage | 'not-modified' | null> {
+  try {
+    const params = jobFilterParams(filters);
+    params.append('limit', String(limit));
+    params.append('fields', JOB_LIST_FIELDS.join(','));
+    if (cursor) params.append('cursor', cursor);
+    const response = await fetch(`${JOBS_API}&${params.toString()}`, {
+      headers: etag ? { 'If-None-Match': etag } : {}
+    });
+    if (response.status === 304) {
+      return 'not-modified';
+    }
+    if (response.ok) {
+      const data = await response.json();
+      return { jobs: data.jobs || [], nextCursor: data.nextCursor || null, etag: response.headers.get('ETag') };
+    }
+  } catch (error) {
+    console.warn('API недоступен:', error);
+  }
+  return null;
+}
+
 export async function saveJobToDatabase(job: any): Promise<boolean> {
   try {
     const response = await fetch(JOBS_API, {
       method: 'POST',
-      headers: { 'Content-Type': 'application/json' },
+      headers: { 'Content-Type': 'application/json', ...authHeaders() },
       body: JSON.stringify(job)
     });
     return response.ok;
@@ -57,7 +130,7 @@ export async function saveApplicationToDatabase(application: any): Promise<boole
   try {
     const result = await fetch(APPLICATIONS_API, {
       method: 'POST',
-      headers: { 'Content-Type': 'application/json' },
+      headers: { 'Content-Type': 'application/json', ...authHeaders() },
       body: JSON.stringify(application)
     });
     if (result.ok) {
@@ -78,6 +151,89 @@ export async function saveApplicationToDatabase(application: any): Promise<boole
   return false;
 }
 
+export interface EmployerStatsData {
+  totals: { jobs: number; applications: number; new: number; byStatus: Record<string, number> };
+  jobs: { jobId: string; title: string; applications: number; new: number; byStatus: Record<string, number> }[];
+  interviews: { total: number; upcoming: number; next: any[] };
+}
+
+export async function loadEmployerStatsFromDatabase(options: {
+  employerId?: string;
+  all?: boolean;
+  since?: string;
+}): Promise<EmployerStatsData | null> {
+  try {
+    const params = new URLSearchParams();
+    if (options.all) params.append('scope', 'all');
+    else if (options.employerId) params.append('employer_id', options.employerId);
+    if (options.since) params.append('since', options.since);
+    const response = await fetch(`${EMPLOYER_STATS_API}&${params.toString()}`, { headers: authHeaders() });
+    if (response.ok) {
+      return await response.json();
+    }
+  } catch (error) {
+    console.warn('Сводка работодателя недоступна:', error);
+  }
+  return null;
+}
+
+export interface ApplicationsPage {
+  applications: any[];
+  nextCursor: string | null;
+}
+
+export interface InterviewsPage {
+  interviews: any[];
+  nextCursor: string | null;
+}
+
+export const EMPLOYER_PAGE_SIZE = 20;
+
+// Одна страница откликов на вакансии работодателя (keyset-курсор сервера);
+// employerId = null — по всем вакансиям (администратор площадки)
+export async function loadEmployerApplicationsPageFromDatabase(
+  employerId: string | null,
+  cursor: string | null = null,
+  limit = EMPLOYER_PAGE_SIZE
+): Promise<ApplicationsPage | null> {
+  try {
+    const params = new URLSearchParams({ limit: String(limit) });
+    if (employerId) params.append('employer_id', employerId);
+    else params.append('scope', 'all');
+    if (cursor) params.append('cursor', cursor);
+    const response = await fetch(`${APPLICATIONS_API}&${params.toString()}`, { headers: authHeaders() });
+    if (response.ok) {
+      const data = await response.json();
+      return { applications: data.applications || [], nextCursor: data.nextCursor || null };
+    }
+  } catch (error) {
+    console.warn('Не удалось загрузить отклики работодателя:', error);
+  }
+  return null;
+}
+
+// Одна страница собеседований по вакансиям работодателя, от поздних к ранним;
+// employerId = null — по всем вакансиям
+export async function loadEmployerInterviewsPageFromDatabase(
+  employerId: string | null,
+  cursor: string | null = null,
+  limit = EMPLOYER_PAGE_SIZE
+): Promise<InterviewsPage | null> {
+  try {
+    const params = new URLSearchParams({ limit: String(limit) });
+    if (employerId) params.append('employer_id', employerId);
+    if (cursor) params.append('cursor', cursor);
+    const response = await fetch(`${INTERVIEWS_API}&${params.toString()}`, { headers: authHeaders() });
+    if (response.ok) {
+      const data = await response.json();
+      return { interviews: data.interviews || [], nextCursor: data.nextCursor || null };
+    }
+  } catch (error) {
+    console.warn('Не удалось загрузить собеседования работодателя:', error);
+  }
+  return null;
+}
+
 export async function loadApplicationsFromDatabase(userId?: string, jobId?: string): Promise<any[]> {
   try {
     let url = APPLICATIONS_API;
@@ -86,7 +242,7 @@ export async function loadApplicationsFromDatabase(userId?: string, jobId?: stri
     if (jobId) params.append('job_id', jobId);
     if (params.toString()) url += '&' + params.toString();
     
-    const response = await fetch(url);
+    const response = await fetch(url, { headers: authHeaders() });
     if (response.ok) {
       const data = await response.json();
       const apps = data.applications || [];
@@ -110,13 +266,58 @@ export async function loadApplicationsFromDatabase(userId?: string, jobId?: stri
   return [];
 }
 
+export interface MapCluster {
+  coordinates: [number, number];
+  count: number;
+  jobId?: string;
+}
+
+export async function loadMapClustersFromDatabase(
+  bbox: [number, number, number, number],
+  zoom: number,
+  filters: JobListFilters = {}
+): Promise<{ clusters: MapCluster[]; points: any[] } | null> {
+  try {
+    const params = jobFilterParams(filters);
+    params.append('mode', 'clusters');
+    params.append('bbox', bbox.join(','));
+    params.append('zoom', String(zoom));
+    const response = await fetch(`${JOBS_API}&${params.toString()}`);
+    if (response.ok) {
+      const data = await response.json();
+      return { clusters: data.clusters || [], points: data.points || [] };
+    }
+  } catch (error) {
+    console.warn('API недоступен, карта покажет загруженный список:', error);
+  }
+  return null;
+}
+
+export async function loadRecommendationsFromDatabase(userId: string, limit = 20): Promise<any[] | null> {
+  try {
+    const response = await fetch(
+      `${RECOMMENDATIONS_API}&user_id=${encodeURIComponent(userId)}&limit=${limit}&fields=${JOB_LIST_FIELDS.join(',')}`,
+      { headers: authHeaders() }
+    );
+    if (response.ok) {
+      const data = await response.json();
+      return data.jobs || [];
+    }
+  } catch (error) {
+    console.warn('Рекомендации на сервере недоступны:', error);
+  }
+  return null;
+}
+
 export async function loadJobByIdFromDatabase(jobId: number | string): Promise<any | null> {
   try {
-    const response = await fetch(`${JOBS_API}&id=${jobId}`);
+    const response = await fetch(`${JOBS_API}&id=${encodeURIComponent(String(jobId))}`);
     if (response.ok) {
       const data = await response.json();
-      const jobs = data.jobs || [];
-      return jobs.find((j: any) => String(j.id) === String(jobId)) || null;
+      return data.job || null;
+    }
+    if (response.status === 404) {
+      return null;
     }
   } catch (error) {
     console.warn('API недоступен, использую кеш:', error);
@@ -127,4 +328,33 @@ export async function loadJobByIdFromDatabase(jobId: number | string): Promise<a
     }
   }
   return null;
-}
\ No newline at end of file
+}
+
+// Сервер принимает не больше JOBS_MAX_PAGE_SIZE id за запрос
+const JOBS_MAX_IDS = 100;
+
+export async function loadJobsByIdsFromDatabase(jobIds: Array<number | string>): Promise<Record<string, any>> {
+  const ids = Array.from(new Set(jobIds.map(String).filter(Boolean)));
+  if (ids.length === 0) return {};
+  try {
+    const chunks: string[][] = [];
+    for (let i = 0; i < ids.length; i += JOBS_MAX_IDS) {
+      chunks.push(ids.slice(i, i + JOBS_MAX_IDS));
+    }
+    const pages = await Promise.all(chunks.map(async chunk => {
+      const response = await fetch(`${JOBS_API}&ids=${chunk.map(encodeURIComponent).join(',')}`);
+      if (!response.ok) throw new Error(`HTTP ${response.status}`);
+      const data = await response.json();
+      return data.jobs || [];
+    }));
+    return Object.fromEntries(pages.flat().map((j: any) => [String(j.id), j]));
+  } catch (error) {
+    console.warn('API недоступен, использую кеш:', error);
+    const cached = localStorage.getItem('jobs_cache');
+    if (cached) {
+      const jobs = JSON.parse(cached);
+      return Object.fromEntries(jobs.filter((j: any) => ids.includes(String(j.id))).map((j: any) => [String(j.id), j]));
+    }
+  }
+  return {};
+}